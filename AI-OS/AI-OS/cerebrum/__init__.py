@@ -7,23 +7,68 @@ This module provides the core functionality for building and deploying
 AI agents within the AIOS ecosystem.
 """
 
+import io
 import os
+import re
 import sys
 import json
+import math
 import time
+import heapq
+import tempfile
 import asyncio
 import logging
-from typing import Dict, List, Optional, Any, Callable
-from dataclasses import dataclass, field
+import threading
+from typing import Dict, List, Optional, Any, Callable, AsyncIterator
+from dataclasses import dataclass, field, asdict, replace
+from collections import Counter, OrderedDict
+from collections.abc import Sequence
+from itertools import chain, count, islice
+from array import array
 from abc import ABC, abstractmethod
 from enum import Enum
 from pathlib import Path
+from concurrent.futures import Executor, ThreadPoolExecutor
 import hashlib
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Connection pool limits for the keep-alive HTTP session of each provider
+HTTP_POOL_MAX_CONNECTIONS = 100
+HTTP_POOL_MAX_KEEPALIVE = 20
+HTTP_POOL_KEEPALIVE_EXPIRY = 30.0
+
+# Size limit of the response cache's disk tier; when it is exceeded the
+# oldest entries are deleted down to the low watermark fraction of it
+RESPONSE_CACHE_DISK_BYTES = 256 * 2 ** 20
+RESPONSE_CACHE_DISK_LOW_WATERMARK = 0.8
+
+# Context window assumed for models without metadata
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Memory log: compact once it holds this many times more records than
+# live messages (and at least MEMORY_LOG_COMPACT_MIN records)
+MEMORY_LOG_FORMAT = "cerebrum-memory-log"
+MEMORY_LOG_COMPACT_RATIO = 2.0
+MEMORY_LOG_COMPACT_MIN = 1000
+
+# Number of recent tool calls each ToolRegistry keeps in full
+TOOL_CALL_HISTORY = 1000
+
+# numpy results at least this large come back from tool worker processes
+# through a shared-memory file instead of being pickled
+SHM_RESULT_THRESHOLD = 1 << 20
+SHM_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+# Default locations of local agent and tool packages (<author>/<name>)
+LOCAL_AGENT_PATH = "cerebrum/example/agents"
+LOCAL_TOOL_PATH = "cerebrum/tool/core"
+
+# Where manifest catalog indexes are kept (one file per package root)
+CATALOG_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "cerebrum"
+
 
 class AgentState(Enum):
     """Possible states for an AI agent."""
@@ -43,18 +88,69 @@ class ToolCallStatus(Enum):
     FAILED = "failed"
 
 
-@dataclass
+class ToolCachePolicy(Enum):
+    """How a tool's results may be reused for identical arguments."""
+    NONE = "none"  # always run the tool
+    PURE = "pure"  # same arguments always give the same result
+    TTL = "ttl"  # results stay valid for ``Tool.cache_ttl`` seconds
+
+
+@dataclass(slots=True)
 class AgentMessage:
-    """Message exchanged between agent and system."""
+    """Message exchanged between agent and system.
+    
+    ``metadata`` behaves like a dict field but is only created when first
+    accessed, so the many messages without metadata do not each hold an
+    empty dict.
+    """
     role: str  # 'user', 'assistant', 'system', 'tool'
     content: str
     tool_calls: Optional[List[Dict]] = None
     tool_call_id: Optional[str] = None
     timestamp: float = field(default_factory=time.time)
-    metadata: Dict = field(default_factory=dict)
+    metadata: Dict = None  # created on first access, see below
 
 
-@dataclass
+_MESSAGE_METADATA_SLOT = AgentMessage.__dict__["metadata"]
+
+
+def _get_message_metadata(message: AgentMessage) -> Dict:
+    metadata = _MESSAGE_METADATA_SLOT.__get__(message, AgentMessage)
+    if metadata is None:
+        metadata = {}
+        _MESSAGE_METADATA_SLOT.__set__(message, metadata)
+    return metadata
+
+
+AgentMessage.metadata = property(_get_message_metadata, _MESSAGE_METADATA_SLOT.__set__,
+                                 doc="Message metadata, created on first access.")
+
+
+def _message_metadata(message: Any) -> Optional[Dict]:
+    """Non-empty metadata of a message, without creating an empty dict."""
+    if isinstance(message, AgentMessage):
+        return _MESSAGE_METADATA_SLOT.__get__(message, AgentMessage) or None
+    return getattr(message, "metadata", None) or None
+
+
+_LOG_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+
+def _message_record(message: Any) -> Dict:
+    """JSON-ready dict of a message, omitting empty optional fields."""
+    record = {"role": message.role, "content": message.content,
+              "timestamp": message.timestamp}
+    if message.tool_calls:
+        record["tool_calls"] = message.tool_calls
+    if message.tool_call_id:
+        record["tool_call_id"] = message.tool_call_id
+    metadata = _message_metadata(message)
+    if metadata:
+        record["metadata"] = metadata
+    return record
+
+
+@dataclass(slots=True)
 class ToolCall:
     """Represents a tool call made by the agent."""
     tool_name: str
@@ -65,6 +161,22 @@ class ToolCall:
     error: Optional[str] = None
     start_time: float = field(default_factory=time.time)
     end_time: Optional[float] = None
+    cached: bool = False  # result served from the tool result cache
+
+
+@dataclass
+class IterationStats:
+    """Latency and token breakdown of one agent loop iteration."""
+    iteration: int
+    llm_time: float = 0.0
+    tool_time: float = 0.0
+    tool_calls: int = 0
+    prompt_messages: int = 0
+    context_tokens: int = 0  # estimated prompt size sent to the model
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    cache_write_tokens: int = 0
 
 
 @dataclass
@@ -77,16 +189,259 @@ class AgentConfig:
     version: str
     license: str = "MIT"
     llm_backend: str = "openai"
-    model_name: str = "gpt-4"
+    model_name: Optional[str] = None  # None keeps the provider's default model
     system_prompt: Optional[str] = None
     max_iterations: int = 100
     timeout: int = 300
+    max_total_tokens: Optional[int] = None  # token budget per turn, like max_iterations
+    max_tool_calls: Optional[int] = 32  # tool calls run per LLM response; extra ones are skipped
+    prompt_caching: bool = True  # mark the system/tools prefix as cacheable
+    tool_executor: str = "thread"  # 'thread' or 'process' pool for blocking tools
+    tool_workers: int = 4
+    tool_timeout: float = 60.0
     memory_enabled: bool = True
     storage_enabled: bool = True
 
 
+@dataclass
+class LLMResponse:
+    """Completion returned by an LLM provider."""
+    content: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0  # prompt tokens served from the provider's prompt cache
+    cache_write_tokens: int = 0
+    tool_calls: Optional[List[Dict]] = None  # native tool calls: {"id", "name", "arguments"}
+    
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+@dataclass
+class ToolCallDelta:
+    """Fragment of a natively streamed tool call.
+    
+    ``arguments`` is a piece of the call's JSON arguments; ``done`` marks
+    the last fragment when the provider signals it.
+    """
+    index: int
+    id: Optional[str] = None
+    name: Optional[str] = None
+    arguments: str = ""
+    done: bool = False
+
+
+def _native_tool_call(call_id: Optional[str], name: Optional[str], arguments: Any) -> Dict:
+    """Normalize a provider tool call to ``{"id", "name", "arguments"}``.
+    
+    Arguments that are not valid JSON are kept as text and rejected by
+    argument validation, so the model sees the error.
+    """
+    if isinstance(arguments, str):
+        try:
+            arguments = json.loads(arguments) if arguments.strip() else {}
+        except json.JSONDecodeError:
+            pass
+    return {"id": call_id, "name": name, "arguments": arguments}
+
+
+class ToolCallAccumulator:
+    """Assembles streamed ``ToolCallDelta`` fragments into tool calls.
+    
+    A call is complete when its last fragment is marked ``done`` or when
+    a later call starts (providers stream calls one after another), so
+    tools can start before the response ends; ``finish`` returns the rest.
+    """
+    
+    def __init__(self):
+        self._open: Dict[int, list] = {}  # index -> [id, name, argument fragments]
+        self._closed: set = set()
+    
+    def feed(self, delta: ToolCallDelta) -> List[Dict]:
+        """Consume a fragment and return tool calls completed by it."""
+        completed = []
+        call = self._open.get(delta.index)
+        if call is None:
+            if delta.index in self._closed:
+                return completed
+            for index in sorted(i for i in self._open if i < delta.index):
+                completed.append(self._close(index))
+            call = self._open[delta.index] = [None, None, []]
+        if delta.id:
+            call[0] = delta.id
+        if delta.name:
+            call[1] = delta.name
+        if delta.arguments:
+            call[2].append(delta.arguments)
+        if delta.done:
+            completed.append(self._close(delta.index))
+        return completed
+    
+    def finish(self) -> List[Dict]:
+        """Complete all calls still open at the end of the stream."""
+        return [self._close(index) for index in sorted(self._open)]
+    
+    def _close(self, index: int) -> Dict:
+        call_id, name, fragments = self._open.pop(index)
+        self._closed.add(index)
+        return _native_tool_call(call_id, name, "".join(fragments))
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count (about four characters per token)."""
+    return len(text) // 4 + 1 if text else 0
+
+
+def _openai_usage(usage: Any) -> LLMResponse:
+    """Token usage of an OpenAI-compatible response (``content`` is empty)."""
+    if usage is None:
+        return LLMResponse(content="")
+    details = getattr(usage, "prompt_tokens_details", None)
+    return LLMResponse(
+        content="",
+        prompt_tokens=usage.prompt_tokens,
+        completion_tokens=usage.completion_tokens,
+        cached_tokens=getattr(details, "cached_tokens", None) or 0
+    )
+
+
+def _openai_response(message: Any, usage: Any) -> LLMResponse:
+    """Build an LLMResponse from an OpenAI-compatible message and usage data."""
+    response = _openai_usage(usage)
+    response.content = message.content or ""
+    response.tool_calls = [
+        _native_tool_call(tc.id, tc.function.name, tc.function.arguments)
+        for tc in getattr(message, "tool_calls", None) or ()
+    ] or None
+    return response
+
+
+def _openai_message(msg: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert an assistant message with native tool calls to OpenAI format."""
+    return {
+        "role": "assistant",
+        "content": msg.get("content") or None,
+        "tool_calls": [{
+            "id": tc["id"],
+            "type": "function",
+            "function": {
+                "name": tc["name"],
+                "arguments": (tc["arguments"] if isinstance(tc["arguments"], str)
+                              else json.dumps(tc["arguments"], ensure_ascii=False))
+            }
+        } for tc in msg["tool_calls"]]
+    }
+
+
+def _openai_request(model: str, messages: List[Dict[str, Any]], max_tokens: int,
+                    temperature: float, tools: Optional[List[Dict]], **kwargs) -> Dict[str, Any]:
+    """Build a chat completions request for OpenAI-compatible APIs.
+    
+    Tool results (``role: tool``) already use the OpenAI shape; assistant
+    turns carry their tool calls and tool schemas become functions.
+    """
+    request = dict(
+        model=model,
+        messages=[_openai_message(m) if m.get("tool_calls") else m
+                  for m in _strip_cache_control(messages)],
+        max_tokens=max_tokens,
+        temperature=temperature,
+        **kwargs
+    )
+    if tools:
+        request["tools"] = [{"type": "function", "function": schema} for schema in tools]
+    return request
+
+
+async def _openai_stream(stream: Any) -> AsyncIterator[Any]:
+    """Yield text deltas and ``ToolCallDelta``s of an OpenAI-compatible stream.
+    
+    Usage comes in a final chunk (OpenAI with ``include_usage``, or Groq's
+    ``x_groq`` field) and is yielded as an ``LLMResponse``.
+    """
+    async for chunk in stream:
+        usage = (getattr(chunk, "usage", None)
+                 or getattr(getattr(chunk, "x_groq", None), "usage", None))
+        if usage is not None:
+            yield _openai_usage(usage)
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            yield delta.content
+        for tc in getattr(delta, "tool_calls", None) or ():
+            function = tc.function
+            yield ToolCallDelta(
+                index=tc.index,
+                id=tc.id,
+                name=function.name if function else None,
+                arguments=(function.arguments or "") if function else ""
+            )
+
+
+def _strip_cache_control(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Remove cache markers from the leading system messages.
+    
+    OpenAI-compatible APIs cache identical prompt prefixes automatically
+    and reject the Anthropic-style ``cache_control`` field.
+    """
+    head = 0
+    while head < len(messages) and messages[head]["role"] == "system":
+        head += 1
+    if not any("cache_control" in m for m in messages[:head]):
+        return messages
+    stripped = [{k: v for k, v in m.items() if k != "cache_control"} for m in messages[:head]]
+    return stripped + messages[head:]
+
+
+def _create_async_http_client(sdk: Any) -> Any:
+    """Create a pooled, keep-alive HTTP session for an SDK's async client.
+    
+    The SDK's own ``DefaultAsyncHttpxClient`` is used so the session
+    matches the HTTP library that SDK version is built on.
+    """
+    limits = type(sdk.DEFAULT_CONNECTION_LIMITS)(
+        max_connections=HTTP_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_POOL_KEEPALIVE_EXPIRY
+    )
+    return sdk.DefaultAsyncHttpxClient(limits=limits)
+
+
 class LLMProvider(ABC):
-    """Abstract base class for LLM providers."""
+    """Abstract base class for LLM providers.
+    
+    SDK clients are created on first use (``_init_client`` for the sync
+    client, ``_create_async_client`` for the async one), so constructing
+    a provider neither imports its SDK nor opens an HTTP client.
+    """
+    
+    async_client: Any = None
+    _async_loop: Optional[asyncio.AbstractEventLoop] = None
+    _client: Any = None
+    _client_initialized = False
+    # Providers that set this accept ``tools`` (schemas as returned by
+    # ``ToolRegistry.get_schemas``), return ``LLMResponse.tool_calls`` and
+    # stream ``ToolCallDelta``s; tool turns then use native messages
+    supports_tools: bool = False
+    
+    @property
+    def client(self) -> Any:
+        """Sync SDK client, initialized on first access."""
+        if not self._client_initialized:
+            self._client_initialized = True
+            self._init_client()
+        return self._client
+    
+    @client.setter
+    def client(self, value: Any):
+        self._client = value
+        self._client_initialized = True
+    
+    def _init_client(self):
+        """Create the sync SDK client."""
+        pass
     
     @abstractmethod
     def generate(self, messages: List[Dict[str, str]], 
@@ -96,29 +451,126 @@ class LLMProvider(ABC):
         """Generate a response from the LLM."""
         pass
     
+    async def agenerate(self, messages: List[Dict[str, str]], 
+                        max_tokens: int = 4096,
+                        temperature: float = 0.7,
+                        **kwargs) -> str:
+        """Generate a response without blocking the event loop.
+        
+        Providers without a native async client run ``generate`` in a
+        worker thread.
+        """
+        return await asyncio.to_thread(
+            self.generate, messages, max_tokens, temperature, **kwargs
+        )
+    
+    async def acomplete(self, messages: List[Dict[str, str]], 
+                        max_tokens: int = 4096,
+                        temperature: float = 0.7,
+                        **kwargs) -> LLMResponse:
+        """Generate a response together with its token usage.
+        
+        Providers that do not report usage get an estimate.
+        """
+        content = await self.agenerate(messages, max_tokens, temperature, **kwargs)
+        return LLMResponse(
+            content=content,
+            prompt_tokens=sum(estimate_tokens(m.get("content") or "") for m in messages),
+            completion_tokens=estimate_tokens(content)
+        )
+    
+    async def astream(self, messages: List[Dict[str, str]], 
+                      max_tokens: int = 4096,
+                      temperature: float = 0.7,
+                      **kwargs) -> AsyncIterator[str]:
+        """Stream the response as text deltas.
+        
+        Providers that report token usage yield it last, as an
+        ``LLMResponse`` with empty content. Providers without native
+        streaming yield the complete response as a single delta.
+        """
+        response = await self.acomplete(messages, max_tokens, temperature, **kwargs)
+        yield response.content
+        yield replace(response, content="", tool_calls=None)
+    
     @abstractmethod
     def get_available_models(self) -> List[str]:
         """Get list of available models."""
         pass
+    
+    def get_model_info(self, model: Optional[str] = None) -> Dict[str, Any]:
+        """Get metadata (e.g. ``context_window``) for a model."""
+        return {}
+    
+    def _create_async_client(self) -> Any:
+        """Create the provider's async SDK client with a pooled session."""
+        raise NotImplementedError
+    
+    def _get_async_client(self) -> Any:
+        """Get the async client bound to the running event loop.
+        
+        Pooled connections belong to the loop that opened them, so a new
+        session is created when the provider is used from another loop
+        (e.g. successive ``asyncio.run`` calls). Call ``aclose`` before such
+        a loop ends so its session is shut down with it.
+        """
+        loop = asyncio.get_running_loop()
+        if self.async_client is None or self._async_loop is not loop:
+            if self.async_client is not None:
+                logger.debug(f"{type(self).__name__}: async client of another event loop "
+                             f"dropped without aclose()")
+            try:
+                self.async_client = self._create_async_client()
+            except ImportError:
+                raise RuntimeError(f"{type(self).__name__} async client not initialized: "
+                                   f"SDK package not installed")
+            self._async_loop = loop
+        return self.async_client
+    
+    async def aclose(self):
+        """Close the async client (and its connection pool) of the running loop.
+        
+        Clients opened on other loops are left alone; a session whose loop
+        has already closed can no longer be shut down cleanly.
+        """
+        client = self.async_client
+        if client is None or self._async_loop is not asyncio.get_running_loop():
+            return
+        self.async_client = None
+        self._async_loop = None
+        await client.close()
 
 
 class OpenAILLM(LLMProvider):
     """OpenAI LLM provider."""
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4"):
+    supports_tools = True
+    
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4",
+                 base_url: Optional[str] = None):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         self.model = model
-        self.client = None
-        self._init_client()
+        self.base_url = base_url
     
     def _init_client(self):
         try:
             from openai import OpenAI
-            self.client = OpenAI(api_key=self.api_key)
+            self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
             logger.info(f"OpenAI client initialized with model: {self.model}")
         except ImportError:
             logger.warning("OpenAI package not installed. Install with: pip install openai")
     
+    def _create_async_client(self) -> Any:
+        import openai
+        return openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url,
+                                  http_client=_create_async_http_client(openai))
+    
+    def _build_request(self, messages: List[Dict[str, str]], max_tokens: int,
+                       temperature: float, **kwargs) -> Dict[str, Any]:
+        model = kwargs.pop("model", None) or self.model
+        return _openai_request(model, messages, max_tokens, temperature,
+                               kwargs.pop("tools", None), **kwargs)
+    
     def generate(self, messages: List[Dict[str, str]], 
                  max_tokens: int = 4096,
                  temperature: float = 0.7,
@@ -128,38 +580,148 @@ class OpenAILLM(LLMProvider):
         
         try:
             response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                **kwargs
+                **self._build_request(messages, max_tokens, temperature, **kwargs)
+            )
+            return response.choices[0].message.content or ""
+        except Exception as e:
+            logger.error(f"OpenAI generation error: {e}")
+            raise
+    
+    async def agenerate(self, messages: List[Dict[str, str]], 
+                        max_tokens: int = 4096,
+                        temperature: float = 0.7,
+                        **kwargs) -> str:
+        response = await self.acomplete(messages, max_tokens, temperature, **kwargs)
+        return response.content
+    
+    async def acomplete(self, messages: List[Dict[str, str]], 
+                        max_tokens: int = 4096,
+                        temperature: float = 0.7,
+                        **kwargs) -> LLMResponse:
+        try:
+            response = await self._get_async_client().chat.completions.create(
+                **self._build_request(messages, max_tokens, temperature, **kwargs)
             )
-            return response.choices[0].message.content
         except Exception as e:
             logger.error(f"OpenAI generation error: {e}")
             raise
+        
+        return _openai_response(response.choices[0].message, response.usage)
+    
+    async def astream(self, messages: List[Dict[str, str]], 
+                      max_tokens: int = 4096,
+                      temperature: float = 0.7,
+                      **kwargs) -> AsyncIterator[str]:
+        try:
+            stream = await self._get_async_client().chat.completions.create(
+                stream=True,
+                stream_options={"include_usage": True},
+                **self._build_request(messages, max_tokens, temperature, **kwargs)
+            )
+            async for delta in _openai_stream(stream):
+                yield delta
+        except Exception as e:
+            logger.error(f"OpenAI streaming error: {e}")
+            raise
+    
+    MODELS = {
+        "gpt-4": {"context_window": 8192},
+        "gpt-4-turbo": {"context_window": 128000},
+        "gpt-3.5-turbo": {"context_window": 16385},
+        "gpt-3.5-turbo-16k": {"context_window": 16385},
+    }
     
     def get_available_models(self) -> List[str]:
-        return ["gpt-4", "gpt-4-turbo", "gpt-3.5-turbo", "gpt-3.5-turbo-16k"]
+        return list(self.MODELS)
+    
+    def get_model_info(self, model: Optional[str] = None) -> Dict[str, Any]:
+        return self.MODELS.get(model or self.model, {})
 
 
 class AnthropicLLM(LLMProvider):
     """Anthropic Claude LLM provider."""
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "claude-3-opus-20240229"):
+    supports_tools = True
+    
+    def __init__(self, api_key: Optional[str] = None, model: str = "claude-3-opus-20240229",
+                 base_url: Optional[str] = None):
         self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
         self.model = model
-        self.client = None
-        self._init_client()
+        self.base_url = base_url
     
     def _init_client(self):
         try:
             import anthropic
-            self.client = anthropic.Anthropic(api_key=self.api_key)
+            self.client = anthropic.Anthropic(api_key=self.api_key, base_url=self.base_url)
             logger.info(f"Anthropic client initialized with model: {self.model}")
         except ImportError:
             logger.warning("Anthropic package not installed. Install with: pip install anthropic")
     
+    def _create_async_client(self) -> Any:
+        import anthropic
+        return anthropic.AsyncAnthropic(api_key=self.api_key, base_url=self.base_url,
+                                        http_client=_create_async_http_client(anthropic))
+    
+    def _build_request(self, messages: List[Dict[str, str]], max_tokens: int,
+                       temperature: float, **kwargs) -> Dict[str, Any]:
+        # Convert messages format for Anthropic: system messages become
+        # system blocks, keeping their cache breakpoints; tool calls become
+        # tool_use blocks and consecutive tool results one user turn of
+        # tool_result blocks
+        system_blocks = []
+        formatted_messages = []
+        results: Optional[List[Dict]] = None
+        for msg in messages:
+            if msg["role"] == "system":
+                block = {"type": "text", "text": msg["content"]}
+                if "cache_control" in msg:
+                    block["cache_control"] = msg["cache_control"]
+                system_blocks.append(block)
+                continue
+            if msg["role"] == "tool":
+                block = {"type": "tool_result", "tool_use_id": msg["tool_call_id"],
+                         "content": msg["content"]}
+                if results is None:
+                    results = []
+                    formatted_messages.append({"role": "user", "content": results})
+                results.append(block)
+                continue
+            results = None
+            if msg.get("tool_calls"):
+                blocks = [{"type": "text", "text": msg["content"]}] if msg.get("content") else []
+                blocks.extend({
+                    "type": "tool_use",
+                    "id": tc["id"],
+                    "name": tc["name"],
+                    "input": tc["arguments"] if isinstance(tc["arguments"], dict) else {}
+                } for tc in msg["tool_calls"])
+                formatted_messages.append({"role": "assistant", "content": blocks})
+            else:
+                formatted_messages.append(msg)
+        
+        tools = kwargs.pop("tools", None)
+        request = dict(
+            model=kwargs.pop("model", None) or self.model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=formatted_messages,
+            **kwargs
+        )
+        if system_blocks:
+            request["system"] = system_blocks
+        if tools:
+            request["tools"] = [{"name": t["name"], "description": t["description"],
+                                 "input_schema": t["parameters"]} for t in tools]
+        return request
+    
+    @staticmethod
+    def _parse_content(content: List[Any]) -> tuple:
+        """Split response content blocks into text and native tool calls."""
+        text = "".join(block.text for block in content if block.type == "text")
+        tool_calls = [_native_tool_call(block.id, block.name, block.input)
+                      for block in content if block.type == "tool_use"]
+        return text, tool_calls or None
+    
     def generate(self, messages: List[Dict[str, str]], 
                  max_tokens: int = 4096,
                  temperature: float = 0.7,
@@ -168,49 +730,131 @@ class AnthropicLLM(LLMProvider):
             raise RuntimeError("Anthropic client not initialized")
         
         try:
-            # Convert messages format for Anthropic
-            system_prompt = None
-            formatted_messages = []
-            for msg in messages:
-                if msg["role"] == "system":
-                    system_prompt = msg["content"]
-                else:
-                    formatted_messages.append(msg)
-            
             response = self.client.messages.create(
-                model=self.model,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                system=system_prompt,
-                messages=formatted_messages,
-                **kwargs
+                **self._build_request(messages, max_tokens, temperature, **kwargs)
+            )
+            return self._parse_content(response.content)[0]
+        except Exception as e:
+            logger.error(f"Anthropic generation error: {e}")
+            raise
+    
+    async def agenerate(self, messages: List[Dict[str, str]], 
+                        max_tokens: int = 4096,
+                        temperature: float = 0.7,
+                        **kwargs) -> str:
+        response = await self.acomplete(messages, max_tokens, temperature, **kwargs)
+        return response.content
+    
+    async def acomplete(self, messages: List[Dict[str, str]], 
+                        max_tokens: int = 4096,
+                        temperature: float = 0.7,
+                        **kwargs) -> LLMResponse:
+        try:
+            response = await self._get_async_client().messages.create(
+                **self._build_request(messages, max_tokens, temperature, **kwargs)
             )
-            return response.content[0].text
         except Exception as e:
             logger.error(f"Anthropic generation error: {e}")
             raise
+        
+        result = self._usage(response.usage)
+        result.content, result.tool_calls = self._parse_content(response.content)
+        return result
+    
+    @staticmethod
+    def _usage(usage: Any, output_tokens: Optional[int] = None) -> LLMResponse:
+        """Token usage of a message (``content`` is empty)."""
+        if usage is None:
+            return LLMResponse(content="")
+        # input_tokens excludes the cached part of the prompt
+        cached = getattr(usage, "cache_read_input_tokens", None) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+        return LLMResponse(
+            content="",
+            prompt_tokens=usage.input_tokens + cached + cache_write,
+            completion_tokens=usage.output_tokens if output_tokens is None else output_tokens,
+            cached_tokens=cached,
+            cache_write_tokens=cache_write
+        )
+    
+    async def astream(self, messages: List[Dict[str, str]], 
+                      max_tokens: int = 4096,
+                      temperature: float = 0.7,
+                      **kwargs) -> AsyncIterator[str]:
+        try:
+            stream = await self._get_async_client().messages.create(
+                stream=True,
+                **self._build_request(messages, max_tokens, temperature, **kwargs)
+            )
+            tool_blocks = set()
+            usage, output_tokens = None, None
+            async for event in stream:
+                # Input usage comes with message_start, the final output
+                # token count with message_delta
+                if event.type == "message_start":
+                    usage = event.message.usage
+                elif event.type == "message_delta" and getattr(event, "usage", None):
+                    output_tokens = event.usage.output_tokens
+                elif event.type == "content_block_start" and event.content_block.type == "tool_use":
+                    tool_blocks.add(event.index)
+                    block = event.content_block
+                    yield ToolCallDelta(index=event.index, id=block.id, name=block.name)
+                elif event.type == "content_block_delta":
+                    if event.delta.type == "text_delta":
+                        yield event.delta.text
+                    elif event.delta.type == "input_json_delta":
+                        yield ToolCallDelta(index=event.index, arguments=event.delta.partial_json)
+                elif event.type == "content_block_stop" and event.index in tool_blocks:
+                    yield ToolCallDelta(index=event.index, done=True)
+            if usage is not None:
+                yield self._usage(usage, output_tokens)
+        except Exception as e:
+            logger.error(f"Anthropic streaming error: {e}")
+            raise
+    
+    MODELS = {
+        "claude-3-opus-20240229": {"context_window": 200000},
+        "claude-3-sonnet-20240229": {"context_window": 200000},
+        "claude-3-haiku-20240307": {"context_window": 200000},
+    }
     
     def get_available_models(self) -> List[str]:
-        return ["claude-3-opus-20240229", "claude-3-sonnet-20240229", "claude-3-haiku-20240307"]
+        return list(self.MODELS)
+    
+    def get_model_info(self, model: Optional[str] = None) -> Dict[str, Any]:
+        return self.MODELS.get(model or self.model, {})
 
 
 class GroqLLM(LLMProvider):
     """Groq LLM provider."""
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "mixtral-8x7b-32768"):
+    supports_tools = True
+    
+    def __init__(self, api_key: Optional[str] = None, model: str = "mixtral-8x7b-32768",
+                 base_url: Optional[str] = None):
         self.api_key = api_key or os.getenv("GROQ_API_KEY")
         self.model = model
-        self.client = None
-        self._init_client()
+        self.base_url = base_url
     
     def _init_client(self):
         try:
             from groq import Groq
-            self.client = Groq(api_key=self.api_key)
+            self.client = Groq(api_key=self.api_key, base_url=self.base_url)
             logger.info(f"Groq client initialized with model: {self.model}")
         except ImportError:
             logger.warning("Groq package not installed. Install with: pip install groq")
     
+    def _create_async_client(self) -> Any:
+        import groq
+        return groq.AsyncGroq(api_key=self.api_key, base_url=self.base_url,
+                              http_client=_create_async_http_client(groq))
+    
+    def _build_request(self, messages: List[Dict[str, str]], max_tokens: int,
+                       temperature: float, **kwargs) -> Dict[str, Any]:
+        model = kwargs.pop("model", None) or self.model
+        return _openai_request(model, messages, max_tokens, temperature,
+                               kwargs.pop("tools", None), **kwargs)
+    
     def generate(self, messages: List[Dict[str, str]], 
                  max_tokens: int = 4096,
                  temperature: float = 0.7,
@@ -220,46 +864,341 @@ class GroqLLM(LLMProvider):
         
         try:
             response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                **kwargs
+                **self._build_request(messages, max_tokens, temperature, **kwargs)
             )
-            return response.choices[0].message.content
+            return response.choices[0].message.content or ""
         except Exception as e:
             logger.error(f"Groq generation error: {e}")
             raise
     
+    async def agenerate(self, messages: List[Dict[str, str]], 
+                        max_tokens: int = 4096,
+                        temperature: float = 0.7,
+                        **kwargs) -> str:
+        response = await self.acomplete(messages, max_tokens, temperature, **kwargs)
+        return response.content
+    
+    async def acomplete(self, messages: List[Dict[str, str]], 
+                        max_tokens: int = 4096,
+                        temperature: float = 0.7,
+                        **kwargs) -> LLMResponse:
+        try:
+            response = await self._get_async_client().chat.completions.create(
+                **self._build_request(messages, max_tokens, temperature, **kwargs)
+            )
+        except Exception as e:
+            logger.error(f"Groq generation error: {e}")
+            raise
+        
+        return _openai_response(response.choices[0].message, response.usage)
+    
+    async def astream(self, messages: List[Dict[str, str]], 
+                      max_tokens: int = 4096,
+                      temperature: float = 0.7,
+                      **kwargs) -> AsyncIterator[str]:
+        try:
+            stream = await self._get_async_client().chat.completions.create(
+                stream=True,
+                **self._build_request(messages, max_tokens, temperature, **kwargs)
+            )
+            async for delta in _openai_stream(stream):
+                yield delta
+        except Exception as e:
+            logger.error(f"Groq streaming error: {e}")
+            raise
+    
+    MODELS = {
+        "mixtral-8x7b-32768": {"context_window": 32768},
+        "llama2-70b-4096": {"context_window": 4096},
+        "gemma-7b-it": {"context_window": 8192},
+    }
+    
     def get_available_models(self) -> List[str]:
-        return ["mixtral-8x7b-32768", "llama2-70b-4096", "gemma-7b-it"]
+        return list(self.MODELS)
+    
+    def get_model_info(self, model: Optional[str] = None) -> Dict[str, Any]:
+        return self.MODELS.get(model or self.model, {})
+
+
+class ResponseCache:
+    """Deterministic cache for LLM responses.
+    
+    Entries are keyed by a content hash of the normalized request and kept
+    in an in-memory LRU bounded by ``max_entries`` and an optional ``ttl``.
+    With ``disk_path`` set, entries are also written there (one JSON file
+    per key) and survive restarts. The disk tier is bounded by
+    ``max_disk_bytes``: once a write takes it over the limit, expired
+    entries and then the oldest ones are deleted. Expired and malformed
+    files are deleted when read. Requests with a non-zero temperature are
+    not cached unless ``force`` is set.
+    """
+    
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None,
+                 disk_path: Optional[str] = None, force: bool = False,
+                 max_disk_bytes: Optional[int] = RESPONSE_CACHE_DISK_BYTES):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_path = Path(disk_path) if disk_path else None
+        self.force = force
+        self.max_disk_bytes = max_disk_bytes
+        self._disk_bytes: Optional[int] = None  # measured on the first write
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        if self.disk_path:
+            self.disk_path.mkdir(parents=True, exist_ok=True)
+    
+    @staticmethod
+    def make_key(provider: str, model: str, messages: List[Dict[str, Any]],
+                 temperature: float, max_tokens: int, **kwargs) -> str:
+        """Hash the normalized request (cache markers are ignored)."""
+        request = {
+            "provider": provider,
+            "model": model,
+            "messages": [{k: v for k, v in m.items() if k != "cache_control"} for m in messages],
+            "temperature": float(temperature),
+            "max_tokens": max_tokens,
+            "kwargs": kwargs
+        }
+        normalized = json.dumps(request, sort_keys=True, separators=(",", ":"),
+                                ensure_ascii=False, default=str)
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    
+    def is_cacheable(self, temperature: float, force: bool = False) -> bool:
+        """Check whether a request with this temperature may be cached."""
+        if temperature == 0 or force or self.force:
+            return True
+        self.skipped += 1
+        return False
+    
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+    
+    def _disk_file(self, key: str) -> Path:
+        return self.disk_path / key[:2] / f"{key}.json"
+    
+    def get(self, key: str) -> Optional[LLMResponse]:
+        """Look up a response, checking memory first and then disk."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, response = entry
+                if not self._expired(created):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self._entries[key]
+        
+        if self.disk_path:
+            entry = self._read_disk(self._disk_file(key))
+            if entry is not None:
+                self._store(key, *entry)
+                self.disk_hits += 1
+                return entry[1]
+        
+        self.misses += 1
+        return None
+    
+    def _read_disk(self, filepath: Path) -> Optional[tuple]:
+        """Read ``(created, response)`` from disk; bad entries are deleted."""
+        try:
+            with open(filepath, 'r') as f:
+                data = json.load(f)
+            created = float(data["created"])
+            response = LLMResponse(**data["response"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Dropping malformed response cache entry {filepath}: {e}")
+            self._remove_disk_file(filepath)
+            return None
+        if self._expired(created):
+            self._remove_disk_file(filepath)
+            return None
+        return created, response
+    
+    def _remove_disk_file(self, filepath: Path):
+        try:
+            size = filepath.stat().st_size
+            filepath.unlink()
+        except OSError:
+            return
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes -= size
+    
+    def put(self, key: str, response: LLMResponse):
+        """Store a response in memory (and on disk if enabled)."""
+        created = time.time()
+        self._store(key, created, response)
+        
+        if self.disk_path:
+            filepath = self._disk_file(key)
+            filepath.parent.mkdir(exist_ok=True)
+            tmp_path = filepath.with_suffix(".tmp")
+            with open(tmp_path, 'w') as f:
+                json.dump({"created": created, "response": asdict(response)}, f)
+            try:
+                replaced = filepath.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            size = tmp_path.stat().st_size
+            os.replace(tmp_path, filepath)
+            self._account_disk_write(size - replaced)
+    
+    def _account_disk_write(self, delta: int):
+        if self.max_disk_bytes is None:
+            return
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += delta
+            over = self._disk_bytes is None or self._disk_bytes > self.max_disk_bytes
+        if over:
+            self._prune_disk()
+    
+    def _prune_disk(self):
+        """Measure the disk tier and delete entries while it is over its limit.
+        
+        Expired entries go first; then the oldest files are deleted until
+        the tier is down to ``RESPONSE_CACHE_DISK_LOW_WATERMARK`` of
+        ``max_disk_bytes``, so pruning happens once per many writes.
+        """
+        files = []
+        for filepath in self.disk_path.glob("*/*.json"):
+            try:
+                st = filepath.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, filepath))
+        total = sum(size for _, size, _ in files)
+        if total > self.max_disk_bytes:
+            target = self.max_disk_bytes * RESPONSE_CACHE_DISK_LOW_WATERMARK
+            files.sort()
+            for mtime, size, filepath in files:
+                if total <= target and not self._expired(mtime):
+                    break
+                try:
+                    filepath.unlink()
+                except OSError:
+                    continue
+                total -= size
+                self.disk_evictions += 1
+        with self._lock:
+            self._disk_bytes = total
+    
+    def _store(self, key: str, created: float, response: LLMResponse):
+        with self._lock:
+            self._entries[key] = (created, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Drop all in-memory entries (the disk tier is kept)."""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict:
+        """Get hit/miss counters."""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "evictions": self.evictions,
+            "disk_evictions": self.disk_evictions,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0
+        }
+
+
+# Built-in providers, created on first use and shared process-wide
+PROVIDER_FACTORIES: Dict[str, Callable[[], LLMProvider]] = {
+    "openai": OpenAILLM,
+    "anthropic": AnthropicLLM,
+    "groq": GroqLLM,
+}
+_shared_providers: Dict[str, LLMProvider] = {}
+_shared_providers_lock = threading.Lock()
+
+
+def register_provider(name: str, factory: Callable[[], LLMProvider]):
+    """Register a provider factory available to every LLMManager."""
+    PROVIDER_FACTORIES[name] = factory
+
+
+def get_shared_provider(name: str) -> LLMProvider:
+    """Get the process-wide instance of a registered provider."""
+    provider = _shared_providers.get(name)
+    if provider is None:
+        with _shared_providers_lock:
+            provider = _shared_providers.get(name)
+            if provider is None:
+                provider = PROVIDER_FACTORIES[name]()
+                _shared_providers[name] = provider
+    return provider
+
+
+class _LazyProviders(dict):
+    """Provider mapping that resolves registered providers on first access."""
+    
+    def __missing__(self, name: str) -> LLMProvider:
+        if name not in PROVIDER_FACTORIES:
+            raise KeyError(name)
+        provider = get_shared_provider(name)
+        self[name] = provider
+        return provider
+    
+    def __contains__(self, name: object) -> bool:
+        return dict.__contains__(self, name) or name in PROVIDER_FACTORIES
+    
+    def names(self) -> List[str]:
+        """Names of all available providers, created or not."""
+        return list(dict.fromkeys([*PROVIDER_FACTORIES, *self.keys()]))
 
 
 class LLMManager:
-    """Manager for LLM providers."""
+    """Manager for LLM providers.
+    
+    Built-in providers are shared by all managers in the process and only
+    created when first used. The model chosen with ``set_provider`` is kept
+    per manager and passed with each request, so sharing a provider does
+    not leak model choices between agents.
+    """
     
     def __init__(self):
-        self.providers: Dict[str, LLMProvider] = {}
-        self.current_provider: Optional[str] = None
-        self._init_default_providers()
+        self.providers: Dict[str, LLMProvider] = _LazyProviders()
+        self.current_provider: Optional[str] = "openai"
+        self.models: Dict[str, str] = {}
+        self.cache: Optional[ResponseCache] = None
     
-    def _init_default_providers(self):
-        """Initialize available LLM providers."""
-        try:
-            self.providers["openai"] = OpenAILLM()
-            self.current_provider = "openai"
-        except Exception as e:
-            logger.warning(f"Could not initialize OpenAI: {e}")
+    def fork(self) -> "LLMManager":
+        """Create a manager sharing this one's providers and response cache.
         
-        try:
-            self.providers["anthropic"] = AnthropicLLM()
-        except Exception as e:
-            logger.warning(f"Could not initialize Anthropic: {e}")
+        Provider and model selection stay independent in the fork.
+        """
+        manager = LLMManager()
+        manager.providers = self.providers
+        manager.current_provider = self.current_provider
+        manager.models = dict(self.models)
+        manager.cache = self.cache
+        return manager
+    
+    async def aclose(self):
+        """Close the async clients the created providers opened on this loop.
         
-        try:
-            self.providers["groq"] = GroqLLM()
-        except Exception as e:
-            logger.warning(f"Could not initialize Groq: {e}")
+        Providers are shared process-wide, so code that runs agents in its
+        own ``asyncio.run`` should await this before the loop ends.
+        """
+        for provider in list(self.providers.values()):
+            await provider.aclose()
     
     def set_provider(self, provider_name: str, model: Optional[str] = None):
         """Set the current LLM provider."""
@@ -267,34 +1206,194 @@ class LLMManager:
             raise ValueError(f"Provider {provider_name} not available")
         
         if model:
-            self.providers[provider_name].model = model
+            self.models[provider_name] = model
         
         self.current_provider = provider_name
         logger.info(f"Switched to provider: {provider_name}")
     
+    @property
+    def supports_tools(self) -> bool:
+        """Whether the current provider takes native tool schemas."""
+        return bool(self.current_provider) and getattr(
+            self.providers[self.current_provider], "supports_tools", False)
+    
+    @property
+    def model(self) -> Optional[str]:
+        """Model used for requests to the current provider."""
+        if not self.current_provider:
+            return None
+        return (self.models.get(self.current_provider)
+                or getattr(self.providers[self.current_provider], "model", None))
+    
+    def _request_kwargs(self, kwargs: Dict) -> Dict:
+        """Add the per-manager model override to request kwargs."""
+        model = self.models.get(self.current_provider)
+        if model and "model" not in kwargs:
+            return {**kwargs, "model": model}
+        return kwargs
+    
+    def enable_cache(self, max_entries: int = 1024, ttl: Optional[float] = None,
+                     storage: Optional["StorageManager"] = None, force: bool = False,
+                     max_disk_bytes: Optional[int] = RESPONSE_CACHE_DISK_BYTES):
+        """Enable the response cache, with a disk tier under ``storage``."""
+        disk_path = str(storage.base_path / "llm_cache") if storage else None
+        self.cache = ResponseCache(max_entries=max_entries, ttl=ttl, disk_path=disk_path,
+                                   force=force, max_disk_bytes=max_disk_bytes)
+    
+    def disable_cache(self):
+        """Disable the response cache."""
+        self.cache = None
+    
+    def _cache_key(self, messages: List[Dict[str, str]], max_tokens: int,
+                   temperature: float, force_cache: bool, kwargs: Dict) -> Optional[str]:
+        """Get the cache key for a request, or None if it is not cacheable."""
+        if self.cache is None or not self.cache.is_cacheable(temperature, force_cache):
+            return None
+        extra = {k: v for k, v in kwargs.items() if k != "model"}
+        return ResponseCache.make_key(
+            self.current_provider, kwargs.get("model") or self.model or "",
+            messages, temperature, max_tokens, **extra
+        )
+    
     def generate(self, messages: List[Dict[str, str]], 
                  max_tokens: int = 4096,
                  temperature: float = 0.7,
+                 force_cache: bool = False,
                  **kwargs) -> str:
         """Generate response using current provider."""
         if not self.current_provider:
             raise RuntimeError("No LLM provider configured")
         
-        return self.providers[self.current_provider].generate(
+        kwargs = self._request_kwargs(kwargs)
+        key = self._cache_key(messages, max_tokens, temperature, force_cache, kwargs)
+        if key:
+            cached = self.cache.get(key)
+            if cached:
+                return cached.content
+        
+        content = self.providers[self.current_provider].generate(
+            messages, max_tokens, temperature, **kwargs
+        )
+        if key:
+            self.cache.put(key, LLMResponse(content=content))
+        return content
+    
+    async def agenerate(self, messages: List[Dict[str, str]], 
+                        max_tokens: int = 4096,
+                        temperature: float = 0.7,
+                        force_cache: bool = False,
+                        **kwargs) -> str:
+        """Generate response using current provider without blocking the loop."""
+        response = await self.acomplete(messages, max_tokens, temperature,
+                                        force_cache=force_cache, **kwargs)
+        return response.content
+    
+    async def acomplete(self, messages: List[Dict[str, str]], 
+                        max_tokens: int = 4096,
+                        temperature: float = 0.7,
+                        force_cache: bool = False,
+                        **kwargs) -> LLMResponse:
+        """Generate response with token usage using current provider."""
+        if not self.current_provider:
+            raise RuntimeError("No LLM provider configured")
+        
+        kwargs = self._request_kwargs(kwargs)
+        key = self._cache_key(messages, max_tokens, temperature, force_cache, kwargs)
+        if key:
+            cached = self.cache.get(key)
+            if cached:
+                return cached
+        
+        response = await self.providers[self.current_provider].acomplete(
             messages, max_tokens, temperature, **kwargs
         )
+        if key:
+            self.cache.put(key, response)
+        return response
+    
+    async def astream(self, messages: List[Dict[str, str]], 
+                      max_tokens: int = 4096,
+                      temperature: float = 0.7,
+                      force_cache: bool = False,
+                      **kwargs) -> AsyncIterator[str]:
+        """Stream response deltas from the current provider.
+        
+        Text arrives as strings, native tool calls as ``ToolCallDelta``s
+        and token usage, if the provider reports it, as a final
+        ``LLMResponse``. A cached response is replayed as a single text
+        delta followed by one complete delta per tool call and its usage.
+        """
+        if not self.current_provider:
+            raise RuntimeError("No LLM provider configured")
+        
+        kwargs = self._request_kwargs(kwargs)
+        key = self._cache_key(messages, max_tokens, temperature, force_cache, kwargs)
+        if key:
+            cached = self.cache.get(key)
+            if cached:
+                if cached.content:
+                    yield cached.content
+                for index, tc in enumerate(cached.tool_calls or ()):
+                    arguments = tc["arguments"]
+                    if not isinstance(arguments, str):
+                        arguments = json.dumps(arguments, ensure_ascii=False)
+                    yield ToolCallDelta(index=index, id=tc["id"], name=tc["name"],
+                                        arguments=arguments, done=True)
+                if cached.total_tokens:
+                    yield replace(cached, content="", tool_calls=None)
+                return
+        
+        chunks = []
+        calls = ToolCallAccumulator()
+        tool_calls: List[Dict] = []
+        usage = LLMResponse(content="")
+        async for delta in self.providers[self.current_provider].astream(
+            messages, max_tokens, temperature, **kwargs
+        ):
+            if isinstance(delta, ToolCallDelta):
+                tool_calls.extend(calls.feed(delta))
+            elif isinstance(delta, LLMResponse):
+                usage = delta
+            else:
+                chunks.append(delta)
+            yield delta
+        
+        if key:
+            tool_calls.extend(calls.finish())
+            self.cache.put(key, replace(usage, content="".join(chunks),
+                                        tool_calls=tool_calls or None))
+    
+    def get_context_window(self, default: int = DEFAULT_CONTEXT_WINDOW) -> int:
+        """Get the context window size of the current model."""
+        if not self.current_provider:
+            return default
+        info = self.providers[self.current_provider].get_model_info(self.model)
+        return info.get("context_window", default)
     
     def list_providers(self) -> Dict[str, List[str]]:
         """List available providers and models."""
         return {
-            name: provider.get_available_models() 
-            for name, provider in self.providers.items()
+            name: self.providers[name].get_available_models() 
+            for name in self.providers.names()
+        }
+    
+    def get_stats(self) -> Dict:
+        """Get provider and response cache statistics."""
+        return {
+            "current_provider": self.current_provider,
+            "cache": self.cache.get_stats() if self.cache else None
         }
 
 
 class Tool(ABC):
     """Abstract base class for tools."""
     
+    # Tools that set this implement ``arun`` and run on the event loop
+    is_async: bool = False
+    # Whether results may be reused for identical arguments (see ToolResultCache)
+    cache_policy: ToolCachePolicy = ToolCachePolicy.NONE
+    cache_ttl: Optional[float] = None
+    
     @property
     @abstractmethod
     def name(self) -> str:
@@ -316,24 +1415,462 @@ class Tool(ABC):
     def run(self, params: Dict[str, Any]) -> str:
         """Execute the tool with given parameters."""
         pass
+    
+    async def arun(self, params: Dict[str, Any]) -> str:
+        """Execute the tool asynchronously (requires ``is_async``)."""
+        raise NotImplementedError(f"{self.name} does not support async execution")
 
 
-class ToolRegistry:
-    """Registry for available tools."""
-    
-    def __init__(self):
-        self.tools: Dict[str, Tool] = {}
-        self.tool_calls: List[ToolCall] = []
-    
-    def register(self, tool: Tool):
-        """Register a new tool."""
-        self.tools[tool.name] = tool
+@dataclass
+class _SharedArray:
+    """Handle of a numpy result left in shared memory by a tool worker."""
+    path: str
+
+
+# Warm tool instances of a worker process: package path -> (tool class, tool)
+_worker_tools: Dict[str, tuple] = {}
+
+
+def _worker_tool(tool_path: str) -> Tool:
+    tool_class = _shared_tool_loader.load_class(tool_path)
+    cached = _worker_tools.get(tool_path)
+    if cached is None or cached[0] is not tool_class:
+        cached = _worker_tools[tool_path] = (tool_class, tool_class())
+    return cached[1]
+
+
+def _tool_worker_init(tool_paths: List[str]):
+    """Process pool initializer: import and instantiate tools up front."""
+    for tool_path in tool_paths:
+        try:
+            _worker_tool(tool_path)
+        except Exception as e:
+            logger.warning(f"Tool worker could not preload {tool_path}: {e}")
+
+
+def _tool_worker_run(source: Any, params: Dict[str, Any], shm_threshold: int) -> Any:
+    """Run a tool call in a worker process.
+    
+    ``source`` is a tool package path (served by a warm instance) or a
+    picklable tool. Large numpy results are written to shared memory.
+    """
+    tool = _worker_tool(source) if isinstance(source, str) else source
+    result = tool.run(params)
+    np = sys.modules.get("numpy")
+    if (np is not None and isinstance(result, np.ndarray) and not result.dtype.hasobject
+            and result.nbytes >= shm_threshold):
+        fd, path = tempfile.mkstemp(prefix="cerebrum-", suffix=".npy", dir=SHM_DIR)
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, result, allow_pickle=False)
+        return _SharedArray(path)
+    return result
+
+
+def _receive_result(result: Any) -> Any:
+    """Map a shared-memory result into this process without copying."""
+    if isinstance(result, _SharedArray):
+        try:
+            return _numpy().load(result.path, mmap_mode="r+")
+        finally:
+            os.unlink(result.path)  # the mapping stays valid
+    return result
+
+
+def _tool_result_text(result: Any) -> str:
+    """Text of a tool result for the conversation.
+    
+    Tools may return other objects (e.g. arrays from process workers) to
+    direct callers; the model and memory get a string, summarized for
+    arrays.
+    """
+    if isinstance(result, str):
+        return result
+    np = sys.modules.get("numpy")
+    if np is not None and isinstance(result, np.ndarray):
+        return (f"array(shape={result.shape}, dtype={result.dtype}): "
+                f"{np.array2string(result, threshold=64, edgeitems=3)}")
+    if isinstance(result, (dict, list)):
+        try:
+            return json.dumps(result, ensure_ascii=False)
+        except (TypeError, ValueError):
+            pass
+    return str(result)
+
+
+def _discard_result(future):
+    """Free the shared memory of a result nobody will receive."""
+    if not future.cancelled() and future.exception() is None:
+        result = future.result()
+        if isinstance(result, _SharedArray):
+            try:
+                os.unlink(result.path)
+            except OSError:
+                pass
+
+
+class ToolExecutor:
+    """Runs tool calls without blocking the event loop.
+    
+    Async tools are awaited directly; blocking ``Tool.run`` implementations
+    are dispatched to a thread or process pool. A timed-out call is reported
+    as failed, but a pool worker that is already running it cannot be
+    interrupted and finishes in the background.
+    
+    In process mode the pool's workers share one job queue and keep warm
+    instances of tools loaded from packages (``tool_paths``, by default
+    every package loaded through the shared ``ToolLoader``); other tools
+    must be picklable and importable by the workers, which are started
+    with forkserver (spawn where unavailable), not fork. numpy results of
+    ``shm_threshold`` bytes or more are passed back through shared memory
+    and memory-mapped; agents and the tool call history record a summary
+    of them.
+    """
+    
+    def __init__(self, max_workers: int = 4, mode: str = "thread",
+                 timeout: Optional[float] = 60.0, tool_paths: Optional[List[str]] = None,
+                 shm_threshold: int = SHM_RESULT_THRESHOLD):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unsupported executor mode: {mode}")
+        self.max_workers = max_workers
+        self.mode = mode
+        self.timeout = timeout
+        self.tool_paths = tool_paths
+        self.shm_threshold = shm_threshold
+        self._pool: Optional[Executor] = None
+        self._sources: Dict[type, Any] = {}  # tool class -> package path or None
+    
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.mode == "process":
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                tool_paths = self.tool_paths
+                if tool_paths is None:
+                    tool_paths = _shared_tool_loader.loaded_paths()
+                # The pool starts inside a running event loop with live helper
+                # threads (e.g. asyncio.to_thread), which fork must not copy
+                method = ("forkserver" if "forkserver" in multiprocessing.get_all_start_methods()
+                          else "spawn")
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context(method),
+                                                 initializer=_tool_worker_init,
+                                                 initargs=(tool_paths,))
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix="cerebrum-tool")
+        return self._pool
+    
+    def _tool_source(self, tool: Tool) -> Any:
+        tool_class = type(tool)
+        if tool_class not in self._sources:
+            self._sources[tool_class] = _shared_tool_loader.path_of(tool_class)
+        return self._sources[tool_class] or tool
+    
+    async def run(self, tool: Tool, params: Dict[str, Any],
+                  timeout: Optional[float] = None) -> str:
+        """Run a tool call, raising ``asyncio.TimeoutError`` on timeout."""
+        timeout = timeout if timeout is not None else self.timeout
+        if tool.is_async:
+            return await asyncio.wait_for(tool.arun(params), timeout)
+        if self.mode == "thread":
+            loop = asyncio.get_running_loop()
+            call = loop.run_in_executor(self._get_pool(), tool.run, params)
+            return await asyncio.wait_for(call, timeout)
+        
+        future = self._get_pool().submit(_tool_worker_run, self._tool_source(tool),
+                                         params, self.shm_threshold)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            future.add_done_callback(_discard_result)
+            raise
+        return _receive_result(result)
+    
+    def shutdown(self, wait: bool = True):
+        """Shut down the worker pool (recreated on next use)."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+
+class ToolResultCache:
+    """LRU cache of tool results, honouring each tool's ``cache_policy``.
+    
+    Keys are the tool name and class and its canonicalized arguments (JSON
+    with sorted keys), so registries sharing the cache never see results of
+    a different tool registered under the same name, and a reloaded tool
+    module starts afresh. Only successful results are stored. TTL tools without a
+    ``cache_ttl`` use ``default_ttl``.
+    """
+    
+    def __init__(self, max_entries: int = 1024, default_ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def make_key(tool: Tool, params: Dict[str, Any]) -> Optional[tuple]:
+        """Canonical key for a call, or None if the tool is not cacheable."""
+        if tool.cache_policy == ToolCachePolicy.NONE:
+            return None
+        try:
+            canonical = json.dumps(params, sort_keys=True, separators=(",", ":"),
+                                   ensure_ascii=False)
+        except (TypeError, ValueError):
+            return None
+        return (tool.name, type(tool), canonical)
+    
+    def get(self, key: tuple) -> Optional[str]:
+        """Look up a result, dropping it if it has expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, result = entry
+                if expires is None or time.time() < expires:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                del self._entries[key]
+            self.misses += 1
+            return None
+    
+    def put(self, key: tuple, tool: Tool, result: str):
+        """Store a result, evicting the least recently used entries."""
+        expires = None
+        if tool.cache_policy == ToolCachePolicy.TTL:
+            expires = time.time() + (tool.cache_ttl if tool.cache_ttl is not None
+                                     else self.default_ttl)
+        with self._lock:
+            self._entries[key] = (expires, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, tool_name: Optional[str] = None):
+        """Drop cached results of one tool, or of all tools."""
+        with self._lock:
+            if tool_name is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == tool_name]:
+                    del self._entries[key]
+    
+    def get_stats(self) -> Dict:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class LatencyHistogram:
+    """Fixed-size log-bucketed latency histogram.
+    
+    Bucket bounds grow by ``2 ** (1 / 8)`` (about 9% relative error) from
+    one microsecond up to roughly an hour; recording is O(1) and memory
+    does not grow with the number of samples.
+    """
+    
+    MIN_LATENCY = 1e-6
+    BUCKETS_PER_DOUBLING = 8
+    NUM_BUCKETS = 256
+    
+    def __init__(self):
+        self.counts = array("Q", bytes(8 * self.NUM_BUCKETS))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def record(self, seconds: float):
+        """Add one sample."""
+        if seconds > self.MIN_LATENCY:
+            bucket = math.ceil(math.log2(seconds / self.MIN_LATENCY) * self.BUCKETS_PER_DOUBLING)
+            bucket = min(bucket, self.NUM_BUCKETS - 1)
+        else:
+            bucket = 0
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+    
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q``-th percentile (0-100)."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for bucket, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                bound = self.MIN_LATENCY * 2 ** (bucket / self.BUCKETS_PER_DOUBLING)
+                return min(bound, self.max)
+        return self.max
+    
+    def get_stats(self) -> Dict:
+        """Get latency summary in seconds."""
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max
+        }
+
+
+@dataclass
+class ToolUsageStats:
+    """Aggregate counters of one tool's calls."""
+    calls: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    cached: int = 0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    
+    def get_stats(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "cached": self.cached,
+            "latency": self.latency.get_stats()
+        }
+
+
+# Process-wide source of tool call IDs (unique across registries)
+_TOOL_CALL_IDS = count(1)
+
+_JSON_TYPES = {"object": dict, "array": list, "string": str, "boolean": bool, "null": type(None)}
+
+
+def _json_type_matches(value: Any, type_name: str) -> bool:
+    if type_name in ("number", "integer"):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False
+        return type_name == "number" or float(value).is_integer()
+    expected = _JSON_TYPES.get(type_name)
+    return expected is None or isinstance(value, expected)
+
+
+def _schema_errors(value: Any, schema: Dict, path: str) -> List[str]:
+    """Check a value against the JSON Schema subset used for tool parameters.
+    
+    Supports ``type``, ``enum``, ``properties``, ``required``,
+    ``additionalProperties: false`` and ``items``.
+    """
+    expected = schema.get("type")
+    if expected:
+        types = expected if isinstance(expected, list) else [expected]
+        if not any(_json_type_matches(value, t) for t in types):
+            return [f"{path} must be of type {' or '.join(types)}"]
+    errors = []
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path} must be one of {schema['enum']}")
+    if isinstance(value, dict):
+        properties = schema.get("properties", {})
+        for name in schema.get("required", ()):
+            if name not in value:
+                errors.append(f"{path}.{name} is required")
+        for name, item in value.items():
+            if name in properties:
+                errors.extend(_schema_errors(item, properties[name], f"{path}.{name}"))
+            elif schema.get("additionalProperties") is False:
+                errors.append(f"{path}.{name} is not allowed")
+    elif isinstance(value, list) and isinstance(schema.get("items"), dict):
+        for i, item in enumerate(value):
+            errors.extend(_schema_errors(item, schema["items"], f"{path}[{i}]"))
+    return errors
+
+
+def _tool_schema(tool: Tool) -> Dict:
+    """Provider-neutral schema of a tool from ``get_tool_call_format``."""
+    call_format = tool.get_tool_call_format() or {}
+    return {
+        "name": tool.name,
+        "description": call_format.get("description") or tool.description,
+        "parameters": call_format.get("parameters") or {"type": "object", "properties": {}}
+    }
+
+
+class ToolRegistry:
+    """Registry for available tools.
+    
+    Results of tools with a cache policy are memoized in ``cache``; calls
+    served from it are recorded with ``ToolCall.cached`` set.
+    
+    Only the last ``history_size`` calls are kept in ``tool_calls``;
+    ``usage`` holds per-tool counters and latency histograms over all
+    calls. Cached calls are counted but not included in the latencies.
+    """
+    
+    def __init__(self, executor: Optional[ToolExecutor] = None,
+                 cache: Optional[ToolResultCache] = None,
+                 history_size: int = TOOL_CALL_HISTORY):
+        self.tools: Dict[str, Tool] = {}
+        self.tool_calls = RingBuffer(history_size)
+        self.usage: Dict[str, ToolUsageStats] = {}
+        self._usage_lock = threading.Lock()
+        self.owns_executor = executor is None
+        self.executor = executor or ToolExecutor()
+        self.cache = cache or ToolResultCache()
+        self.version = 0  # bumped whenever the set of tools changes
+        self._schemas: Optional[tuple] = None  # (version, schemas by name, schema list)
+    
+    def fork(self) -> "ToolRegistry":
+        """Create a registry sharing this one's tool instances, executor and cache.
+        
+        Tools registered on the fork and its call history stay local to it.
+        """
+        registry = ToolRegistry(self.executor, self.cache, self.tool_calls.capacity)
+        registry.tools = dict(self.tools)
+        registry.version = self.version
+        registry._schemas = self._schemas
+        return registry
+    
+    def _get_schema_table(self) -> tuple:
+        if self._schemas is None or self._schemas[0] != self.version:
+            by_name = {name: _tool_schema(tool) for name, tool in self.tools.items()}
+            self._schemas = (self.version, by_name, list(by_name.values()))
+        return self._schemas
+    
+    def get_schemas(self) -> List[Dict]:
+        """Tool schemas (``name``, ``description``, ``parameters``) for the LLM.
+        
+        Built from ``get_tool_call_format`` only when the set of tools changes.
+        """
+        return self._get_schema_table()[2]
+    
+    def validate_arguments(self, tool_name: str, arguments: Any) -> List[str]:
+        """Check call arguments against the tool's parameter schema."""
+        schema = self._get_schema_table()[1].get(tool_name)
+        if schema is None:
+            return []
+        return _schema_errors(arguments, schema["parameters"], "arguments")
+    
+    def register(self, tool: Tool):
+        """Register a new tool."""
+        if tool.name in self.tools:
+            self.cache.invalidate(tool.name)
+        self.tools[tool.name] = tool
+        self.version += 1
         logger.info(f"Tool registered: {tool.name}")
     
     def unregister(self, tool_name: str):
         """Unregister a tool."""
         if tool_name in self.tools:
             del self.tools[tool_name]
+            self.cache.invalidate(tool_name)
+            self.version += 1
             logger.info(f"Tool unregistered: {tool_name}")
     
     def get(self, tool_name: str) -> Optional[Tool]:
@@ -344,169 +1881,1735 @@ class ToolRegistry:
         """List all registered tools."""
         return list(self.tools.keys())
     
-    def execute_tool(self, tool_name: str, params: Dict[str, Any]) -> str:
-        """Execute a tool and record the call."""
+    def _start_call(self, tool_name: str, params: Dict[str, Any]) -> tuple:
+        """Look up a tool and record a new executing call."""
         tool = self.get(tool_name)
         if not tool:
             raise ValueError(f"Tool not found: {tool_name}")
         
-        call_id = hashlib.md5(f"{tool_name}{time.time()}".encode()).hexdigest()
         tool_call = ToolCall(
             tool_name=tool_name,
             arguments=params,
-            call_id=call_id,
+            call_id=f"call_{next(_TOOL_CALL_IDS)}",
             status=ToolCallStatus.EXECUTING
         )
-        self.tool_calls.append(tool_call)
+        with self._usage_lock:
+            self.tool_calls.append(tool_call)
+        
+        errors = self.validate_arguments(tool_name, params)
+        if errors:
+            error = f"Invalid arguments for {tool_name}: {'; '.join(errors)}"
+            self._end_call(tool_call, ToolCallStatus.FAILED, error=error)
+            raise ValueError(error)
+        return tool, tool_call
+    
+    def _end_call(self, tool_call: ToolCall, status: ToolCallStatus,
+                  result: Any = None, error: Optional[str] = None):
+        """Complete a call and add it to the usage statistics.
+        
+        The history keeps the result as text, so arrays (possibly mapped
+        from shared memory) are not held by ``tool_calls``.
+        """
+        tool_call.status = status
+        tool_call.result = None if result is None else _tool_result_text(result)
+        tool_call.error = error
+        tool_call.end_time = time.time()
+        with self._usage_lock:
+            usage = self.usage.get(tool_call.tool_name)
+            if usage is None:
+                usage = self.usage[tool_call.tool_name] = ToolUsageStats()
+            usage.calls += 1
+            if status == ToolCallStatus.FAILED:
+                usage.failed += 1
+            else:
+                usage.succeeded += 1
+            if tool_call.cached:
+                usage.cached += 1
+            else:
+                usage.latency.record(tool_call.end_time - tool_call.start_time)
+    
+    def _cached_result(self, tool: Tool, tool_call: ToolCall) -> tuple:
+        """Return ``(cache key, result)``; completes the call on a cache hit."""
+        key = self.cache.make_key(tool, tool_call.arguments)
+        if key is None:
+            return None, None
+        result = self.cache.get(key)
+        if result is not None:
+            tool_call.cached = True
+            self._end_call(tool_call, ToolCallStatus.SUCCESS, result)
+        return key, result
+    
+    def _finish_call(self, tool: Tool, tool_call: ToolCall, key: Optional[tuple], result: str):
+        self._end_call(tool_call, ToolCallStatus.SUCCESS, result)
+        if key is not None:
+            self.cache.put(key, tool, result)
+    
+    def get_stats(self) -> Dict:
+        """Get per-tool call counters and latency percentiles."""
+        with self._usage_lock:
+            tools = {name: usage.get_stats() for name, usage in self.usage.items()}
+        return {
+            "calls": sum(t["calls"] for t in tools.values()),
+            "failed": sum(t["failed"] for t in tools.values()),
+            "cached": sum(t["cached"] for t in tools.values()),
+            "history": len(self.tool_calls),
+            "tools": tools
+        }
+    
+    def clear_history(self):
+        """Drop recorded calls and usage statistics."""
+        with self._usage_lock:
+            self.tool_calls.clear()
+            self.usage = {}
+    
+    def execute_tool(self, tool_name: str, params: Dict[str, Any]) -> str:
+        """Execute a tool and record the call."""
+        tool, tool_call = self._start_call(tool_name, params)
+        key, cached = self._cached_result(tool, tool_call)
+        if cached is not None:
+            return cached
         
         try:
             result = tool.run(params)
-            tool_call.status = ToolCallStatus.SUCCESS
-            tool_call.result = result
-            tool_call.end_time = time.time()
+            self._finish_call(tool, tool_call, key, result)
+            return result
+        except Exception as e:
+            self._end_call(tool_call, ToolCallStatus.FAILED, error=str(e))
+            raise
+    
+    async def aexecute_tool(self, tool_name: str, params: Dict[str, Any],
+                            timeout: Optional[float] = None) -> str:
+        """Execute a tool through the executor and record the call."""
+        tool, tool_call = self._start_call(tool_name, params)
+        key, cached = self._cached_result(tool, tool_call)
+        if cached is not None:
+            return cached
+        
+        try:
+            result = await self.executor.run(tool, params, timeout)
+            self._finish_call(tool, tool_call, key, result)
             return result
+        except asyncio.TimeoutError:
+            self._end_call(tool_call, ToolCallStatus.FAILED, error="Tool call timed out")
+            raise
         except Exception as e:
-            tool_call.status = ToolCallStatus.FAILED
-            tool_call.error = str(e)
-            tool_call.end_time = time.time()
+            self._end_call(tool_call, ToolCallStatus.FAILED, error=str(e))
             raise
 
 
-class MemoryManager:
-    """Manager for agent memory."""
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into case-folded word tokens."""
+    return _TOKEN_RE.findall(text.casefold())
+
+
+def _numpy():
+    """Import NumPy, which vector memory needs but the rest of the SDK does not."""
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("Vector memory requires numpy: pip install numpy")
+    return numpy
+
+
+class Embedder(ABC):
+    """Turns texts into unit-length float32 vectors of size ``dim``."""
+    
+    dim: int
+    
+    @abstractmethod
+    def embed(self, texts: List[str]) -> Any:
+        """Embed texts as an ``(len(texts), dim)`` float32 array."""
+        pass
+
+
+class FunctionEmbedder(Embedder):
+    """Embedder wrapping a function from texts to a list of vectors."""
+    
+    def __init__(self, fn: Callable[[List[str]], Any], dim: int):
+        self.fn = fn
+        self.dim = dim
+    
+    def embed(self, texts: List[str]) -> Any:
+        np = _numpy()
+        vectors = np.asarray(self.fn(texts), dtype=np.float32).reshape(len(texts), self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class HashingEmbedder(Embedder):
+    """Deterministic offline embedder using signed feature hashing.
+    
+    Tokens and token bigrams are hashed into ``dim`` buckets with
+    log-scaled counts. No model or network access is needed, and vectors
+    are stable across processes.
+    """
+    
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+    
+    def _features(self, text: str) -> Dict[int, float]:
+        tokens = tokenize(text)
+        grams = Counter(tokens)
+        grams.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        features: Dict[int, float] = {}
+        for gram, count in grams.items():
+            h = int.from_bytes(hashlib.blake2b(gram.encode(), digest_size=8).digest(), "little")
+            sign = 1.0 if h & 1 else -1.0
+            index = (h >> 1) % self.dim
+            features[index] = features.get(index, 0.0) + sign * (1.0 + math.log(count))
+        return features
+    
+    def embed(self, texts: List[str]) -> Any:
+        np = _numpy()
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for index, value in self._features(text).items():
+                vectors[row, index] = value
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class VectorIndex:
+    """Embeddings of memory messages in one contiguous float32 matrix.
+    
+    Search is a batched dot product over all rows (vectors are unit length,
+    so this is cosine similarity). With ``lsh_tables`` set, random
+    hyperplane LSH narrows the candidates first, trading exact recall for
+    speed on very large histories.
+    """
+    
+    def __init__(self, dim: int, capacity: int = 1024,
+                 lsh_tables: int = 0, lsh_bits: int = 12, seed: int = 0):
+        np = _numpy()
+        self.dim = dim
+        self.matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.count = 0
+        self._rows: Dict[int, int] = {}  # doc id -> matrix row
+        self._planes = None
+        self._buckets: List[Dict[int, set]] = []
+        self._signatures: Dict[int, Any] = {}
+        if lsh_tables:
+            rng = np.random.default_rng(seed)
+            self._planes = rng.standard_normal((lsh_tables, dim, lsh_bits)).astype(np.float32)
+            self._weights = 1 << np.arange(lsh_bits, dtype=np.int64)
+            self._buckets = [{} for _ in range(lsh_tables)]
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._rows
+    
+    def _signature(self, vectors: Any) -> Any:
+        """LSH bucket keys of shape ``(len(vectors), tables)``."""
+        np = _numpy()
+        bits = np.einsum("nd,tdb->ntb", vectors, self._planes) > 0
+        return bits.astype(np.int64) @ self._weights
+    
+    def add(self, doc_ids: List[int], vectors: Any):
+        """Append vectors for the given document ids."""
+        np = _numpy()
+        n = len(doc_ids)
+        needed = self.count + n
+        if needed > len(self.matrix):
+            capacity = max(needed, 2 * len(self.matrix))
+            matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+            matrix[:self.count] = self.matrix[:self.count]
+            ids = np.zeros(capacity, dtype=np.int64)
+            ids[:self.count] = self.ids[:self.count]
+            self.matrix, self.ids = matrix, ids
+        self.matrix[self.count:needed] = vectors
+        self.ids[self.count:needed] = doc_ids
+        for offset, doc_id in enumerate(doc_ids):
+            self._rows[doc_id] = self.count + offset
+        if self._planes is not None:
+            for doc_id, keys in zip(doc_ids, self._signature(vectors)):
+                self._signatures[doc_id] = keys
+                for buckets, key in zip(self._buckets, keys.tolist()):
+                    buckets.setdefault(key, set()).add(doc_id)
+        self.count = needed
+    
+    def remove(self, doc_id: int):
+        """Remove a document, moving the last row into its place."""
+        row = self._rows.pop(doc_id, None)
+        if row is None:
+            return
+        last = self.count - 1
+        if row != last:
+            moved = int(self.ids[last])
+            self.matrix[row] = self.matrix[last]
+            self.ids[row] = moved
+            self._rows[moved] = row
+        self.count = last
+        keys = self._signatures.pop(doc_id, None)
+        if keys is not None:
+            for buckets, key in zip(self._buckets, keys.tolist()):
+                bucket = buckets[key]
+                bucket.discard(doc_id)
+                if not bucket:
+                    del buckets[key]
+    
+    def clear(self):
+        """Remove all vectors, keeping the allocated matrix."""
+        self.count = 0
+        self._rows = {}
+        self._signatures = {}
+        self._buckets = [{} for _ in self._buckets]
+    
+    def _candidates(self, query: Any, k: int) -> Optional[Any]:
+        """Rows sharing an LSH bucket with the query, or None for a full scan."""
+        np = _numpy()
+        rows = set()
+        keys = self._signature(query[None, :])[0].tolist()
+        for buckets, key in zip(self._buckets, keys):
+            for doc_id in buckets.get(key, ()):
+                rows.add(self._rows[doc_id])
+        if len(rows) < k:
+            return None
+        return np.fromiter(rows, dtype=np.int64, count=len(rows))
+    
+    def search(self, query: Any, k: int = 5) -> List[tuple]:
+        """Return ``(doc_id, score)`` pairs for the ``k`` most similar vectors."""
+        np = _numpy()
+        if not self.count or k <= 0:
+            return []
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        rows = self._candidates(query, k) if self._planes is not None else None
+        if rows is None:
+            scores = self.matrix[:self.count] @ query
+            ids = self.ids[:self.count]
+        else:
+            scores = self.matrix[rows] @ query
+            ids = self.ids[rows]
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+
+class MemoryIndex:
+    """Inverted index over memory messages with BM25 ranking.
+    
+    Documents are identified by increasing integer ids, so ties in score
+    are broken in favour of newer messages.
+    """
+    
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.docs: Dict[int, AgentMessage] = {}
+        self.doc_terms: Dict[int, Dict[str, int]] = {}
+        self.doc_lengths: Dict[int, int] = {}
+        self.total_length = 0
+        self._next_id = 0
+    
+    def __len__(self) -> int:
+        return len(self.docs)
+    
+    def add(self, message: AgentMessage) -> int:
+        """Index a message and return its document id."""
+        doc_id = self._next_id
+        self._next_id += 1
+        terms = Counter(tokenize(message.content))
+        for token, tf in terms.items():
+            self.postings.setdefault(token, {})[doc_id] = tf
+        length = sum(terms.values())
+        self.docs[doc_id] = message
+        self.doc_terms[doc_id] = terms
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+        return doc_id
+    
+    def remove(self, doc_id: int):
+        """Drop a document from the index."""
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        del self.docs[doc_id]
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        for token in terms:
+            posting = self.postings[token]
+            del posting[doc_id]
+            if not posting:
+                del self.postings[token]
+    
+    def clear(self):
+        """Drop all documents (ids keep increasing)."""
+        self.postings = {}
+        self.docs = {}
+        self.doc_terms = {}
+        self.doc_lengths = {}
+        self.total_length = 0
+    
+    def search(self, query: str, n: int = 5) -> List[AgentMessage]:
+        """Return the ``n`` best BM25 matches for ``query``."""
+        if not self.docs:
+            return []
+        count = len(self.docs)
+        avg_length = self.total_length / count or 1.0
+        scores: Dict[int, float] = {}
+        for token in set(tokenize(query)):
+            posting = self.postings.get(token)
+            if not posting:
+                continue
+            df = len(posting)
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            k1, b = self.k1, self.b
+            lengths = self.doc_lengths
+            for doc_id, tf in posting.items():
+                norm = k1 * (1 - b + b * lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        best = heapq.nlargest(n, scores.items(), key=lambda item: (item[1], item[0]))
+        return [self.docs[doc_id] for doc_id, _ in best]
+
+
+class RingBuffer(Sequence):
+    """Bounded FIFO sequence with O(1) append and eviction of the oldest item.
+    
+    Slicing returns a ``RingView`` instead of copying. Items are numbered
+    by append order, so a view keeps referring to the same items while
+    newer ones are appended, and shrinks as its items are evicted.
+    """
+    
+    def __init__(self, capacity: int, items: Any = ()):
+        if capacity < 1:
+            raise ValueError("RingBuffer capacity must be at least 1")
+        self.capacity = capacity
+        self._items: List[Any] = []
+        self._head = 0  # storage slot of the oldest item
+        self._appended = 0  # total number of items ever appended
+        self.extend(items)
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    @property
+    def first_index(self) -> int:
+        """Append number of the oldest retained item."""
+        return self._appended - len(self._items)
+    
+    def append(self, item: Any) -> Any:
+        """Append an item; returns the evicted oldest item, or None."""
+        self._appended += 1
+        items = self._items
+        if len(items) < self.capacity:
+            items.append(item)
+            return None
+        evicted = items[self._head]
+        items[self._head] = item
+        self._head = (self._head + 1) % self.capacity
+        return evicted
+    
+    def extend(self, items: Any):
+        """Append several items, evicting as needed."""
+        for item in items:
+            self.append(item)
+    
+    def clear(self):
+        """Remove all items (append numbering continues)."""
+        self._items = []
+        self._head = 0
+    
+    def _get(self, index: int) -> Any:
+        """Item with append number ``index``."""
+        return self._items[(self._head + index - self.first_index) % self.capacity]
+    
+    def __getitem__(self, index: Any) -> Any:
+        size = len(self._items)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(size)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            base = self.first_index
+            return RingView(self, base + start, base + max(start, stop))
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("RingBuffer index out of range")
+        return self._items[(self._head + index) % self.capacity]
+    
+    def __iter__(self):
+        return chain(islice(self._items, self._head, None), islice(self._items, self._head))
+    
+    def __reversed__(self):
+        for index in range(len(self._items) - 1, -1, -1):
+            yield self[index]
+    
+    def __repr__(self) -> str:
+        return f"RingBuffer({list(self)!r}, capacity={self.capacity})"
+
+
+class RingView(Sequence):
+    """Live read-only window over a range of a ``RingBuffer``'s items."""
+    
+    def __init__(self, ring: RingBuffer, start: int, stop: int):
+        self.ring = ring
+        self.start = start
+        self.stop = stop
+    
+    def _bounds(self) -> tuple:
+        ring = self.ring
+        first = ring.first_index
+        return max(self.start, first), min(self.stop, first + len(ring))
+    
+    def __len__(self) -> int:
+        start, stop = self._bounds()
+        return max(0, stop - start)
+    
+    def __getitem__(self, index: Any) -> Any:
+        start, stop = self._bounds()
+        size = max(0, stop - start)
+        if isinstance(index, slice):
+            return [self.ring._get(start + i) for i in range(*index.indices(size))]
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("RingView index out of range")
+        return self.ring._get(start + index)
+    
+    def __iter__(self):
+        start, stop = self._bounds()
+        for index in range(start, stop):
+            yield self.ring._get(index)
+    
+    def __repr__(self) -> str:
+        return f"RingView({list(self)!r})"
+
+
+class ChainView(Sequence):
+    """Read-only concatenation of sequences, without copying them."""
+    
+    def __init__(self, *parts: Sequence):
+        self.parts = parts
+    
+    def __len__(self) -> int:
+        return sum(len(part) for part in self.parts)
+    
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index >= 0:
+            for part in self.parts:
+                if index < len(part):
+                    return part[index]
+                index -= len(part)
+        raise IndexError("ChainView index out of range")
+    
+    def __iter__(self):
+        return chain.from_iterable(self.parts)
+    
+    def __reversed__(self):
+        return chain.from_iterable(reversed(part) for part in reversed(self.parts))
+
+
+class MessageStore(Sequence):
+    """Compact, append-only columnar store of messages.
+    
+    Roles are interned to small integer codes, timestamps are packed in an
+    ``array('d')`` and content is kept as UTF-8 in one shared buffer with
+    offsets. Tool calls, tool call ids and metadata, which most messages
+    lack, are kept sparsely. Indexing returns ``MessageView`` objects that
+    read like ``AgentMessage``.
+    """
+    
+    def __init__(self, messages: Any = ()):
+        self.role_names: List[str] = []
+        self._role_codes: Dict[str, int] = {}
+        self.roles = array('H')
+        self.timestamps = array('d')
+        self.offsets = array('Q', [0])
+        self.content = bytearray()
+        self._extras: Dict[int, tuple] = {}  # index -> (tool_calls, tool_call_id, metadata)
+        self.extend(messages)
+    
+    def __len__(self) -> int:
+        return len(self.timestamps)
+    
+    def append(self, message: AgentMessage) -> int:
+        """Store a copy of ``message`` and return its index."""
+        index = len(self.timestamps)
+        code = self._role_codes.get(message.role)
+        if code is None:
+            code = self._role_codes[message.role] = len(self.role_names)
+            self.role_names.append(message.role)
+        self.roles.append(code)
+        self.timestamps.append(message.timestamp)
+        self.content += message.content.encode("utf-8")
+        self.offsets.append(len(self.content))
+        metadata = _message_metadata(message)
+        if message.tool_calls or message.tool_call_id or metadata:
+            self._extras[index] = (message.tool_calls, message.tool_call_id, metadata)
+        return index
+    
+    def extend(self, messages: Any):
+        """Append several messages."""
+        for message in messages:
+            self.append(message)
+    
+    def clear(self):
+        """Remove all messages."""
+        self.__init__()
+    
+    def __getitem__(self, index: Any) -> Any:
+        size = len(self.timestamps)
+        if isinstance(index, slice):
+            return [MessageView(self, i) for i in range(*index.indices(size))]
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("MessageStore index out of range")
+        return MessageView(self, index)
+    
+    def __iter__(self):
+        for index in range(len(self.timestamps)):
+            yield MessageView(self, index)
+    
+    def role_at(self, index: int) -> str:
+        return self.role_names[self.roles[index]]
+    
+    def content_at(self, index: int) -> str:
+        return self.content[self.offsets[index]:self.offsets[index + 1]].decode("utf-8")
+    
+    def extras_at(self, index: int) -> tuple:
+        return self._extras.get(index, (None, None, None))
+    
+    @property
+    def nbytes(self) -> int:
+        """Approximate size of the packed columns in bytes."""
+        return (len(self.content) + self.roles.itemsize * len(self.roles)
+                + self.timestamps.itemsize * len(self.timestamps)
+                + self.offsets.itemsize * len(self.offsets))
+
+
+class MessageView:
+    """Read-only ``AgentMessage``-like view of one ``MessageStore`` entry."""
+    
+    __slots__ = ("store", "index")
+    
+    def __init__(self, store: MessageStore, index: int):
+        self.store = store
+        self.index = index
+    
+    @property
+    def role(self) -> str:
+        return self.store.role_at(self.index)
+    
+    @property
+    def content(self) -> str:
+        return self.store.content_at(self.index)
+    
+    @property
+    def timestamp(self) -> float:
+        return self.store.timestamps[self.index]
+    
+    @property
+    def tool_calls(self) -> Optional[List[Dict]]:
+        return self.store.extras_at(self.index)[0]
+    
+    @property
+    def tool_call_id(self) -> Optional[str]:
+        return self.store.extras_at(self.index)[1]
+    
+    @property
+    def metadata(self) -> Dict:
+        return self.store.extras_at(self.index)[2] or {}
+    
+    def to_message(self) -> AgentMessage:
+        """Materialize a standalone ``AgentMessage``."""
+        tool_calls, tool_call_id, metadata = self.store.extras_at(self.index)
+        return AgentMessage(role=self.role, content=self.content, tool_calls=tool_calls,
+                            tool_call_id=tool_call_id, timestamp=self.timestamp,
+                            metadata=dict(metadata) if metadata else None)
+    
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, MessageView):
+            return self.to_message() == other.to_message()
+        if isinstance(other, AgentMessage):
+            return self.to_message() == other
+        return NotImplemented
+    
+    def __repr__(self) -> str:
+        return f"MessageView({self.index}, role={self.role!r}, content={self.content!r})"
+
+
+class MemoryManager:
+    """Manager for agent memory.
+    
+    Messages are indexed as they are added; ``search`` ranks them with BM25.
+    With an ``embedder``, messages are also embedded into ``embeddings``
+    and ``recall`` finds them by vector similarity (``lsh_tables`` enables
+    the approximate index).
+    
+    Both tiers are ring buffers of ``max_entries`` messages: the oldest
+    short-term message moves to long-term, and the oldest long-term one is
+    dropped, in constant time.
+    
+    Memory is persisted as an append-only JSONL log. Once saved to (or
+    loaded from) a file, later saves to it only append the operations made
+    since, and the log is rewritten when it grows well past the live
+    message count. Loading is lazy: the log is replayed on first read, so an
+    agent can resume, add messages and save without reading its history.
+    """
+    
+    def __init__(self, max_entries: int = 1000, embedder: Optional[Embedder] = None,
+                 lsh_tables: int = 0):
+        self._short_term = RingBuffer(max_entries)
+        self._long_term = RingBuffer(max_entries)
+        self.max_entries = max_entries
+        self.embedder = embedder
+        self.lsh_tables = lsh_tables
+        self.embeddings: Optional[VectorIndex] = self._new_vector_index()
+        self.index = MemoryIndex()
+        # Index document ids, parallel to short_term / long_term
+        self._short_ids = RingBuffer(max_entries)
+        self._long_ids = RingBuffer(max_entries)
+        # Persistence state (see save_to_disk / load_from_disk)
+        self._log_path: Optional[str] = None
+        self._log_records: Optional[int] = None  # None until counted
+        self._pending: List[tuple] = []  # (op, memory_type, message) not yet in the log
+        self._unloaded_path: Optional[str] = None  # log to replay on first read
+    
+    @property
+    def short_term(self) -> RingBuffer:
+        self._hydrate()
+        return self._short_term
+    
+    @property
+    def long_term(self) -> RingBuffer:
+        self._hydrate()
+        return self._long_term
+    
+    def _new_vector_index(self) -> Optional[VectorIndex]:
+        if self.embedder is None:
+            return None
+        return VectorIndex(self.embedder.dim, lsh_tables=self.lsh_tables)
+    
+    def add(self, message: AgentMessage, memory_type: str = "short"):
+        """Add a message to memory."""
+        if self._log_path is not None:
+            self._pending.append(("add", memory_type, message))
+        if self._unloaded_path is not None:
+            return
+        doc_id = self.index.add(message)
+        if self.embeddings is not None:
+            self.embeddings.add([doc_id], self.embedder.embed([message.content]))
+        if memory_type == "short":
+            oldest = self._short_term.append(message)
+            oldest_id = self._short_ids.append(doc_id)
+            if oldest_id is not None:
+                # Move oldest to long-term
+                self._add_long(oldest, oldest_id)
+        else:
+            self._add_long(message, doc_id)
+    
+    def _add_long(self, message: AgentMessage, doc_id: int):
+        self._long_term.append(message)
+        evicted_id = self._long_ids.append(doc_id)
+        if evicted_id is not None:
+            self._forget(evicted_id)
+    
+    def _forget(self, doc_id: int):
+        self.index.remove(doc_id)
+        if self.embeddings is not None:
+            self.embeddings.remove(doc_id)
+    
+    def get_recent(self, n: int = 10) -> Sequence:
+        """Get recent messages (a live view, not a copy)."""
+        return self.short_term[-n:]
+    
+    def get_all(self) -> Sequence:
+        """Get all messages, oldest first (a view, not a copy)."""
+        return ChainView(self.long_term, self.short_term)
+    
+    def clear(self, memory_type: str = "short"):
+        """Clear memory."""
+        if self._log_path is not None:
+            self._pending.append(("clear", memory_type, None))
+        if self._unloaded_path is not None:
+            return
+        if memory_type == "short":
+            messages, ids = self._short_term, self._short_ids
+        else:
+            messages, ids = self._long_term, self._long_ids
+        for doc_id in ids:
+            self._forget(doc_id)
+        messages.clear()
+        ids.clear()
+    
+    def search(self, query: str, n: int = 5) -> List[AgentMessage]:
+        """Search memory, best BM25 matches first.
+        
+        Queries without word characters fall back to substring matching,
+        newest first.
+        """
+        self._hydrate()
+        if tokenize(query):
+            return self.index.search(query, n)
+        results = []
+        for msg in reversed(self.get_all()):
+            if query.lower() in msg.content.lower():
+                results.append(msg)
+                if len(results) >= n:
+                    break
+        return results
+    
+    def recall(self, query: str, n: int = 5) -> List[AgentMessage]:
+        """Find the messages most similar to ``query`` by embedding."""
+        if self.embeddings is None:
+            raise RuntimeError("recall requires a MemoryManager created with an embedder")
+        self._hydrate()
+        query_vector = self.embedder.embed([query])[0]
+        return [self.index.docs[doc_id]
+                for doc_id, _ in self.embeddings.search(query_vector, n)]
+    
+    def _reindex(self):
+        """Rebuild the search indexes from the memory tiers."""
+        self.index = MemoryIndex()
+        self._long_ids = RingBuffer(self.max_entries, [self.index.add(m) for m in self._long_term])
+        self._short_ids = RingBuffer(self.max_entries, [self.index.add(m) for m in self._short_term])
+        self.embeddings = self._new_vector_index()
+        messages = ChainView(self._long_term, self._short_term)
+        if self.embeddings is not None and len(messages):
+            self.embeddings.add(list(chain(self._long_ids, self._short_ids)),
+                                self.embedder.embed([m.content for m in messages]))
+    
+    def _replay(self, op: str, memory_type: str, message: Optional[AgentMessage]):
+        """Apply a logged operation to the tiers only (indexes are rebuilt after)."""
+        if memory_type == "short":
+            tier = self._short_term
+        else:
+            tier = self._long_term
+        if op == "clear":
+            tier.clear()
+            return
+        oldest = tier.append(message)
+        if oldest is not None and tier is self._short_term:
+            self._long_term.append(oldest)
+    
+    def _hydrate(self):
+        """Replay a lazily loaded log, then any operations made since loading."""
+        path = self._unloaded_path
+        if path is None:
+            return
+        self._unloaded_path = None
+        records = 0
+        with open(path, 'r') as f:
+            next(f)  # header
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                message = record.get("message")
+                self._replay(record["op"], record["tier"],
+                             AgentMessage(**message) if message else None)
+                records += 1
+        for op, memory_type, message in self._pending:
+            self._replay(op, memory_type, message)
+        self._log_records = records
+        self._reindex()
+        logger.info(f"Memory log {path} replayed ({records} records)")
+    
+    @staticmethod
+    def _log_line(op: str, memory_type: str, message: Optional[AgentMessage]) -> str:
+        record: Dict[str, Any] = {"op": op, "tier": memory_type}
+        if message is not None:
+            record["message"] = _message_record(message)
+        return _LOG_ENCODER.encode(record) + "\n"
+    
+    def compact(self, filepath: Optional[str] = None):
+        """Rewrite the log as a snapshot of the live messages."""
+        filepath = filepath or self._log_path
+        if filepath is None:
+            raise ValueError("No memory log to compact")
+        self._hydrate()
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps({"format": MEMORY_LOG_FORMAT, "version": 1}) + "\n")
+            for message in self._long_term:
+                f.write(self._log_line("add", "long", message))
+            for message in self._short_term:
+                f.write(self._log_line("add", "short", message))
+        os.replace(tmp_path, filepath)
+        self._log_path = filepath
+        self._log_records = len(self._long_term) + len(self._short_term)
+        self._pending = []
+    
+    def save_to_disk(self, filepath: str):
+        """Save memory to disk.
+        
+        Appends only the operations made since the last save or load of the
+        same file; otherwise (or when compaction is due) writes a snapshot.
+        """
+        if filepath != self._log_path or not os.path.exists(filepath):
+            self.compact(filepath)
+            logger.info(f"Memory saved to {filepath}")
+            return
+        if self._pending:
+            with open(filepath, 'a') as f:
+                f.writelines(self._log_line(*entry) for entry in self._pending)
+            if self._log_records is not None:
+                self._log_records += len(self._pending)
+            self._pending = []
+        if self._unloaded_path is None and self._log_records is not None:
+            live = len(self._long_term) + len(self._short_term)
+            if self._log_records > max(MEMORY_LOG_COMPACT_MIN, MEMORY_LOG_COMPACT_RATIO * live):
+                self.compact(filepath)
+        logger.info(f"Memory saved to {filepath}")
+    
+    def load_from_disk(self, filepath: str, lazy: bool = True):
+        """Load memory from disk.
+        
+        Memory logs are replayed on first read unless ``lazy`` is False.
+        Files in the older single-JSON format are read eagerly and are
+        rewritten as a log on the next save.
+        """
+        with open(filepath, 'r') as f:
+            first_line = f.readline()
+        try:
+            header = json.loads(first_line)
+        except json.JSONDecodeError:
+            header = None
+        
+        self._short_term = RingBuffer(self.max_entries)
+        self._long_term = RingBuffer(self.max_entries)
+        self._pending = []
+        self._log_records = None
+        if isinstance(header, dict) and header.get("format") == MEMORY_LOG_FORMAT:
+            self._log_path = filepath
+            self._unloaded_path = filepath
+            self._reindex()
+            if not lazy:
+                self._hydrate()
+        else:
+            with open(filepath, 'r') as f:
+                data = json.load(f)
+            self._log_path = None
+            self._unloaded_path = None
+            self._long_term.extend(AgentMessage(**m) for m in data.get("long_term", []))
+            self._short_term.extend(AgentMessage(**m) for m in data.get("short_term", []))
+            self._reindex()
+        logger.info(f"Memory loaded from {filepath}")
+
+
+# Storage directories already created by this process
+_created_dirs: set = set()
+
+
+class StorageBackend(ABC):
+    """Byte-level store of named entries (``<key>.<format>``) for StorageManager."""
+    
+    human_readable = False  # whether JSON is written indented
+    file_per_entry = False  # whether file_path() can return paths
+    
+    @abstractmethod
+    def write(self, name: str, data: bytes):
+        """Atomically create or replace an entry."""
+        pass
+    
+    @abstractmethod
+    def read(self, name: str) -> bytes:
+        """Read an entry, raising ``FileNotFoundError`` if it is missing."""
+        pass
+    
+    @abstractmethod
+    def delete(self, name: str) -> bool:
+        """Delete an entry; returns whether it existed."""
+        pass
+    
+    @abstractmethod
+    def names(self, suffix: str = "") -> List[str]:
+        """Names of all entries ending in ``suffix``."""
+        pass
+    
+    def write_many(self, entries: Dict[str, bytes]):
+        """Create or replace several entries."""
+        for name, data in entries.items():
+            self.write(name, data)
+    
+    def read_many(self, names: List[str]) -> Dict[str, bytes]:
+        """Read several entries, raising ``FileNotFoundError`` if any is missing."""
+        return {name: self.read(name) for name in names}
+    
+    def exists(self, name: str) -> bool:
+        """Whether an entry exists."""
+        return name in self.names(name)
+    
+    def file_path(self, name: str) -> Optional[Path]:
+        """Path of an entry stored as its own file (for mmap), else None."""
+        return None
+    
+    def location(self, name: str) -> str:
+        """Human-readable location of an entry."""
+        return name
+    
+    def close(self):
+        """Release any resources held by the backend."""
+        pass
+
+
+class DirectoryBackend(StorageBackend):
+    """One file per entry in a directory (the original storage layout).
+    
+    With ``durable`` each file is fsynced before it replaces the old one,
+    and the directory is fsynced once per write or batch.
+    """
+    
+    human_readable = True
+    file_per_entry = True
+    
+    def __init__(self, base_path: Path, durable: bool = False):
+        self.base_path = base_path
+        self.durable = durable
+    
+    def _write_tmp(self, name: str, data: bytes) -> Path:
+        # Unique per writer so concurrent saves of one key cannot collide
+        tmp_path = self.base_path / f".{name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            f = open(tmp_path, 'wb')
+        except FileNotFoundError:
+            # Directory removed since it was created
+            self.base_path.mkdir(parents=True, exist_ok=True)
+            f = open(tmp_path, 'wb')
+        with f:
+            f.write(data)
+            if self.durable:
+                f.flush()
+                os.fsync(f.fileno())
+        return tmp_path
+    
+    def _sync_dir(self):
+        try:
+            fd = os.open(self.base_path, os.O_RDONLY)
+        except OSError:
+            return  # directories cannot be opened on this platform
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    
+    def write(self, name: str, data: bytes):
+        os.replace(self._write_tmp(name, data), self.base_path / name)
+        if self.durable:
+            self._sync_dir()
+    
+    def write_many(self, entries: Dict[str, bytes]):
+        for name, data in entries.items():
+            os.replace(self._write_tmp(name, data), self.base_path / name)
+        if self.durable:
+            self._sync_dir()
+    
+    def read(self, name: str) -> bytes:
+        path = self.base_path / name
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {path}")
+    
+    def delete(self, name: str) -> bool:
+        try:
+            (self.base_path / name).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+    
+    def exists(self, name: str) -> bool:
+        return os.path.isfile(self.base_path / name)
+    
+    def file_path(self, name: str) -> Optional[Path]:
+        path = self.base_path / name
+        return path if path.is_file() else None
+    
+    def names(self, suffix: str = "") -> List[str]:
+        with os.scandir(self.base_path) as entries:
+            return [e.name for e in entries
+                    if e.name.endswith(suffix) and not e.name.startswith(".") and e.is_file()
+                    and not e.name.startswith(SQLiteBackend.FILENAME)]
+    
+    def location(self, name: str) -> str:
+        return str(self.base_path / name)
+
+
+class SQLiteBackend(StorageBackend):
+    """All entries in one SQLite database in WAL mode.
+    
+    Each write is its own transaction, lookups and deletes go through the
+    primary key index, and listing keys never touches the filesystem.
+    """
+    
+    FILENAME = "storage.db"
+    
+    def __init__(self, base_path: Path, durable: bool = False):
+        import sqlite3
+        base_path.mkdir(parents=True, exist_ok=True)
+        self.path = base_path / self.FILENAME
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL only syncs the WAL at checkpoints; FULL syncs every commit
+        self._conn.execute(f"PRAGMA synchronous={'FULL' if durable else 'NORMAL'}")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS entries "
+                           "(name TEXT PRIMARY KEY, data BLOB NOT NULL) WITHOUT ROWID")
+    
+    def write(self, name: str, data: bytes):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO entries (name, data) VALUES (?, ?)",
+                               (name, data))
+    
+    def write_many(self, entries: Dict[str, bytes]):
+        """Write all entries in one transaction (a single WAL commit)."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO entries (name, data) VALUES (?, ?)",
+                                       entries.items())
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+    
+    def read(self, name: str) -> bytes:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM entries WHERE name = ?",
+                                     (name,)).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"Entry not found: {self.location(name)}")
+        return row[0]
+    
+    def read_many(self, names: List[str]) -> Dict[str, bytes]:
+        found: Dict[str, bytes] = {}
+        with self._lock:
+            for i in range(0, len(names), 500):  # stay under SQLite's parameter limit
+                chunk = names[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(self._conn.execute(
+                    f"SELECT name, data FROM entries WHERE name IN ({placeholders})", chunk))
+        for name in names:
+            if name not in found:
+                raise FileNotFoundError(f"Entry not found: {self.location(name)}")
+        return {name: found[name] for name in names}
+    
+    def delete(self, name: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM entries WHERE name = ?", (name,))
+        return cursor.rowcount > 0
+    
+    def exists(self, name: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM entries WHERE name = ?", (name,)).fetchone()
+        return row is not None
+    
+    def names(self, suffix: str = "") -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT name FROM entries").fetchall()
+        return [name for (name,) in rows if name.endswith(suffix)]
+    
+    def location(self, name: str) -> str:
+        return f"{self.path}#{name}"
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _optional_import(module: str, feature: str) -> Any:
+    """Import an optional dependency, explaining which feature needs it."""
+    import importlib
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        raise RuntimeError(f"{feature} requires the '{module.split('.')[0]}' package")
+
+
+class StorageCodec(ABC):
+    """Serializes values for one storage format (the entry's file extension)."""
+    
+    format: str
+    
+    @abstractmethod
+    def encode(self, data: Any) -> bytes:
+        pass
+    
+    @abstractmethod
+    def decode(self, raw: bytes) -> Any:
+        pass
+    
+    def decode_file(self, path: Path) -> Any:
+        """Decode an entry stored as a file; codecs override this to mmap."""
+        with open(path, 'rb') as f:
+            return self.decode(f.read())
+
+
+class JsonCodec(StorageCodec):
+    format = "json"
+    
+    def __init__(self, indent: Optional[int] = None):
+        self.indent = indent
+    
+    def encode(self, data: Any) -> bytes:
+        return json.dumps(data, indent=self.indent).encode("utf-8")
+    
+    def decode(self, raw: bytes) -> Any:
+        return json.loads(raw)
+
+
+class TextCodec(StorageCodec):
+    format = "txt"
+    
+    def encode(self, data: Any) -> bytes:
+        return str(data).encode("utf-8")
+    
+    def decode(self, raw: bytes) -> Any:
+        return bytes(raw).decode("utf-8")
+
+
+class MsgpackCodec(StorageCodec):
+    format = "msgpack"
+    
+    def encode(self, data: Any) -> bytes:
+        return _optional_import("msgpack", "msgpack storage").packb(data, use_bin_type=True)
+    
+    def decode(self, raw: bytes) -> Any:
+        return _optional_import("msgpack", "msgpack storage").unpackb(raw, raw=False)
+
+
+class NpyCodec(StorageCodec):
+    """One NumPy array in ``.npy`` format, loaded without copying.
+    
+    Files are memory-mapped read-only; entries read as bytes (e.g. from
+    SQLite) become read-only arrays over those bytes.
+    """
+    
+    format = "npy"
+    
+    def encode(self, data: Any) -> bytes:
+        np = _optional_import("numpy", "npy storage")
+        buffer = io.BytesIO()
+        np.save(buffer, np.asarray(data), allow_pickle=False)
+        return buffer.getvalue()
+    
+    def decode(self, raw: bytes) -> Any:
+        np = _optional_import("numpy", "npy storage")
+        npy_format = _optional_import("numpy.lib.format", "npy storage")
+        header = io.BytesIO(raw)
+        version = npy_format.read_magic(header)
+        if version == (1, 0):
+            shape, fortran_order, dtype = npy_format.read_array_header_1_0(header)
+        else:
+            shape, fortran_order, dtype = npy_format.read_array_header_2_0(header)
+        count = math.prod(shape)
+        array = np.frombuffer(raw, dtype=dtype, count=count, offset=header.tell())
+        return array.reshape(shape, order="F" if fortran_order else "C")
+    
+    def decode_file(self, path: Path) -> Any:
+        np = _optional_import("numpy", "npy storage")
+        return np.load(path, mmap_mode="r", allow_pickle=False)
+
+
+class NpzCodec(StorageCodec):
+    """A dict of NumPy arrays in ``.npz`` format; arrays are read on access."""
+    
+    format = "npz"
+    
+    def encode(self, data: Any) -> bytes:
+        np = _optional_import("numpy", "npz storage")
+        buffer = io.BytesIO()
+        np.savez(buffer, **data)
+        return buffer.getvalue()
+    
+    def decode(self, raw: bytes) -> Any:
+        np = _optional_import("numpy", "npz storage")
+        return np.load(io.BytesIO(raw), allow_pickle=False)
+    
+    def decode_file(self, path: Path) -> Any:
+        np = _optional_import("numpy", "npz storage")
+        return np.load(path, allow_pickle=False)
+
+
+def _arrow_table(data: Any) -> Any:
+    """Convert a pandas DataFrame or dict of columns to an Arrow table."""
+    pa = _optional_import("pyarrow", "Arrow storage")
+    if isinstance(data, pa.Table):
+        return data
+    if type(data).__name__ == "DataFrame":
+        return pa.Table.from_pandas(data)
+    return pa.table(data)
+
+
+def _from_arrow_table(table: Any) -> Any:
+    """Return DataFrames as they were saved, other tables as Arrow tables."""
+    if table.schema.metadata and b"pandas" in table.schema.metadata:
+        return table.to_pandas()
+    return table
+
+
+class ArrowCodec(StorageCodec):
+    """Tables in the Arrow IPC file format; files are memory-mapped."""
+    
+    format = "arrow"
+    
+    def encode(self, data: Any) -> bytes:
+        pa = _optional_import("pyarrow", "Arrow storage")
+        table = _arrow_table(data)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    
+    def decode(self, raw: bytes) -> Any:
+        pa = _optional_import("pyarrow", "Arrow storage")
+        return _from_arrow_table(pa.ipc.open_file(pa.py_buffer(raw)).read_all())
+    
+    def decode_file(self, path: Path) -> Any:
+        pa = _optional_import("pyarrow", "Arrow storage")
+        return _from_arrow_table(pa.ipc.open_file(pa.memory_map(str(path))).read_all())
+
+
+class ParquetCodec(StorageCodec):
+    """Tables in Parquet format (compressed, columnar)."""
+    
+    format = "parquet"
+    
+    def encode(self, data: Any) -> bytes:
+        pa = _optional_import("pyarrow", "Parquet storage")
+        pq = _optional_import("pyarrow.parquet", "Parquet storage")
+        sink = pa.BufferOutputStream()
+        pq.write_table(_arrow_table(data), sink)
+        return sink.getvalue().to_pybytes()
+    
+    def decode(self, raw: bytes) -> Any:
+        pa = _optional_import("pyarrow", "Parquet storage")
+        pq = _optional_import("pyarrow.parquet", "Parquet storage")
+        return _from_arrow_table(pq.read_table(pa.py_buffer(raw)))
+    
+    def decode_file(self, path: Path) -> Any:
+        pq = _optional_import("pyarrow.parquet", "Parquet storage")
+        return _from_arrow_table(pq.read_table(str(path), memory_map=True))
+
+
+class CompressedCodec(StorageCodec):
+    """Wraps another codec with zstd or lz4 compression (``<format>.zst`` / ``.lz4``)."""
+    
+    COMPRESSORS = ("zst", "lz4")
+    
+    def __init__(self, inner: StorageCodec, compression: str):
+        if compression not in self.COMPRESSORS:
+            raise ValueError(f"Unsupported compression: {compression}")
+        self.inner = inner
+        self.compression = compression
+        self.format = f"{inner.format}.{compression}"
+    
+    def encode(self, data: Any) -> bytes:
+        raw = self.inner.encode(data)
+        if self.compression == "zst":
+            zstd = _optional_import("zstandard", "zstd compression")
+            return zstd.ZstdCompressor().compress(raw)
+        lz4_frame = _optional_import("lz4.frame", "lz4 compression")
+        return lz4_frame.compress(raw)
+    
+    def decode(self, raw: bytes) -> Any:
+        if self.compression == "zst":
+            zstd = _optional_import("zstandard", "zstd compression")
+            raw = zstd.ZstdDecompressor().decompress(raw)
+        else:
+            lz4_frame = _optional_import("lz4.frame", "lz4 compression")
+            raw = lz4_frame.decompress(raw)
+        return self.inner.decode(raw)
+
+
+STORAGE_CODECS: Dict[str, StorageCodec] = {}
+
+
+def register_codec(codec: StorageCodec):
+    """Make a codec available to every StorageManager under ``codec.format``."""
+    STORAGE_CODECS[codec.format] = codec
+
+
+for _codec in (JsonCodec(), TextCodec(), MsgpackCodec(), NpyCodec(), NpzCodec(),
+               ArrowCodec(), ParquetCodec()):
+    register_codec(_codec)
+
+
+def get_codec(format: str) -> StorageCodec:
+    """Codec for a format; ``<format>.zst`` / ``.lz4`` add compression."""
+    codec = STORAGE_CODECS.get(format)
+    if codec is None:
+        base, _, compression = format.rpartition(".")
+        if base in STORAGE_CODECS and compression in CompressedCodec.COMPRESSORS:
+            codec = CompressedCodec(STORAGE_CODECS[base], compression)
+            register_codec(codec)
+        else:
+            raise ValueError(f"Unsupported format: {format}")
+    return codec
+
+
+_PRETTY_JSON = JsonCodec(indent=2)  # for human-readable backends
+
+
+STORAGE_BACKENDS: Dict[str, Callable[..., StorageBackend]] = {
+    "json": DirectoryBackend,
+    "sqlite": SQLiteBackend,
+}
+
+
+class StorageManager:
+    """Manager for agent storage.
+    
+    ``backend`` selects where entries live: ``"json"`` (default) keeps one
+    file per key under ``base_path``, ``"sqlite"`` keeps them all in
+    ``base_path/storage.db``. A ``StorageBackend`` instance may also be
+    given. Use ``migrate_to`` to copy entries between backends.
+    
+    ``durable`` makes writes fsync before returning; ``save_many`` then
+    pays for one directory sync (or one SQLite commit) per batch.
+    
+    ``format`` picks a codec from ``STORAGE_CODECS`` (json, txt, msgpack,
+    npy, npz, arrow, parquet, optionally suffixed ``.zst`` or ``.lz4``).
+    When loading without a format it is detected from the stored entry.
+    npy and arrow entries stored as files load memory-mapped, without
+    copying.
+    """
+    
+    def __init__(self, base_path: str = "./storage", backend: Any = "json",
+                 durable: bool = False):
+        self.base_path = Path(base_path)
+        key = str(self.base_path.resolve())
+        if key not in _created_dirs:
+            self.base_path.mkdir(parents=True, exist_ok=True)
+            _created_dirs.add(key)
+        if isinstance(backend, str):
+            if backend not in STORAGE_BACKENDS:
+                raise ValueError(f"Unsupported storage backend: {backend}")
+            backend = STORAGE_BACKENDS[backend](self.base_path, durable=durable)
+        self.backend: StorageBackend = backend
+    
+    def _encode(self, data: Any, format: str) -> bytes:
+        if format == "json" and self.backend.human_readable:
+            return _PRETTY_JSON.encode(data)
+        return get_codec(format).encode(data)
+    
+    def _detect_format(self, key: str) -> str:
+        """Format of the stored entry for ``key`` (json wins if several exist)."""
+        formats = list(STORAGE_CODECS)
+        formats += [f"{f}.{c}" for f in list(formats) for c in CompressedCodec.COMPRESSORS
+                    if f"{f}.{c}" not in STORAGE_CODECS]
+        for format in formats:
+            if self.backend.exists(f"{key}.{format}"):
+                return format
+        raise FileNotFoundError(f"No stored entry for key: {key}")
+    
+    def _decode_entry(self, name: str, format: str, raw: Optional[bytes] = None) -> Any:
+        codec = get_codec(format)
+        if raw is None:
+            path = self.backend.file_path(name)
+            if path is not None:
+                return codec.decode_file(path)
+            raw = self.backend.read(name)
+        return codec.decode(raw)
+    
+    def save(self, key: str, data: Any, format: str = "json"):
+        """Save data to storage (atomically replacing any previous value)."""
+        name = f"{key}.{format}"
+        self.backend.write(name, self._encode(data, format))
+        location = self.backend.location(name)
+        logger.info(f"Saved {key} to {location}")
+        return location
+    
+    def load(self, key: str, format: Optional[str] = None) -> Any:
+        """Load data from storage, detecting the format if not given."""
+        format = format or self._detect_format(key)
+        return self._decode_entry(f"{key}.{format}", format)
+    
+    def delete(self, key: str, format: str = "json"):
+        """Delete data from storage."""
+        if self.backend.delete(f"{key}.{format}"):
+            logger.info(f"Deleted {key}")
+    
+    def save_many(self, items: Dict[str, Any], format: str = "json") -> List[str]:
+        """Save several keys in one backend batch (one transaction for SQLite)."""
+        entries = {f"{key}.{format}": self._encode(data, format) for key, data in items.items()}
+        self.backend.write_many(entries)
+        logger.info(f"Saved {len(entries)} keys to {self.base_path}")
+        return [self.backend.location(name) for name in entries]
+    
+    def load_many(self, keys: List[str], format: Optional[str] = None) -> Dict[str, Any]:
+        """Load several keys in one backend batch (formats detected if not given)."""
+        formats = {key: format or self._detect_format(key) for key in keys}
+        names = {key: f"{key}.{formats[key]}" for key in keys}
+        if self.backend.file_per_entry:
+            # Decode from the files themselves so arrays can be memory-mapped
+            return {key: self._decode_entry(names[key], formats[key]) for key in keys}
+        raw = self.backend.read_many(list(names.values()))
+        return {key: self._decode_entry(names[key], formats[key], raw[names[key]])
+                for key in keys}
+    
+    # Async variants run the blocking I/O in a worker thread so agents
+    # sharing the event loop are not stalled.
+    
+    async def asave(self, key: str, data: Any, format: str = "json") -> str:
+        """Save data without blocking the event loop."""
+        return await asyncio.to_thread(self.save, key, data, format)
+    
+    async def aload(self, key: str, format: Optional[str] = None) -> Any:
+        """Load data without blocking the event loop."""
+        return await asyncio.to_thread(self.load, key, format)
+    
+    async def adelete(self, key: str, format: str = "json"):
+        """Delete data without blocking the event loop."""
+        await asyncio.to_thread(self.delete, key, format)
+    
+    async def asave_many(self, items: Dict[str, Any], format: str = "json") -> List[str]:
+        """Batched ``save_many`` without blocking the event loop."""
+        return await asyncio.to_thread(self.save_many, items, format)
+    
+    async def aload_many(self, keys: List[str], format: Optional[str] = None) -> Dict[str, Any]:
+        """Batched ``load_many`` without blocking the event loop."""
+        return await asyncio.to_thread(self.load_many, keys, format)
+    
+    def list_keys(self) -> List[str]:
+        """List all stored keys."""
+        return [name[:-len(".json")] for name in self.backend.names(".json")]
+    
+    def migrate_to(self, target: "StorageManager", delete: bool = False) -> int:
+        """Copy every entry to ``target`` (e.g. another backend); returns the count.
+        
+        JSON entries are re-encoded for the target's layout. With ``delete``
+        the entries are removed here once copied.
+        """
+        names = self.backend.names()
+        for name in names:
+            raw = self.backend.read(name)
+            if name.endswith(".json"):
+                raw = target._encode(json.loads(raw), "json")
+            target.backend.write(name, raw)
+            if delete:
+                self.backend.delete(name)
+        logger.info(f"Migrated {len(names)} entries to {target.base_path}")
+        return len(names)
+    
+    def close(self):
+        """Close the storage backend."""
+        self.backend.close()
+
+
+class ContextManager:
+    """Keeps the prompt within the model's context window.
     
-    def __init__(self, max_entries: int = 1000):
-        self.short_term: List[AgentMessage] = []
-        self.long_term: List[AgentMessage] = []
-        self.max_entries = max_entries
-        self.embeddings: Dict[str, List[float]] = {}
+    Token counts are estimated once per message as it enters the window.
+    When the prompt exceeds ``context_window - reserve_tokens`` the oldest
+    turns are dropped down to ``low_watermark`` of the budget, so compaction
+    is amortized over many turns. An optional ``summarizer`` receives the
+    previous summary and the dropped messages and returns a new summary
+    that is kept at the start of the window.
+    """
     
-    def add(self, message: AgentMessage, memory_type: str = "short"):
-        """Add a message to memory."""
-        if memory_type == "short":
-            self.short_term.append(message)
-            if len(self.short_term) > self.max_entries:
-                # Move oldest to long-term
-                if self.short_term:
-                    self.long_term.append(self.short_term.pop(0))
-        else:
-            self.long_term.append(message)
-            if len(self.long_term) > self.max_entries:
-                self.long_term.pop(0)
+    MESSAGE_OVERHEAD = 4  # role and formatting tokens per message
     
-    def get_recent(self, n: int = 10) -> List[AgentMessage]:
-        """Get recent messages."""
-        return self.short_term[-n:]
+    def __init__(self, context_window: int = DEFAULT_CONTEXT_WINDOW,
+                 reserve_tokens: int = 4096,
+                 low_watermark: float = 0.75,
+                 summarizer: Optional[Callable[[Optional[str], List[AgentMessage]], str]] = None):
+        self.context_window = context_window
+        self.reserve_tokens = reserve_tokens
+        self.low_watermark = low_watermark
+        self.summarizer = summarizer
+        self.preamble_tokens = 0
+        self.reset()
     
-    def get_all(self) -> List[AgentMessage]:
-        """Get all messages."""
-        return self.long_term + self.short_term
+    def reset(self):
+        """Forget all tracked messages."""
+        self.message_tokens: List[int] = []
+        self.start = 0  # index of the first message inside the window
+        self.window_tokens = 0
+        self.summary: Optional[str] = None
+        self.summary_tokens = 0
+        self.dropped_messages = 0
+        self.compactions = 0
     
-    def clear(self, memory_type: str = "short"):
-        """Clear memory."""
-        if memory_type == "short":
-            self.short_term = []
-        else:
-            self.long_term = []
+    @property
+    def budget(self) -> int:
+        """Tokens available for the prompt."""
+        return max(0, self.context_window - self.reserve_tokens)
     
-    def search(self, query: str, n: int = 5) -> List[AgentMessage]:
-        """Search memory (simple text matching)."""
-        results = []
-        for msg in reversed(self.get_all()):
-            if query.lower() in msg.content.lower():
-                results.append(msg)
-                if len(results) >= n:
-                    break
-        return results
+    @property
+    def prompt_tokens(self) -> int:
+        """Estimated size of the prompt currently in the window."""
+        return self.preamble_tokens + self.summary_tokens + self.window_tokens
     
-    def save_to_disk(self, filepath: str):
-        """Save memory to disk."""
-        data = {
-            "short_term": [{"role": m.role, "content": m.content, "timestamp": m.timestamp} 
-                          for m in self.short_term],
-            "long_term": [{"role": m.role, "content": m.content, "timestamp": m.timestamp} 
-                         for m in self.long_term]
-        }
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=2)
-        logger.info(f"Memory saved to {filepath}")
+    def count(self, content: Optional[str]) -> int:
+        """Estimate the tokens of one message."""
+        return estimate_tokens(content or "") + self.MESSAGE_OVERHEAD
     
-    def load_from_disk(self, filepath: str):
-        """Load memory from disk."""
-        with open(filepath, 'r') as f:
-            data = json.load(f)
+    def add(self, message: AgentMessage) -> int:
+        """Track a message appended to the conversation."""
+        tokens = self.count(message.content)
+        self.message_tokens.append(tokens)
+        self.window_tokens += tokens
+        return tokens
+    
+    def compact(self, history: List[AgentMessage]) -> int:
+        """Drop the oldest turns if the prompt is over budget.
         
-        self.short_term = [AgentMessage(**m) for m in data.get("short_term", [])]
-        self.long_term = [AgentMessage(**m) for m in data.get("long_term", [])]
-        logger.info(f"Memory loaded from {filepath}")
+        Returns the number of messages removed from the window. The window
+        always starts on a user turn (providers such as Anthropic require
+        it), never on an assistant reply or a tool result whose call was
+        dropped. If only the current turn is left, it is kept whole even
+        when that stays over the target.
+        """
+        if self.prompt_tokens <= self.budget:
+            return 0
+        
+        target = int(self.budget * self.low_watermark)
+        last = len(self.message_tokens) - 1
+        i = self.start
+        while i < last and self.prompt_tokens > target:
+            self.window_tokens -= self.message_tokens[i]
+            i += 1
+        while i <= last and history[i].role != "user":
+            self.window_tokens -= self.message_tokens[i]
+            i += 1
+        if i > last:
+            # No later user turn: step back to the start of the current turn
+            while i > self.start and (i > last or history[i].role != "user"):
+                i -= 1
+                self.window_tokens += self.message_tokens[i]
+        if i == self.start:
+            return 0
+        
+        dropped = history[self.start:i]
+        self.start = i
+        if self.summarizer and dropped:
+            self.summary = self.summarizer(self.summary, dropped)
+            self.summary_tokens = self.count(self.summary)
+        
+        self.dropped_messages += len(dropped)
+        self.compactions += 1
+        logger.info(f"Context compacted: dropped {len(dropped)} messages, "
+                    f"{self.prompt_tokens}/{self.budget} tokens in window")
+        return len(dropped)
+    
+    def get_stats(self) -> Dict:
+        """Get prompt-size statistics."""
+        return {
+            "context_window": self.context_window,
+            "prompt_tokens": self.prompt_tokens,
+            "window_messages": len(self.message_tokens) - self.start,
+            "dropped_messages": self.dropped_messages,
+            "compactions": self.compactions
+        }
 
 
-class StorageManager:
-    """Manager for agent storage."""
+# Text protocol for providers without native tool calling
+_TOOL_CALL_RE = re.compile(r"<tool_call>(.*?)</tool_call>", re.DOTALL)
+
+
+class ToolCallStreamParser:
+    """Incremental detector for <tool_call> blocks in streamed text."""
     
-    def __init__(self, base_path: str = "./storage"):
-        self.base_path = Path(base_path)
-        self.base_path.mkdir(parents=True, exist_ok=True)
+    OPEN_TAG = "<tool_call>"
+    CLOSE_TAG = "</tool_call>"
     
-    def save(self, key: str, data: Any, format: str = "json"):
-        """Save data to storage."""
-        filepath = self.base_path / f"{key}.{format}"
-        
-        if format == "json":
-            with open(filepath, 'w') as f:
-                json.dump(data, f, indent=2)
-        elif format == "txt":
-            with open(filepath, 'w') as f:
-                f.write(str(data))
-        else:
-            raise ValueError(f"Unsupported format: {format}")
-        
-        logger.info(f"Saved {key} to {filepath}")
-        return str(filepath)
+    def __init__(self):
+        self._buffer = ""
+        self._in_call = False
+        self._scan_from = 0
     
-    def load(self, key: str, format: str = "json") -> Any:
-        """Load data from storage."""
-        filepath = self.base_path / f"{key}.{format}"
-        
-        if not filepath.exists():
-            raise FileNotFoundError(f"File not found: {filepath}")
+    def feed(self, delta: str) -> List[Dict]:
+        """Consume a text delta and return tool calls completed by it."""
+        self._buffer += delta
+        completed = []
         
-        if format == "json":
-            with open(filepath, 'r') as f:
-                return json.load(f)
-        elif format == "txt":
-            with open(filepath, 'r') as f:
-                return f.read()
-        else:
-            raise ValueError(f"Unsupported format: {format}")
-    
-    def delete(self, key: str):
-        """Delete data from storage."""
-        filepath = self.base_path / f"{key}.json"
-        if filepath.exists():
-            filepath.unlink()
-            logger.info(f"Deleted {key}")
-    
-    def list_keys(self) -> List[str]:
-        """List all stored keys."""
-        return [f.stem for f in self.base_path.glob("*.json")]
+        while True:
+            if not self._in_call:
+                start = self._buffer.find(self.OPEN_TAG)
+                if start == -1:
+                    # Keep a possible partial opening tag for the next delta
+                    self._buffer = self._buffer[-(len(self.OPEN_TAG) - 1):]
+                    return completed
+                self._buffer = self._buffer[start + len(self.OPEN_TAG):]
+                self._in_call = True
+                self._scan_from = 0
+            
+            end = self._buffer.find(self.CLOSE_TAG, self._scan_from)
+            if end == -1:
+                self._scan_from = max(0, len(self._buffer) - len(self.CLOSE_TAG) + 1)
+                return completed
+            
+            payload = self._buffer[:end]
+            self._buffer = self._buffer[end + len(self.CLOSE_TAG):]
+            self._in_call = False
+            try:
+                completed.append(json.loads(payload))
+            except json.JSONDecodeError as e:
+                logger.warning(f"Ignoring malformed tool call: {e}")
 
 
 class AgentBase(ABC):
-    """Base class for AI agents."""
+    """Base class for AI agents.
+    
+    ``llm``, ``tools``, ``memory`` and ``storage`` may be injected to share
+    them with other agents; anything not given is created for this agent.
+    An injected tool registry's executor is left running on ``stop``.
+    """
     
-    def __init__(self, config: AgentConfig):
+    def __init__(self, config: AgentConfig, llm: Optional[LLMManager] = None,
+                 tools: Optional[ToolRegistry] = None,
+                 memory: Optional[MemoryManager] = None,
+                 storage: Optional[StorageManager] = None):
         self.config = config
         self.state = AgentState.IDLE
-        self.llm = LLMManager()
-        self.tools = ToolRegistry()
-        self.memory = MemoryManager() if config.memory_enabled else None
-        self.storage = StorageManager() if config.storage_enabled else None
+        self.llm = llm or LLMManager()
+        if config.llm_backend in self.llm.providers:
+            self.llm.current_provider = config.llm_backend
+            if config.model_name:
+                self.llm.models[config.llm_backend] = config.model_name
+        else:
+            logger.warning(f"LLM backend {config.llm_backend} not available, "
+                           f"using {self.llm.current_provider}")
+        if tools is None:
+            tools = ToolRegistry(ToolExecutor(
+                max_workers=config.tool_workers,
+                mode=config.tool_executor,
+                timeout=config.tool_timeout
+            ))
+            tools.owns_executor = True
+        self.tools = tools
+        if config.memory_enabled:
+            self.memory = memory or MemoryManager()
+        else:
+            self.memory = None
+        if config.storage_enabled:
+            self.storage = storage or StorageManager()
+        else:
+            self.storage = None
         self.conversation_history: List[AgentMessage] = []
-        self.tool_calls: List[ToolCall] = []
         self.iteration_count = 0
+        self.iteration_stats: List[IterationStats] = []
+        self.total_tokens = 0
+        # Budgets apply per turn (think/think_stream call)
+        self.turn_iterations = 0
+        self.turn_tokens = 0
+        self.stop_reason: Optional[str] = None
         self.start_time: Optional[float] = None
         
+        # Incrementally maintained LLM message list (see build_messages)
+        self._message_buffer: List[Dict[str, str]] = []
+        self._preamble_key: Optional[tuple] = None
+        self._preamble_len = 0
+        self._synced_history: Optional[List[AgentMessage]] = None
+        self._synced_count = 0
+        self._summary_len = 0
+        self._native_tools = False  # tool calls use the provider's API, not text
+        self.context = ContextManager()
+        
         # Callbacks
         self.on_thinking: Optional[Callable] = None
         self.on_tool_call: Optional[Callable] = None
@@ -534,13 +3637,27 @@ class AgentBase(ABC):
     def register_tool(self, tool: Tool):
         """Register a tool with the agent."""
         self.tools.register(tool)
+        self._preamble_key = None
     
     def add_system_prompt(self, prompt: str):
         """Add or update system prompt."""
         self.config.system_prompt = prompt
+        self._preamble_key = None
     
     def build_messages(self) -> List[Dict[str, str]]:
-        """Build message list for LLM."""
+        """Build message list for LLM.
+        
+        The list is maintained incrementally: the system/tools preamble is
+        cached and only turns appended since the last call are converted.
+        Callers must treat the returned list as read-only.
+        """
+        self._sync_preamble()
+        self._sync_history()
+        self._compact_context()
+        return self._message_buffer
+    
+    def _build_preamble(self) -> List[Dict[str, str]]:
+        """Build the system prompt and tools description messages."""
         messages = []
         
         # Add system prompt
@@ -548,23 +3665,92 @@ class AgentBase(ABC):
         if system_content:
             messages.append({"role": "system", "content": system_content})
         
-        # Add available tools info
-        if self.tools.list_tools():
+        # Add available tools info (native tool calling sends schemas instead)
+        if self.tools.list_tools() and not self._native_tools:
             tools_description = self._build_tools_description()
             messages.append({
                 "role": "system", 
                 "content": f"\n\nAvailable tools:\n{tools_description}"
             })
         
-        # Add conversation history
-        for msg in self.conversation_history:
-            msg_dict = {"role": msg.role, "content": msg.content}
-            if msg.tool_calls:
-                msg_dict["tool_calls"] = msg.tool_calls
-            messages.append(msg_dict)
+        # The preamble is rebuilt only when it changes, so it stays
+        # byte-identical between turns and can be served from the
+        # provider's prompt cache
+        if messages and self.config.prompt_caching:
+            messages[-1]["cache_control"] = {"type": "ephemeral"}
         
         return messages
     
+    def _sync_preamble(self):
+        """Rebuild the cached preamble if the prompt or tools changed."""
+        native = bool(self.tools.tools) and self.llm.supports_tools
+        key = (self.config.system_prompt, self.config.name,
+               tuple(self.config.description), self.tools.version,
+               self.config.prompt_caching, native)
+        if key == self._preamble_key:
+            return
+        if native != self._native_tools:
+            # Tool turns are encoded differently; convert the history again
+            self._native_tools = native
+            self._synced_history = None
+        
+        preamble = self._build_preamble()
+        self._message_buffer[:self._preamble_len] = preamble
+        self._preamble_len = len(preamble)
+        self._preamble_key = key
+        self.context.preamble_tokens = sum(self.context.count(m["content"]) for m in preamble)
+    
+    def _sync_history(self):
+        """Append conversation turns added since the last call."""
+        history = self.conversation_history
+        if history is not self._synced_history or len(history) < self._synced_count:
+            # History was replaced or truncated; convert it from scratch
+            del self._message_buffer[self._preamble_len:]
+            self._synced_history = history
+            self._synced_count = 0
+            self._summary_len = 0
+            self.context.reset()
+        
+        for i in range(self._synced_count, len(history)):
+            self._message_buffer.append(self._message_to_dict(history[i]))
+            self.context.add(history[i])
+        self._synced_count = len(history)
+    
+    def _compact_context(self):
+        """Trim (and optionally summarize) old turns to fit the model."""
+        self.context.context_window = self.llm.get_context_window()
+        dropped = self.context.compact(self.conversation_history)
+        if not dropped:
+            return
+        
+        head = self._preamble_len
+        del self._message_buffer[head:head + self._summary_len + dropped]
+        summary = []
+        if self.context.summary:
+            summary.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{self.context.summary}"
+            })
+        self._message_buffer[head:head] = summary
+        self._summary_len = len(summary)
+    
+    def _message_to_dict(self, msg: AgentMessage) -> Dict[str, str]:
+        """Convert a conversation message to the provider format.
+        
+        With native tool calling, assistant turns carry their tool calls and
+        results are ``tool`` messages (providers convert both further).
+        Otherwise tool calls travel inside the assistant text, so their
+        results are sent back as ``<tool_result>`` blocks in a user turn.
+        """
+        if self._native_tools:
+            if msg.role == "tool" and msg.tool_call_id:
+                return {"role": "tool", "tool_call_id": msg.tool_call_id, "content": msg.content}
+            if msg.tool_calls and all(tc.get("id") for tc in msg.tool_calls):
+                return {"role": msg.role, "content": msg.content, "tool_calls": msg.tool_calls}
+        if msg.role == "tool":
+            return {"role": "user", "content": f"<tool_result>\n{msg.content}\n</tool_result>"}
+        return {"role": msg.role, "content": msg.content}
+    
     def _default_system_prompt(self) -> str:
         """Get default system prompt."""
         return f"""You are {self.config.name}, an AI agent.
@@ -580,61 +3766,245 @@ When you need to use tools, make sure to call them with the correct format."""
         for tool_name in self.tools.list_tools():
             tool = self.tools.get(tool_name)
             if tool:
-                format_info = tool.get_tool_call_format()
                 descriptions.append(f"- {tool_name}: {tool.description}")
+        descriptions.append(
+            '\nTo call a tool, reply with <tool_call>{"name": "<tool>", '
+            '"arguments": {...}}</tool_call>. Results are returned in '
+            '<tool_result> blocks.'
+        )
         return "\n".join(descriptions)
     
     def _parse_tool_calls(self, response: str) -> List[Dict]:
-        """Parse tool calls from LLM response."""
-        # Simple parsing - in production, use proper parsing
+        """Parse <tool_call> blocks from a text response (no native tool calling)."""
         tool_calls = []
-        
-        # Look for tool call patterns
-        import re
-        pattern = r'<tool_call>(.*?)</tool_call>'
-        matches = re.findall(pattern, response, re.DOTALL)
-        
-        for match in matches:
+        for match in _TOOL_CALL_RE.finditer(response):
             try:
-                import json
-                tool_data = json.loads(match)
+                tool_data = json.loads(match.group(1))
+            except json.JSONDecodeError as e:
+                logger.warning(f"Ignoring malformed tool call: {e}")
+                continue
+            if isinstance(tool_data, dict):
                 tool_calls.append(tool_data)
-            except:
-                pass
-        
         return tool_calls
     
+    def _tool_request(self) -> Dict[str, Any]:
+        """Extra LLM request arguments for native tool calling."""
+        return {"tools": self.tools.get_schemas()} if self._native_tools else {}
+    
     async def think(self, user_input: str) -> str:
-        """Main thinking loop for the agent."""
-        self._update_state(AgentState.THINKING)
+        """Main thinking loop for the agent.
         
-        # Add user message
-        user_msg = AgentMessage(role="user", content=user_input)
-        self.conversation_history.append(user_msg)
-        self.iteration_count += 1
+        Tool results are fed back to the model until it answers without
+        calling tools or the iteration, time or token budget runs out.
+        """
+        deadline = self._start_turn(user_input)
+        response = ""
         
-        # Build messages for LLM
-        messages = self.build_messages()
+        while True:
+            stats = self._next_iteration()
+            messages = self.build_messages()
+            stats.prompt_messages = len(messages)
+            stats.context_tokens = self.context.prompt_tokens
+            
+            # Get response from LLM
+            started = time.perf_counter()
+            try:
+                completion = await asyncio.wait_for(
+                    self.llm.acomplete(messages=messages, max_tokens=4096, temperature=0.7,
+                                       **self._tool_request()),
+                    timeout=max(0.0, deadline - time.monotonic())
+                )
+            except asyncio.TimeoutError:
+                self.stop_reason = "timeout"
+                raise TimeoutError(
+                    f"Agent {self.config.name} exceeded timeout of {self.config.timeout}s"
+                )
+            stats.llm_time = time.perf_counter() - started
+            self._record_usage(stats, completion)
+            response = completion.content
+            
+            # Execute native tool calls (or ones written into the text)
+            if self._native_tools:
+                tool_calls = completion.tool_calls or []
+            else:
+                tool_calls = self._parse_tool_calls(response)
+            limit = self.config.max_tool_calls
+            if limit is not None and len(tool_calls) > limit:
+                self._skip_tool_calls(len(tool_calls) - limit)
+                tool_calls = tool_calls[:limit]
+            self._add_assistant_message(response, tool_calls)
+            if not tool_calls:
+                self.stop_reason = "completed"
+                break
+            
+            await self._run_iteration_tools(tool_calls, stats, deadline)
+            if self._budget_exhausted(stats.iteration, deadline):
+                break
         
-        # Get response from LLM
-        response = self.llm.generate(
-            messages=messages,
-            max_tokens=4096,
-            temperature=0.7
-        )
+        return response
+    
+    async def think_stream(self, user_input: str) -> AsyncIterator[str]:
+        """Streaming variant of ``think`` that yields response deltas.
         
-        # Parse and execute tool calls
-        tool_calls = self._parse_tool_calls(response)
+        ``on_thinking`` is called with every text delta, and tool calls are
+        started as soon as they are complete (the last native fragment or
+        the closing tag) instead of after the full response.
+        """
+        deadline = self._start_turn(user_input)
         
-        if tool_calls:
-            for tool_call in tool_calls:
-                await self.execute_tool_call(tool_call)
-                self.iteration_count += 1
+        while True:
+            stats = self._next_iteration()
+            messages = self.build_messages()
+            stats.prompt_messages = len(messages)
+            stats.context_tokens = self.context.prompt_tokens
+            parser = None if self._native_tools else ToolCallStreamParser()
+            calls = ToolCallAccumulator()
+            chunks: List[str] = []
+            usage: Optional[LLMResponse] = None
+            tool_calls: List[Dict] = []
+            skipped: List[Dict] = []
+            pending: List[asyncio.Task] = []
+            limit = self.config.max_tool_calls
+            
+            def start(completed: List[Dict]):
+                for tool_call in completed:
+                    if limit is not None and len(tool_calls) >= limit:
+                        skipped.append(tool_call)
+                        continue
+                    tool_calls.append(tool_call)
+                    timeout = min(self.config.tool_timeout, max(0.0, deadline - time.monotonic()))
+                    pending.append(asyncio.create_task(self._run_tool_call(tool_call, timeout)))
+            
+            stream = self.llm.astream(
+                messages=messages,
+                max_tokens=4096,
+                temperature=0.7,
+                **self._tool_request()
+            )
+            started = time.perf_counter()
+            try:
+                while True:
+                    try:
+                        delta = await asyncio.wait_for(
+                            anext(stream), timeout=max(0.0, deadline - time.monotonic()))
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        self.stop_reason = "timeout"
+                        raise TimeoutError(
+                            f"Agent {self.config.name} exceeded timeout of {self.config.timeout}s"
+                        )
+                    if isinstance(delta, ToolCallDelta):
+                        start(calls.feed(delta))
+                        continue
+                    if isinstance(delta, LLMResponse):
+                        usage = delta
+                        continue
+                    chunks.append(delta)
+                    if self.on_thinking:
+                        self.on_thinking(delta)
+                    if parser:
+                        start(parser.feed(delta))
+                    
+                    yield delta
+                start(calls.finish())
+                stats.llm_time = time.perf_counter() - started
+                if skipped:
+                    self._skip_tool_calls(len(skipped))
                 
-                if self.iteration_count >= self.config.max_iterations:
+                response = "".join(chunks)
+                if usage is None:
+                    # The provider did not report usage; estimate it
+                    usage = LLMResponse(content="", prompt_tokens=stats.context_tokens,
+                                        completion_tokens=estimate_tokens(response))
+                self._record_usage(stats, usage)
+                self._add_assistant_message(response, tool_calls)
+                if not tool_calls:
+                    self.stop_reason = "completed"
                     break
+                
+                # Tool calls already started while the response was streaming
+                started = time.perf_counter()
+                outcomes = await asyncio.gather(*pending)
+            finally:
+                # The consumer may stop early or the stream may fail
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                await stream.aclose()
+            stats.tool_time = time.perf_counter() - started
+            stats.tool_calls = len(tool_calls)
+            for tool_call, (result, succeeded) in zip(tool_calls, outcomes):
+                self._record_tool_result(tool_call, result, succeeded)
+            
+            if self._budget_exhausted(stats.iteration, deadline):
+                break
+    
+    def _start_turn(self, user_input: str) -> float:
+        """Record the user message and return the wall-clock deadline."""
+        self._update_state(AgentState.THINKING)
+        self.stop_reason = None
+        self.turn_iterations = 0
+        self.turn_tokens = 0
+        
+        user_msg = AgentMessage(role="user", content=user_input)
+        self.conversation_history.append(user_msg)
+        if self.memory:
+            self.memory.add(user_msg)
+        
+        return time.monotonic() + self.config.timeout
+    
+    def _next_iteration(self) -> IterationStats:
+        """Start a new loop iteration."""
+        self.iteration_count += 1
+        self.turn_iterations += 1
+        stats = IterationStats(iteration=self.turn_iterations)
+        self.iteration_stats.append(stats)
+        return stats
+    
+    def _record_usage(self, stats: IterationStats, completion: LLMResponse):
+        stats.prompt_tokens = completion.prompt_tokens
+        stats.completion_tokens = completion.completion_tokens
+        stats.cached_tokens = completion.cached_tokens
+        stats.cache_write_tokens = completion.cache_write_tokens
+        self.total_tokens += completion.total_tokens
+        self.turn_tokens += completion.total_tokens
+    
+    async def _run_iteration_tools(self, tool_calls: List[Dict], stats: IterationStats,
+                                   deadline: float):
+        """Execute an iteration's tool calls within the remaining time."""
+        started = time.perf_counter()
+        await self.execute_tool_calls(
+            tool_calls,
+            timeout=min(self.config.tool_timeout, max(0.0, deadline - time.monotonic()))
+        )
+        stats.tool_time = time.perf_counter() - started
+        stats.tool_calls = len(tool_calls)
+    
+    def _budget_exhausted(self, iteration: int, deadline: float) -> bool:
+        """Check the iteration, time and token budgets before the next LLM call."""
+        if iteration >= self.config.max_iterations:
+            self.stop_reason = "max_iterations"
+        elif time.monotonic() >= deadline:
+            self.stop_reason = "timeout"
+        elif self.config.max_total_tokens and self.turn_tokens >= self.config.max_total_tokens:
+            self.stop_reason = "max_total_tokens"
+        else:
+            return False
+        logger.warning(f"Agent {self.config.name} stopped: {self.stop_reason} budget exhausted")
+        return True
+    
+    def _skip_tool_calls(self, count: int):
+        """Report tool calls dropped by the per-response ``max_tool_calls`` cap.
         
-        # Add assistant response
+        Only the calls that run are recorded with the assistant message, so
+        every recorded native call still gets a result.
+        """
+        logger.warning(f"Agent {self.config.name} skipped {count} tool calls over "
+                       f"max_tool_calls={self.config.max_tool_calls}")
+    
+    def _add_assistant_message(self, response: str, tool_calls: List[Dict]):
+        """Record an assistant response."""
         assistant_msg = AgentMessage(
             role="assistant", 
             content=response,
@@ -642,15 +4012,11 @@ When you need to use tools, make sure to call them with the correct format."""
         )
         self.conversation_history.append(assistant_msg)
         
-        # Save to memory
         if self.memory:
-            self.memory.add(user_msg)
             self.memory.add(assistant_msg)
-        
-        return response
     
-    async def execute_tool_call(self, tool_call: Dict):
-        """Execute a tool call."""
+    async def _run_tool_call(self, tool_call: Dict, timeout: Optional[float] = None) -> tuple:
+        """Run a tool call, returning ``(result, succeeded)``."""
         tool_name = tool_call.get("name")
         arguments = tool_call.get("arguments", {})
         
@@ -658,24 +4024,47 @@ When you need to use tools, make sure to call them with the correct format."""
             self.on_tool_call(tool_name, arguments)
         
         try:
-            result = self.tools.execute_tool(tool_name, arguments)
-            
-            # Add tool result to conversation
-            tool_msg = AgentMessage(
-                role="tool",
-                content=result,
-                tool_call_id=tool_call.get("id")
-            )
-            self.conversation_history.append(tool_msg)
-            
-            if self.memory:
-                self.memory.add(tool_msg)
-            
-            return result
+            return await self.tools.aexecute_tool(tool_name, arguments, timeout), True
+        except asyncio.TimeoutError:
+            error_msg = f"Tool execution failed: {tool_name} timed out"
+            logger.error(error_msg)
+            return error_msg, False
         except Exception as e:
             error_msg = f"Tool execution failed: {str(e)}"
             logger.error(error_msg)
-            return error_msg
+            return error_msg, False
+    
+    def _record_tool_result(self, tool_call: Dict, result: Any, succeeded: bool = True):
+        """Add a tool result (or its error) to the conversation."""
+        tool_msg = AgentMessage(
+            role="tool",
+            content=_tool_result_text(result),
+            tool_call_id=tool_call.get("id"),
+            metadata={"tool": tool_call.get("name"), "error": not succeeded}
+        )
+        self.conversation_history.append(tool_msg)
+        
+        if self.memory:
+            self.memory.add(tool_msg)
+    
+    async def execute_tool_call(self, tool_call: Dict, timeout: Optional[float] = None):
+        """Execute a tool call."""
+        result, succeeded = await self._run_tool_call(tool_call, timeout)
+        self._record_tool_result(tool_call, result, succeeded)
+        return result
+    
+    async def execute_tool_calls(self, tool_calls: List[Dict],
+                                 timeout: Optional[float] = None) -> List[str]:
+        """Execute independent tool calls concurrently.
+        
+        Results (including failures, so the model can react to them) are
+        added to the conversation in call order, regardless of completion
+        order.
+        """
+        outcomes = await asyncio.gather(*(self._run_tool_call(tc, timeout) for tc in tool_calls))
+        for tool_call, (result, succeeded) in zip(tool_calls, outcomes):
+            self._record_tool_result(tool_call, result, succeeded)
+        return [result for result, _ in outcomes]
     
     async def run(self, task: str) -> str:
         """Run the agent on a task."""
@@ -693,24 +4082,56 @@ When you need to use tools, make sure to call them with the correct format."""
     
     def stop(self):
         """Stop the agent."""
+        if self.tools.owns_executor:
+            self.tools.executor.shutdown(wait=False)
         self._update_state(AgentState.STOPPED)
     
     def reset(self):
         """Reset agent state."""
         self.conversation_history = []
-        self.tool_calls = []
+        self.tools.clear_history()
         self.iteration_count = 0
+        self.iteration_stats = []
+        self.total_tokens = 0
+        self.turn_iterations = 0
+        self.turn_tokens = 0
+        self.stop_reason = None
         self.state = AgentState.IDLE
         if self.memory:
             self.memory.clear()
     
+    def _prompt_cache_stats(self) -> Dict:
+        """Aggregate provider prompt-cache usage over all iterations."""
+        prompt_tokens = sum(s.prompt_tokens for s in self.iteration_stats)
+        cached_tokens = sum(s.cached_tokens for s in self.iteration_stats)
+        return {
+            "requests": len(self.iteration_stats),
+            "hits": sum(1 for s in self.iteration_stats if s.cached_tokens),
+            "cached_tokens": cached_tokens,
+            "cache_write_tokens": sum(s.cache_write_tokens for s in self.iteration_stats),
+            "hit_rate": cached_tokens / prompt_tokens if prompt_tokens else 0.0
+        }
+    
     def get_stats(self) -> Dict:
         """Get agent statistics."""
+        tool_stats = self.tools.get_stats()
         return {
             "state": self.state.value,
             "iterations": self.iteration_count,
             "messages": len(self.conversation_history),
-            "tools_used": len(self.tool_calls),
+            "tools_used": tool_stats["calls"],
+            "llm_time": sum(s.llm_time for s in self.iteration_stats),
+            "tool_time": sum(s.tool_time for s in self.iteration_stats),
+            "total_tokens": self.total_tokens,
+            "stop_reason": self.stop_reason,
+            "context": self.context.get_stats(),
+            "prompt_cache": self._prompt_cache_stats(),
+            "response_cache": self.llm.get_stats()["cache"],
+            "tool_cache": {
+                **self.tools.cache.get_stats(),
+                "cached_calls": tool_stats["cached"]
+            },
+            "tool_calls": tool_stats,
             "uptime": time.time() - self.start_time if self.start_time else 0
         }
 
@@ -759,53 +4180,189 @@ class ComputerUseAgent:
         return f"Page content from {len(self.actions)} actions"
 
 
+class ToolLoader:
+    """Loads tool packages (``config.json`` + entry module), caching them.
+    
+    A loaded tool class is reused until the modification time or size of
+    its ``config.json`` or entry file changes, so repeated loads of the same
+    tool do not re-execute its module. Entry modules are imported through
+    the regular source loader and therefore keep compiled bytecode in
+    ``__pycache__``.
+    """
+    
+    def __init__(self):
+        self._cache: Dict[str, tuple] = {}  # tool path -> (signature, config, tool class)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _signature(*paths: Path) -> tuple:
+        signature = []
+        for path in paths:
+            st = path.stat()
+            signature.append((st.st_mtime_ns, st.st_size))
+        return tuple(signature)
+    
+    @staticmethod
+    def read_config(tool_path: Path) -> Dict:
+        """Read and validate a tool's ``config.json``."""
+        with open(tool_path / "config.json", 'r') as f:
+            config = json.load(f)
+        build = config.get("build")
+        if not isinstance(build, dict) or not build.get("module"):
+            raise ValueError(f"{tool_path}/config.json: missing build.module")
+        return config
+    
+    def load_class(self, tool_path: str) -> type:
+        """Get the tool class of a tool package, importing it if needed."""
+        import importlib.util
+        
+        path = Path(tool_path).resolve()
+        key = str(path)
+        cached = self._cache.get(key)
+        if cached is not None:
+            signature, config, tool_class = cached
+            entry = path / config["build"].get("entry", "entry.py")
+            if self._signature(path / "config.json", entry) == signature:
+                self.hits += 1
+                return tool_class
+        
+        with self._lock:
+            config = self.read_config(path)
+            entry = path / config["build"].get("entry", "entry.py")
+            signature = self._signature(path / "config.json", entry)
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == signature:
+                self.hits += 1
+                return cached[2]
+            
+            module_name = f"cerebrum_tool_{path.parent.name}_{path.name}"
+            spec = importlib.util.spec_from_file_location(module_name, entry)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            # Not checked against Tool: run as a script, this module and the
+            # ``cerebrum`` imported by the tool are different module objects
+            tool_class = getattr(module, config["build"]["module"], None)
+            if not isinstance(tool_class, type):
+                raise ValueError(f"{entry}: {config['build']['module']} is not a class")
+            
+            self._cache[key] = (signature, config, tool_class)
+            self.misses += 1
+            return tool_class
+    
+    def load(self, tool_path: str) -> Tool:
+        """Create an instance of a tool package's tool."""
+        return self.load_class(tool_path)()
+    
+    def preload(self, tool_root: str, strict: bool = False) -> List[str]:
+        """Validate and import every tool under ``tool_root/<author>/<name>``.
+        
+        Returns the ``author/name`` references that loaded. Broken tools are
+        logged and skipped, or raise if ``strict`` is set.
+        """
+        loaded = []
+        root = Path(tool_root)
+        for config_path in sorted(root.glob("*/*/config.json")):
+            tool_dir = config_path.parent
+            ref = f"{tool_dir.parent.name}/{tool_dir.name}"
+            try:
+                self.load_class(str(tool_dir))
+            except Exception as e:
+                if strict:
+                    raise
+                logger.warning(f"Skipping tool {ref}: {e}")
+                continue
+            loaded.append(ref)
+        return loaded
+    
+    def loaded_paths(self) -> List[str]:
+        """Paths of all tool packages loaded so far."""
+        return list(self._cache)
+    
+    def path_of(self, tool_class: type) -> Optional[str]:
+        """Package path a tool class was loaded from, if any."""
+        for path, (_, _, cached_class) in list(self._cache.items()):
+            if cached_class is tool_class:
+                return path
+        return None
+    
+    def invalidate(self, tool_path: Optional[str] = None):
+        """Forget one cached tool package, or all of them."""
+        with self._lock:
+            if tool_path is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(str(Path(tool_path).resolve()), None)
+    
+    def get_stats(self) -> Dict:
+        """Get cache statistics."""
+        return {"tools": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+# Tool package cache shared by all clients in the process
+_shared_tool_loader = ToolLoader()
+
+
 class CerebrumClient:
     """Main client for Cerebrum SDK."""
     
-    def __init__(self):
+    def __init__(self, tool_loader: Optional[ToolLoader] = None,
+                 tool_executor: Optional[ToolExecutor] = None):
         self.llm = LLMManager()
-        self.tools = ToolRegistry()
+        self.tools = ToolRegistry(tool_executor)
         self.memory = MemoryManager()
         self.storage = StorageManager()
+        self.tool_loader = tool_loader or _shared_tool_loader
     
     def create_agent(self, config: AgentConfig) -> AgentBase:
-        """Create a new agent instance."""
-        return AgentBase(config)
+        """Create a new agent instance.
+        
+        The agent shares this client's LLM providers, response cache, tool
+        instances, tool executor and storage, but gets its own memory.
+        """
+        return AgentBase(config, llm=self.llm.fork(), tools=self.tools.fork(),
+                         storage=self.storage)
     
     def list_available_llms(self) -> Dict[str, List[str]]:
         """List available LLM providers."""
         return self.llm.list_providers()
     
     def load_tool(self, tool_path: str, local: bool = True) -> Tool:
-        """Load a tool from path."""
-        # Dynamic import based on path
-        import importlib.util
-        
-        module_name = tool_path.split('/')[-1]
-        spec = importlib.util.spec_from_file_location(
-            module_name, 
-            f"{tool_path}/entry.py"
-        )
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-        
-        # Get tool class from config
-        with open(f"{tool_path}/config.json", 'r') as f:
-            config = json.load(f)
-        
-        tool_class = getattr(module, config["build"]["module"])
-        return tool_class()
+        """Load a tool from path (the module is only imported once per version)."""
+        return self.tool_loader.load(tool_path)
+    
+    def preload_tools(self, tool_root: str, strict: bool = False) -> List[str]:
+        """Validate and import all tools under ``tool_root`` ahead of use."""
+        return self.tool_loader.preload(tool_root, strict)
     
     def run_agent(self, agent: AgentBase, task: str) -> str:
         """Run an agent synchronously."""
         import asyncio
         
         async def _run():
-            return await agent.run(task)
+            try:
+                return await agent.run(task)
+            finally:
+                await agent.llm.aclose()
         
         return asyncio.run(_run())
 
 
+_shared_client: Optional[CerebrumClient] = None
+_shared_client_lock = threading.Lock()
+
+
+def get_shared_client() -> CerebrumClient:
+    """Get the process-wide client, creating it on first use."""
+    global _shared_client
+    if _shared_client is None:
+        with _shared_client_lock:
+            if _shared_client is None:
+                _shared_client = CerebrumClient()
+    return _shared_client
+
+
 # AutoTool class for easy tool loading
 class AutoTool:
     """Auto-loading tool wrapper."""
@@ -813,8 +4370,349 @@ class AutoTool:
     @staticmethod
     def from_preloaded(tool_path: str, local: bool = True) -> Tool:
         """Load a prebuilt tool."""
-        client = CerebrumClient()
-        return client.load_tool(tool_path, local)
+        return get_shared_client().load_tool(tool_path, local)
+
+
+_VERSION_CONSTRAINT_RE = re.compile(r"^\s*(==|!=|>=|<=|>|<)?\s*([\w.+-]+)\s*$")
+
+
+def _version_key(version: str) -> tuple:
+    """Comparable key of a dotted version (``1.2`` == ``1.2.0``)."""
+    parts = [int(p) for p in re.findall(r"\d+", str(version))]
+    while parts and parts[-1] == 0:
+        parts.pop()
+    return tuple(parts)
+
+
+def version_matches(version: str, constraint: Optional[str]) -> bool:
+    """Check a version against a constraint such as ``>=1.0,<2``.
+    
+    A bare version means ``==``. Comparison is numeric, component by component.
+    """
+    if not constraint:
+        return True
+    key = _version_key(version)
+    for clause in constraint.split(","):
+        match = _VERSION_CONSTRAINT_RE.match(clause)
+        if not match:
+            raise ValueError(f"Invalid version constraint: {clause!r}")
+        op, target = match.group(1) or "==", _version_key(match.group(2))
+        if not {
+            "==": key == target, "!=": key != target,
+            ">=": key >= target, "<=": key <= target,
+            ">": key > target, "<": key < target
+        }[op]:
+            return False
+    return True
+
+
+class ManifestCatalog:
+    """Persistent index of agent or tool manifests under a package root.
+    
+    Packages live in ``<root>/<author>/<name>`` or, for several versions,
+    ``<root>/<author>/<name>/<version>``, each with a ``config.json``. The
+    index is saved under ``CATALOG_CACHE_DIR``.
+    
+    ``refresh`` stats every directory down to the version level and only
+    lists those whose mtime changed, which is enough to pick up added and
+    removed packages and versions, including a ``config.json`` written
+    after its package directory. Edits to an existing ``config.json`` do
+    not touch its directory, so packages already in the index are
+    re-checked when ``resolve`` returns them, or all at once with
+    ``refresh(deep=True)``. Manifests are only re-read when their mtime or
+    size changed.
+    """
+    
+    INDEX_FORMAT = "cerebrum-catalog"
+    INDEX_VERSION = 1
+    
+    def __init__(self, root: str, index_path: Optional[str] = None):
+        self.root = Path(root)
+        if index_path is None:
+            digest = hashlib.sha256(str(self.root.resolve()).encode()).hexdigest()[:16]
+            index_path = CATALOG_CACHE_DIR / f"catalog-{self.root.name}-{digest}.json"
+        self.index_path = Path(index_path)
+        self._dirs: Dict[str, list] = {}  # relative dir -> [mtime_ns, subdirs, has manifest]
+        self._manifests: Dict[str, Dict] = {}  # relative package dir -> manifest
+        self._by_ref: Optional[Dict[str, List[str]]] = None  # "author/name" -> package dirs by version
+        self._loaded = False
+        self._dirty = False
+    
+    @staticmethod
+    def read_manifest(package_dir: Path) -> Dict:
+        """Summarize a package's ``config.json``."""
+        with open(package_dir / "config.json", 'r') as f:
+            config = json.load(f)
+        meta = config.get("meta", {})
+        build = config.get("build", {})
+        return {
+            "name": config.get("name", package_dir.name),
+            "description": config.get("description", ""),
+            "tools": config.get("tools", []),
+            "author": meta.get("author"),
+            "version": str(meta.get("version", "0.0.0")),
+            "license": meta.get("license", "MIT"),
+            "entry": build.get("entry"),
+            "module": build.get("module")
+        }
+    
+    def _load_index(self):
+        self._loaded = True
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        if index.get("format") == self.INDEX_FORMAT and index.get("version") == self.INDEX_VERSION:
+            self._dirs = index["dirs"]
+            self._manifests = index["manifests"]
+    
+    def _save_index(self):
+        index = {"format": self.INDEX_FORMAT, "version": self.INDEX_VERSION,
+                 "dirs": self._dirs, "manifests": self._manifests}
+        tmp_path = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump(index, f, separators=(",", ":"))
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.debug(f"Could not save catalog index {self.index_path}: {e}")
+    
+    def _forget(self, rel: str):
+        """Drop a directory and everything below it from the index."""
+        prefix = rel + "/"
+        for table in (self._dirs, self._manifests):
+            for key in [k for k in table if k == rel or k.startswith(prefix)]:
+                del table[key]
+        self._dirty = True
+    
+    def _scan(self, rel: str, depth: int, deep: bool):
+        path = self.root / rel if rel else self.root
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            if rel in self._dirs:
+                self._forget(rel)
+            return
+        record = self._dirs.get(rel)
+        if record is not None and record[0] == mtime and depth >= 2 and not deep:
+            return  # nothing added or removed in this package
+        if record is None or record[0] != mtime:
+            subdirs, has_manifest = [], False
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.name == "config.json":
+                        has_manifest = True
+                    elif (entry.is_dir() and not entry.name.startswith(".")
+                          and entry.name != "__pycache__"):
+                        subdirs.append(entry.name)
+            if record is not None:
+                for name in set(record[1]).difference(subdirs):
+                    self._forget(f"{rel}/{name}" if rel else name)
+            record = self._dirs[rel] = [mtime, sorted(subdirs), has_manifest]
+            self._dirty = True
+        
+        if depth >= 2:
+            if record[2]:
+                self._check_manifest(rel, path)
+            elif rel in self._manifests:
+                del self._manifests[rel]
+                self._dirty = True
+        if depth < 3:
+            for name in record[1]:
+                self._scan(f"{rel}/{name}" if rel else name, depth + 1, deep)
+    
+    def _check_manifest(self, rel: str, path: Path):
+        try:
+            st = os.stat(path / "config.json")
+        except FileNotFoundError:
+            return
+        signature = [st.st_mtime_ns, st.st_size]
+        manifest = self._manifests.get(rel)
+        if manifest is not None and manifest["signature"] == signature:
+            return
+        try:
+            manifest = self.read_manifest(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Invalid manifest {path / 'config.json'}: {e}")
+            manifest = {"invalid": True}
+        manifest["signature"] = signature
+        self._manifests[rel] = manifest
+        self._dirty = True
+    
+    def _commit(self):
+        """Rebuild the lookup table and persist the index after changes."""
+        if self._dirty or self._by_ref is None:
+            by_ref: Dict[str, List[str]] = {}
+            for rel, manifest in self._manifests.items():
+                if not manifest.get("invalid"):
+                    ref = rel if rel.count("/") == 1 else rel.rsplit("/", 1)[0]
+                    by_ref.setdefault(ref, []).append(rel)
+            manifests = self._manifests
+            for rels in by_ref.values():
+                if len(rels) > 1:
+                    rels.sort(key=lambda rel: _version_key(manifests[rel]["version"]))
+            self._by_ref = by_ref
+        if self._dirty:
+            self._save_index()
+            self._dirty = False
+    
+    def refresh(self, deep: bool = False) -> "ManifestCatalog":
+        """Bring the index up to date with the package tree."""
+        if not self._loaded:
+            self._load_index()
+        self._scan("", 0, deep)
+        self._commit()
+        return self
+    
+    def refs(self) -> List[str]:
+        """All package references (``author/name``), sorted."""
+        if self._by_ref is None:
+            self.refresh()
+        return sorted(self._by_ref)
+    
+    def _package(self, ref: str) -> List[str]:
+        """Re-check one package on disk and return its dirs by version."""
+        if ref.count("/") != 1:
+            return []
+        if not self._loaded:
+            self._load_index()
+        self._scan(ref, 2, deep=True)
+        self._commit()
+        return self._by_ref.get(ref, [])
+    
+    def versions(self, ref: str) -> List[str]:
+        """Available versions of a package, oldest first."""
+        return [self._manifests[rel]["version"] for rel in self._package(ref)]
+    
+    def resolve(self, ref: str, version: Optional[str] = None) -> Optional[Dict]:
+        """Newest manifest of ``ref`` matching a version constraint.
+        
+        The constraint can also be appended to the reference, as in
+        ``author/name@>=1.0,<2``. The package is re-checked on disk first.
+        """
+        if "@" in ref:
+            ref, version = ref.split("@", 1)
+        for rel in reversed(self._package(ref)):
+            manifest = self._manifests[rel]
+            if version_matches(manifest["version"], version):
+                return dict(manifest, ref=ref, path=str(self.root / rel))
+        return None
+
+
+async def _run_batch_task(client: CerebrumClient, config: AgentConfig,
+                          line_no: int, line: str) -> Dict:
+    """Run one JSONL task line on a fresh agent and describe the outcome."""
+    record: Dict[str, Any] = {"id": line_no}
+    try:
+        data = json.loads(line)
+        if isinstance(data, dict):
+            record["id"] = data.get("id", line_no)
+            task = data["task"]
+        else:
+            task = data
+        if not isinstance(task, str):
+            raise ValueError("task must be a string")
+    except (ValueError, KeyError) as e:
+        record.update(status="error", error=f"Invalid task line: {e}", latency=0.0)
+        return record
+    
+    agent = client.create_agent(config)
+    start = time.perf_counter()
+    try:
+        record["result"] = await agent.run(task)
+        record["status"] = "success"
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = str(e)
+    record["latency"] = time.perf_counter() - start
+    record["iterations"] = agent.iteration_count
+    record["tokens"] = agent.total_tokens
+    return record
+
+
+async def run_batch(client: CerebrumClient, config: AgentConfig, tasks: io.TextIOBase,
+                    output: io.TextIOBase, concurrency: int = 8) -> Dict:
+    """Run JSONL tasks with at most ``concurrency`` agents at a time.
+    
+    Each input line is ``{"id": ..., "task": "..."}`` or a JSON string.
+    Every task gets a fresh agent (conversation and memory) created from
+    ``config`` on ``client``, so providers, tools and the tool executor
+    are shared. Results are written to ``output`` as JSONL in completion
+    order; input is read incrementally. Returns aggregate statistics.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    latency = LatencyHistogram()
+    counts = {"success": 0, "error": 0}
+    
+    async def read():
+        line_no = 0
+        while True:
+            line = await asyncio.to_thread(tasks.readline)
+            if not line:
+                break
+            line = line.strip()
+            if line:
+                line_no += 1
+                await queue.put((line_no, line))
+        for _ in range(concurrency):
+            await queue.put(None)
+    
+    async def work():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            record = await _run_batch_task(client, config, *item)
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+            counts[record["status"]] += 1
+            latency.record(record["latency"])
+    
+    start = time.perf_counter()
+    await asyncio.gather(read(), *(work() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    total = counts["success"] + counts["error"]
+    return {
+        "tasks": total,
+        "succeeded": counts["success"],
+        "failed": counts["error"],
+        "elapsed": elapsed,
+        "throughput": total / elapsed if elapsed > 0 else 0.0,
+        "latency": latency.get_stats()
+    }
+
+
+def _load_local_agent(client: CerebrumClient, agent_path: Optional[str],
+                      agent_author: str = None, agent_name: str = None,
+                      agent_version: str = None) -> AgentConfig:
+    """Resolve a local agent and register its tools on ``client``."""
+    # Load agent from a local path, or resolve an author/name reference
+    if agent_path and (Path(agent_path) / "config.json").exists():
+        manifest = ManifestCatalog.read_manifest(Path(agent_path))
+    else:
+        ref = agent_path or f"{agent_author}/{agent_name}"
+        manifest = ManifestCatalog(LOCAL_AGENT_PATH).refresh().resolve(ref, agent_version)
+        if manifest is None:
+            raise ValueError(f"Agent not found: {ref} {agent_version or ''}".rstrip())
+    
+    config = AgentConfig(
+        name=manifest["name"],
+        description=manifest["description"],
+        tools=manifest["tools"],
+        author=manifest["author"],
+        version=manifest["version"],
+        license=manifest["license"]
+    )
+    
+    # Load tools from config
+    tool_catalog = ManifestCatalog(LOCAL_TOOL_PATH).refresh()
+    for tool_ref in config.tools:
+        tool_manifest = tool_catalog.resolve(tool_ref)
+        tool_path = tool_manifest["path"] if tool_manifest else f"{LOCAL_TOOL_PATH}/{tool_ref}"
+        client.tools.register(client.load_tool(tool_path, local=True))
+    return config
 
 
 # CLI commands
@@ -825,27 +4723,8 @@ def run_agent_command(mode: str, agent_path: str, task: str,
     client = CerebrumClient()
     
     if mode == "local":
-        # Load agent from local path
-        config_path = Path(agent_path) / "config.json"
-        with open(config_path, 'r') as f:
-            config_data = json.load(f)
-        
-        config = AgentConfig(
-            name=config_data["name"],
-            description=config_data["description"],
-            tools=config_data.get("tools", []),
-            author=config_data["meta"]["author"],
-            version=config_data["meta"]["version"],
-            license=config_data["meta"].get("license", "MIT")
-        )
-        
+        config = _load_local_agent(client, agent_path, agent_author, agent_name, agent_version)
         agent = client.create_agent(config)
-        
-        # Load tools from config
-        for tool_ref in config.tools:
-            tool = client.load_tool(f"cerebrum/tool/core/{tool_ref}", local=True)
-            agent.register_tool(tool)
-        
         result = client.run_agent(agent, task)
         print(result)
         
@@ -855,34 +4734,48 @@ def run_agent_command(mode: str, agent_path: str, task: str,
         # In production, this would download from agenthub
 
 
-def list_local_agents(agent_path: str = "cerebrum/example/agents"):
-    """List available local agents."""
-    agents = []
-    agent_dir = Path(agent_path)
+def run_batch_command(agent_path: str, tasks_file: str, output_file: str = "-",
+                      concurrency: int = 8, agent_author: str = None,
+                      agent_name: str = None, agent_version: str = None,
+                      tool_workers: int = 0) -> Dict:
+    """CLI command to run a local agent over a JSONL task file ("-" = stdin).
+    
+    With ``tool_workers`` set, blocking tools run in that many processes.
+    """
+    executor = ToolExecutor(tool_workers, mode="process") if tool_workers else None
+    client = CerebrumClient(tool_executor=executor)
+    config = _load_local_agent(client, agent_path, agent_author, agent_name, agent_version)
+    
+    tasks = sys.stdin if tasks_file == "-" else open(tasks_file, 'r', encoding="utf-8")
+    output = sys.stdout if output_file == "-" else open(output_file, 'w', encoding="utf-8")
     
-    if agent_dir.exists():
-        for author_dir in agent_dir.iterdir():
-            if author_dir.is_dir():
-                for agent_dir_inner in author_dir.iterdir():
-                    if agent_dir_inner.is_dir():
-                        agents.append(f"{author_dir.name}/{agent_dir_inner.name}")
+    async def _run():
+        try:
+            return await run_batch(client, config, tasks, output, concurrency)
+        finally:
+            await client.llm.aclose()
+    
+    try:
+        summary = asyncio.run(_run())
+    finally:
+        if tasks is not sys.stdin:
+            tasks.close()
+        if output is not sys.stdout:
+            output.close()
+        client.tools.executor.shutdown(wait=False)
     
-    return agents
+    print(json.dumps(summary), file=sys.stderr)
+    return summary
+
+
+def list_local_agents(agent_path: str = LOCAL_AGENT_PATH):
+    """List available local agents."""
+    return ManifestCatalog(agent_path).refresh().refs()
 
 
-def list_local_tools(tool_path: str = "cerebrum/tool/core"):
+def list_local_tools(tool_path: str = LOCAL_TOOL_PATH):
     """List available local tools."""
-    tools = []
-    tool_dir = Path(tool_path)
-    
-    if tool_dir.exists():
-        for author_dir in tool_dir.iterdir():
-            if author_dir.is_dir():
-                for tool_dir_inner in author_dir.iterdir():
-                    if tool_dir_inner.is_dir():
-                        tools.append(f"{author_dir.name}/{tool_dir_inner.name}")
-    
-    return tools
+    return ManifestCatalog(tool_path).refresh().refs()
 
 
 if __name__ == "__main__":
@@ -897,8 +4790,17 @@ if __name__ == "__main__":
     run_parser.add_argument("--agent_path", help="Path to agent directory")
     run_parser.add_argument("--agent_author", help="Agent author (for remote)")
     run_parser.add_argument("--agent_name", help="Agent name (for remote)")
-    run_parser.add_argument("--agent_version", help="Agent version (for remote)")
-    run_parser.add_argument("--task", required=True, help="Task to execute")
+    run_parser.add_argument("--agent_version",
+                            help="Agent version or constraint, e.g. '>=1.0,<2'")
+    run_parser.add_argument("--task", help="Task to execute")
+    run_parser.add_argument("--tasks_file",
+                            help="JSONL file of tasks to run in batch ('-' for stdin)")
+    run_parser.add_argument("--output", default="-",
+                            help="JSONL file for batch results (default: stdout)")
+    run_parser.add_argument("--concurrency", type=int, default=8,
+                            help="Tasks run at the same time in batch mode")
+    run_parser.add_argument("--tool_workers", type=int, default=0,
+                            help="Run tools in this many worker processes (batch mode)")
     run_parser.add_argument("--agenthub_url", default="https://app.aios.foundation")
     
     # List agents
@@ -913,7 +4815,22 @@ if __name__ == "__main__":
     
     args = parser.parse_args()
     
-    if args.command == "run-agent":
+    if args.command == "run-agent" and args.tasks_file:
+        if args.mode != "local":
+            parser.error("--tasks_file requires --mode local")
+        run_batch_command(
+            args.agent_path,
+            args.tasks_file,
+            args.output,
+            args.concurrency,
+            args.agent_author,
+            args.agent_name,
+            args.agent_version,
+            args.tool_workers
+        )
+    elif args.command == "run-agent":
+        if not args.task:
+            parser.error("run-agent requires --task or --tasks_file")
         run_agent_command(
             args.mode,
             args.agent_path,
@@ -0,0 +1,5 @@
+"""Performance benchmarks for the Cerebrum SDK.
+
+Each module is a standalone script; run it from ``AI-OS/AI-OS`` with
+``python -m cerebrum.benchmarks.<name>`` (``--help`` lists its options).
+"""
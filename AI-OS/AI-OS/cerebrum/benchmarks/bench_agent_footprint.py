@@ -0,0 +1,54 @@
+"""Memory footprint of many idle agents.
+
+Agents created through one CerebrumClient share its providers, tools,
+tool executor and storage; standalone ``AgentBase(config)`` agents build
+their own. Allocations are measured with tracemalloc.
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+from cerebrum import AgentBase, AgentConfig, CerebrumClient
+
+
+def measure(create, count: int) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    agents = [create(i) for i in range(count)]
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return agents, elapsed, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--agents", type=int, default=1000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    def config(i):
+        return AgentConfig(name=f"agent{i}", description=["idle agent"], tools=[],
+                           author="bench", version="1.0.0")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)  # agents' default storage goes here
+        client = CerebrumClient()
+        for label, create in (("client.create_agent", lambda i: client.create_agent(config(i))),
+                              ("AgentBase(config)", lambda i: AgentBase(config(i)))):
+            agents, elapsed, allocated = measure(create, args.agents)
+            print(f"{label:>20}: {allocated / 2 ** 20:6.2f} MiB "
+                  f"({allocated / args.agents / 1024:5.1f} KiB/agent), "
+                  f"created in {elapsed * 1e3:.0f} ms; distinct providers "
+                  f"{len({id(a.llm.providers) for a in agents})}, tool executors "
+                  f"{len({id(a.tools.executor) for a in agents})}, storages "
+                  f"{len({id(a.storage) for a in agents})}")
+            del agents
+
+
+if __name__ == "__main__":
+    main()
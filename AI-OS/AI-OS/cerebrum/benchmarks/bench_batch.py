@@ -0,0 +1,69 @@
+"""Throughput of run_batch against sequential run_agent calls.
+
+The provider sleeps for a fixed latency instead of calling an LLM, so
+the numbers show how well the batch runner overlaps waiting on the
+model. The reference runs each task with ``client.run_agent``, one after
+another.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import time
+
+from cerebrum import AgentConfig, CerebrumClient, LLMProvider, register_provider, run_batch
+
+
+class SleepLLM(LLMProvider):
+    """Answers after ``LATENCY`` seconds without blocking the event loop."""
+
+    LATENCY = 0.05
+
+    def generate(self, messages, max_tokens=4096, temperature=0.7, **kwargs):
+        time.sleep(self.LATENCY)
+        return "done"
+
+    async def agenerate(self, messages, max_tokens=4096, temperature=0.7, **kwargs):
+        await asyncio.sleep(self.LATENCY)
+        return "done"
+
+    def get_available_models(self):
+        return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per LLM call")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    SleepLLM.LATENCY = args.latency
+    register_provider("sleep", SleepLLM)
+    config = AgentConfig(name="bench", description=["benchmark agent"], tools=[],
+                         author="bench", version="1.0.0", llm_backend="sleep",
+                         storage_enabled=False)
+    client = CerebrumClient()
+    tasks = "".join(json.dumps({"id": i, "task": f"task {i}"}) + "\n" for i in range(args.tasks))
+
+    print(f"{args.tasks} tasks, {args.latency * 1e3:.0f} ms per LLM call")
+    start = time.perf_counter()
+    for i in range(args.tasks):
+        client.run_agent(client.create_agent(config), f"task {i}")
+    elapsed = time.perf_counter() - start
+    print(f"{'sequential run_agent':>22}: {args.tasks / elapsed:7.1f} tasks/s")
+
+    for concurrency in args.concurrency:
+        stats = asyncio.run(run_batch(client, config, io.StringIO(tasks), io.StringIO(),
+                                      concurrency=concurrency))
+        latency = stats["latency"]
+        print(f"{f'run_batch x{concurrency}':>22}: {stats['throughput']:7.1f} tasks/s, "
+              f"p50 {latency['p50'] * 1e3:.0f} ms, p99 {latency['p99'] * 1e3:.0f} ms, "
+              f"{stats['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
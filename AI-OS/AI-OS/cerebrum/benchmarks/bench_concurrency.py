@@ -0,0 +1,124 @@
+"""Concurrent agents per core against a local stub LLM server.
+
+Starts an OpenAI-compatible stub server (aiohttp) in a subprocess that
+answers every chat completion after a fixed delay, then runs N agents
+concurrently through one shared OpenAILLM pointed at it. The pooled
+async client is compared with calling the blocking ``generate`` on the
+event loop (what AgentBase.think used to do). CPU time is counted for
+the agent process only, so runs per CPU-second is how many agent runs
+one core can sustain.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from cerebrum import AgentBase, AgentConfig, LLMResponse, OpenAILLM
+
+
+def serve(port: int, delay: float):
+    """Run the stub server until killed."""
+    from aiohttp import web
+
+    async def chat(request):
+        body = await request.json()
+        await asyncio.sleep(delay)
+        return web.json_response({
+            "id": "stub", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "Hello from the stub"}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 4, "total_tokens": 14}})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat)
+    web.run_app(app, host="127.0.0.1", port=port, print=None, access_log=None)
+
+
+def start_server(delay: float) -> tuple:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    proc = subprocess.Popen([sys.executable, "-m", __spec__.name, "--serve", str(port),
+                             "--delay", str(delay)])
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return proc, port
+        except OSError:
+            if time.monotonic() > deadline or proc.poll() is not None:
+                proc.kill()
+                raise RuntimeError("stub server did not start (is aiohttp installed?)")
+            time.sleep(0.05)
+
+
+class BlockingOpenAILLM(OpenAILLM):
+    """Reference: the blocking client called on the event loop."""
+
+    async def acomplete(self, messages, max_tokens=4096, temperature=0.7, **kwargs):
+        return LLMResponse(content=self.generate(messages, max_tokens, temperature, **kwargs))
+
+
+async def run_agents(provider, count: int) -> tuple:
+    agents = []
+    for i in range(count):
+        agent = AgentBase(AgentConfig(name=f"agent{i}", description=["benchmark agent"],
+                                      tools=[], author="bench", version="1.0.0",
+                                      storage_enabled=False))
+        agent.llm.providers["openai"] = provider
+        agent.llm.set_provider("openai")
+        agents.append(agent)
+    latencies = []
+
+    async def run(agent):
+        start = time.perf_counter()
+        await agent.run("hello")
+        latencies.append(time.perf_counter() - start)
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    await asyncio.gather(*(run(agent) for agent in agents))
+    return time.perf_counter() - wall, time.process_time() - cpu, latencies
+
+
+async def measure(label: str, provider, counts: list):
+    await run_agents(provider, 1)  # open the connection pool
+    for count in counts:
+        wall, cpu, latencies = await run_agents(provider, count)
+        print(f"{label:>12} x{count:<4}: {count / wall:7.1f} runs/s, "
+              f"p50 {statistics.median(latencies) * 1e3:6.0f} ms, "
+              f"{count / cpu:6.0f} runs per CPU-second")
+    await provider.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--agents", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--delay", type=float, default=0.05, help="stub latency in seconds")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve, args.delay)
+        return
+    logging.disable(logging.WARNING)
+
+    proc, port = start_server(args.delay)
+    try:
+        base_url = f"http://127.0.0.1:{port}/v1"
+        print(f"stub latency {args.delay * 1e3:.0f} ms, {os.cpu_count()} CPUs shared with the stub")
+        for label, provider_class in (("pooled async", OpenAILLM),
+                                      ("blocking", BlockingOpenAILLM)):
+            provider = provider_class(api_key="stub", base_url=base_url)
+            asyncio.run(measure(label, provider, args.agents))
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Cost of saving and loading agent memory.
+
+Compares the append-only memory log with rewriting the whole memory as
+one indented JSON document on every save (what save_to_disk used to do).
+Checkpoints add a batch of messages and save again. Loading the log is
+lazy, so its first read includes the replay and rebuilding the search
+index.
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+from cerebrum import AgentMessage, MemoryManager
+
+
+def save_json(memory: MemoryManager, filepath: str):
+    """Reference: rewrite both tiers as indented JSON."""
+    data = {
+        "short_term": [{"role": m.role, "content": m.content, "timestamp": m.timestamp}
+                       for m in memory.short_term],
+        "long_term": [{"role": m.role, "content": m.content, "timestamp": m.timestamp}
+                      for m in memory.long_term],
+    }
+    with open(filepath, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def load_json(filepath: str, max_entries: int):
+    """Reference: read the whole document and build every message."""
+    with open(filepath) as f:
+        data = json.load(f)
+    messages = [AgentMessage(**m) for tier in ("long_term", "short_term") for m in data[tier]]
+    return lambda: messages
+
+
+def load_log(filepath: str, max_entries: int):
+    """Load the memory log; returns a callable giving all messages."""
+    memory = MemoryManager(max_entries=max_entries)
+    memory.load_from_disk(filepath)  # the log is replayed on first read
+    return memory.get_all
+
+
+def timed(call) -> float:
+    start = time.perf_counter()
+    call()
+    return time.perf_counter() - start
+
+
+def run(save, load, path: str, args) -> dict:
+    max_entries = args.messages // 2
+    memory = MemoryManager(max_entries=max_entries)
+    for i in range(args.messages):
+        memory.add(AgentMessage(role="user", content=f"message number {i} with some words in it"))
+    result = {"full save": timed(lambda: save(memory, path))}
+
+    def checkpoints():
+        for c in range(args.checkpoints):
+            for i in range(args.batch):
+                memory.add(AgentMessage(role="assistant", content=f"reply {c} {i}"))
+            save(memory, path)
+    result["checkpoint"] = timed(checkpoints) / args.checkpoints
+    result["file MiB"] = os.path.getsize(path) / 2 ** 20
+    loaded = []
+    result["load"] = timed(lambda: loaded.append(load(path, max_entries)))
+    result["first read"] = timed(lambda: len(loaded[0]()))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--checkpoints", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=100, help="messages added per checkpoint")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = {
+            "memory log": run(lambda m, p: m.save_to_disk(p), load_log,
+                              os.path.join(workdir, "memory.jsonl"), args),
+            "indented JSON": run(save_json, load_json, os.path.join(workdir, "memory.json"), args),
+        }
+    print(f"{args.messages} messages, checkpoints of {args.batch}")
+    for label, result in results.items():
+        print(f"{label:>14}: full save {result['full save'] * 1e3:6.0f} ms, "
+              f"checkpoint {result['checkpoint'] * 1e3:7.1f} ms, file {result['file MiB']:5.1f} MiB, "
+              f"load {result['load'] * 1e3:5.0f} ms, first read {result['first read'] * 1e3:5.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Cost of MemoryManager.add and search as memory grows.
+
+Compares the BM25 index with a linear scan over all messages (what
+search used to do: newest first, case-insensitive substring match).
+"""
+
+import argparse
+import logging
+import random
+import time
+
+from cerebrum import AgentMessage, MemoryManager
+
+
+def linear_search(memory: MemoryManager, query: str, n: int = 5) -> list:
+    """Reference: scan every message, newest first."""
+    results = []
+    for msg in reversed(memory.get_all()):
+        if query.lower() in msg.content.lower():
+            results.append(msg)
+            if len(results) >= n:
+                break
+    return results
+
+
+def per_query_cost(search, queries: list) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        search(query)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100_000],
+                        help="messages in memory (1000000 takes about a minute)")
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    rng = random.Random(1)
+    words = [f"w{i}z" for i in range(args.vocabulary)]  # no word is a substring of another
+    print(f"{'messages':>9} {'add':>12} {'BM25 search':>14} {'linear scan':>14} "
+          f"{'no-match scan':>14}")
+    for size in args.sizes:
+        memory = MemoryManager(max_entries=size)
+        messages = [AgentMessage(role="user", content=" ".join(rng.choices(words, k=20)))
+                    for _ in range(size)]
+        start = time.perf_counter()
+        for message in messages:
+            memory.add(message)
+        add = (time.perf_counter() - start) / size
+        queries = [rng.choice(words) for _ in range(args.queries)]
+        indexed = per_query_cost(memory.search, queries)
+        linear = per_query_cost(lambda q: linear_search(memory, q), queries)
+        # A word that is in no message makes the scan read all of memory
+        full = per_query_cost(lambda q: linear_search(memory, q), ["absent"] * 3)
+        print(f"{size:>9} {add * 1e6:>9.2f} us {indexed * 1e3:>11.3f} ms "
+              f"{linear * 1e3:>11.3f} ms {full * 1e3:>11.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
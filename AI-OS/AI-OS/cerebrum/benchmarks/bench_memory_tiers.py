@@ -0,0 +1,79 @@
+"""Per-message cost of the memory tiers once they are full.
+
+Compares the RingBuffer tiers MemoryManager uses with the old list tiers,
+which evicted with ``pop(0)`` and so copied the whole tier on every add.
+MemoryManager.add is also timed as a whole, search indexing included.
+"""
+
+import argparse
+import logging
+import time
+
+from cerebrum import AgentMessage, MemoryManager, RingBuffer
+
+
+class ListTiers:
+    """Reference: the old short/long-term lists."""
+
+    def __init__(self, max_entries: int):
+        self.short_term, self.long_term = [], []
+        self.max_entries = max_entries
+
+    def add(self, message):
+        self.short_term.append(message)
+        if len(self.short_term) > self.max_entries:
+            self.long_term.append(self.short_term.pop(0))
+            if len(self.long_term) > self.max_entries:
+                self.long_term.pop(0)
+
+    def get_recent(self, n: int = 10):
+        return self.short_term[-n:]
+
+
+class RingTiers:
+    """The same tiers on RingBuffer, as in MemoryManager."""
+
+    def __init__(self, max_entries: int):
+        self.short_term, self.long_term = RingBuffer(max_entries), RingBuffer(max_entries)
+
+    def add(self, message):
+        oldest = self.short_term.append(message)
+        if oldest is not None:
+            self.long_term.append(oldest)
+
+    def get_recent(self, n: int = 10):
+        return self.short_term[-n:]
+
+
+def per_call_cost(call, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        call()
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000],
+                        help="max_entries of each tier")
+    parser.add_argument("--adds", type=int, default=2000, help="adds timed at capacity")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    message = AgentMessage(role="user", content="hello")
+    print(f"{'max_entries':>11} {'tiers':>14} {'add':>12} {'get_recent(10)':>15}")
+    for size in args.sizes:
+        for label, memory in (("RingBuffer", RingTiers(size)), ("list", ListTiers(size)),
+                              ("MemoryManager", MemoryManager(max_entries=size))):
+            if isinstance(memory, ListTiers):  # filling by add would take minutes
+                memory.short_term, memory.long_term = [message] * size, [message] * size
+            else:
+                for _ in range(2 * size):  # fill both tiers
+                    memory.add(message)
+            add = per_call_cost(lambda: memory.add(message), args.adds)
+            recent = per_call_cost(lambda: memory.get_recent(10), args.adds)
+            print(f"{size:>11} {label:>14} {add * 1e6:>9.2f} us {recent * 1e6:>12.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Resident memory of one million messages and tool calls.
+
+Each kind of object is built in a fresh interpreter and measured as the
+growth in RSS (Linux, read from /proc/self/statm). The references are the
+old dataclasses without slots, whose messages always created a metadata
+dict.
+"""
+
+import argparse
+import gc
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from cerebrum import AgentMessage, MessageStore, ToolCall, ToolCallStatus
+
+
+@dataclass
+class OldAgentMessage:
+    """Reference: AgentMessage before slots."""
+    role: str
+    content: str
+    tool_calls: Optional[List[Dict]] = None
+    tool_call_id: Optional[str] = None
+    timestamp: float = field(default_factory=time.time)
+    metadata: Dict = field(default_factory=dict)
+
+
+@dataclass
+class OldToolCall:
+    """Reference: ToolCall before slots."""
+    tool_name: str
+    arguments: Dict[str, Any]
+    call_id: str
+    status: ToolCallStatus = ToolCallStatus.PENDING
+    result: Optional[str] = None
+    error: Optional[str] = None
+    start_time: float = field(default_factory=time.time)
+    end_time: Optional[float] = None
+
+
+ROLES = ("user", "assistant", "tool")
+
+
+def messages(cls, count: int):
+    return (cls(role=ROLES[i % 3], content=f"message number {i} with some text")
+            for i in range(count))
+
+
+KINDS = {
+    "old AgentMessage": lambda n: list(messages(OldAgentMessage, n)),
+    "AgentMessage": lambda n: list(messages(AgentMessage, n)),
+    "MessageStore": lambda n: MessageStore(messages(AgentMessage, n)),
+    "old ToolCall": lambda n: [OldToolCall(tool_name="calc", arguments={}, call_id=str(i))
+                               for i in range(n)],
+    "ToolCall": lambda n: [ToolCall(tool_name="calc", arguments={}, call_id=str(i))
+                           for i in range(n)],
+}
+
+
+def rss() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def measure(kind: str, count: int):
+    gc.collect()
+    before = rss()
+    objects = KINDS[kind](count)
+    gc.collect()
+    print(rss() - before)
+    del objects
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--kind", choices=list(KINDS), help="measure one kind in this process")
+    args = parser.parse_args()
+    if args.kind:
+        measure(args.kind, args.count)
+        return
+
+    for kind in KINDS:
+        proc = subprocess.run([sys.executable, "-m", __spec__.name, "--kind", kind,
+                               "--count", str(args.count)],
+                              capture_output=True, text=True, check=True)
+        grown = int(proc.stdout.split()[-1])
+        print(f"{kind:>17}: {grown / 2 ** 20:7.1f} MiB ({grown / args.count:6.1f} bytes each)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Per-turn cost of AgentBase.build_messages as the conversation grows.
+
+Compares the incrementally maintained message list with rebuilding the
+whole list every turn (what build_messages used to do).
+"""
+
+import argparse
+import logging
+import time
+
+from cerebrum import AgentBase, AgentConfig, AgentMessage, Tool
+
+
+class SchemaTool(Tool):
+    """Tool with a realistic description and schema; never run."""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def description(self) -> str:
+        return f"{self._name}: " + "does something useful " * 5
+
+    def get_tool_call_format(self):
+        return {"name": self._name, "description": self.description,
+                "parameters": {"type": "object",
+                               "properties": {f"p{i}": {"type": "string"} for i in range(10)}}}
+
+    def run(self, params):
+        return ""
+
+
+def rebuild_messages(agent: AgentBase) -> list:
+    """Reference: rebuild preamble and history from scratch."""
+    messages = [dict(m) for m in agent._build_preamble()]
+    messages.extend(agent._message_to_dict(m) for m in agent.conversation_history)
+    return messages
+
+
+def per_turn_cost(agent: AgentBase, build, turns: int) -> float:
+    start = time.perf_counter()
+    for _ in range(turns):
+        agent.conversation_history.append(AgentMessage(role="user", content="hello " * 20))
+        build()
+    return (time.perf_counter() - start) / turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--tools", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=200, help="turns timed at each size")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    agent = AgentBase(AgentConfig(name="bench", description=["benchmark agent"], tools=[],
+                                  author="bench", version="1.0.0",
+                                  memory_enabled=False, storage_enabled=False))
+    agent.context.context_window = 10 ** 9  # send the whole history
+    for i in range(args.tools):
+        agent.register_tool(SchemaTool(f"tool{i}"))
+
+    print(f"{'history':>8} {'incremental':>14} {'full rebuild':>14}")
+    for size in args.sizes:
+        while len(agent.conversation_history) < size:
+            agent.conversation_history.append(AgentMessage(role="user", content="hello " * 20))
+        agent.build_messages()
+        incremental = per_turn_cost(agent, agent.build_messages, args.turns)
+        rebuild = per_turn_cost(agent, lambda: rebuild_messages(agent), args.turns)
+        print(f"{size:>8} {incremental * 1e6:>11.1f} us {rebuild * 1e6:>11.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Cold-start time of importing cerebrum, creating an agent and its first run.
+
+Each measurement runs in a fresh interpreter with ``-X importtime``. The
+agent uses an offline provider, so the numbers are SDK overhead only.
+The output also lists which LLM SDKs were imported and the slowest
+imports under ``import cerebrum``.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+CHILD = """
+import json, sys, time
+t0 = time.perf_counter()
+import cerebrum
+t1 = time.perf_counter()
+
+class OfflineLLM(cerebrum.LLMProvider):
+    def generate(self, messages, max_tokens=4096, temperature=0.7, **kwargs):
+        return "done"
+    def get_available_models(self):
+        return []
+
+cerebrum.register_provider("offline", OfflineLLM)
+client = cerebrum.CerebrumClient()
+agent = client.create_agent(cerebrum.AgentConfig(
+    name="bench", description=["benchmark agent"], tools=[], author="bench",
+    version="1.0.0", llm_backend="offline", storage_enabled=False))
+t2 = time.perf_counter()
+client.run_agent(agent, "hello")
+t3 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "create": t2 - t1, "first_run": t3 - t2,
+                  "sdks": [m for m in ("openai", "anthropic", "groq") if m in sys.modules]}))
+"""
+
+
+def parse_importtime(stderr: str) -> tuple:
+    """Cumulative time of ``cerebrum`` and of each module it imports directly.
+    
+    ``-X importtime`` prints a module after its own imports, indented one
+    level deeper per nesting level; times are in microseconds.
+    """
+    children = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, raw_name = line[len("import time:"):].split("|")
+        name = raw_name.strip()
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        if depth == 0:
+            if name == "cerebrum":
+                return int(cumulative), children
+            children = {}
+        elif depth == 1:
+            children[name] = int(cumulative)
+    return 0, {}
+
+
+def run_child() -> tuple:
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD],
+                          capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    return json.loads(proc.stdout.strip().splitlines()[-1]), parse_importtime(proc.stderr), wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="slowest top-level imports to list")
+    args = parser.parse_args()
+
+    results = [run_child() for _ in range(args.runs)]
+    for key in ("import", "create", "first_run"):
+        print(f"{key:>10}: {statistics.median(r[0][key] for r in results) * 1e3:7.1f} ms (median)")
+    print(f"{'process':>10}: {statistics.median(r[2] for r in results) * 1e3:7.1f} ms "
+          f"(interpreter start to exit)")
+    print(f"LLM SDKs imported: {results[-1][0]['sdks'] or 'none'}")
+
+    total, imports = results[-1][1]
+    print(f"import cerebrum: {total / 1e3:.1f} ms cumulative; slowest direct imports:")
+    for name, us in sorted(imports.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<24} {us / 1e3:7.1f} ms")
+    print(f"  {'(cerebrum itself)':<24} {(total - sum(imports.values())) / 1e3:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
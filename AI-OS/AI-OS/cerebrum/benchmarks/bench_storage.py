@@ -0,0 +1,75 @@
+"""Storage throughput and event-loop stalls with many concurrent agents.
+
+Each agent alternates a short sleep (standing in for an LLM call) with a
+save and a load, using the blocking API (``sync``), the async API
+(``async``), or one batched write and read at the end (``batch``). A
+heartbeat task measures the longest time the event loop was blocked.
+"""
+
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+
+from cerebrum import STORAGE_BACKENDS, StorageManager
+
+DOC = {"content": "x" * 2000, "numbers": list(range(50))}
+
+
+async def agent(storage: StorageManager, i: int, mode: str, entries: int):
+    keys = [f"agent{i}_{k}" for k in range(entries)]
+    for key in keys:
+        await asyncio.sleep(0.002)
+        if mode == "sync":
+            storage.save(key, DOC)
+            storage.load(key)
+        elif mode == "async":
+            await storage.asave(key, DOC)
+            await storage.aload(key)
+    if mode == "batch":
+        await storage.asave_many({key: DOC for key in keys})
+        await storage.aload_many(keys)
+
+
+async def run(storage: StorageManager, mode: str, args) -> tuple:
+    stall, done = 0.0, False
+
+    async def heartbeat():
+        nonlocal stall
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stall = max(stall, time.perf_counter() - start - 0.001)
+
+    monitor = asyncio.create_task(heartbeat())
+    start = time.perf_counter()
+    await asyncio.gather(*(agent(storage, i, mode, args.entries) for i in range(args.agents)))
+    elapsed = time.perf_counter() - start
+    done = True
+    await monitor
+    return elapsed, stall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--agents", type=int, default=100)
+    parser.add_argument("--entries", type=int, default=20, help="entries each agent writes")
+    parser.add_argument("--durable", action="store_true", help="fsync every write")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    operations = args.agents * args.entries * 2
+    print(f"{args.agents} agents, {operations} operations, durable={args.durable}")
+    for backend in STORAGE_BACKENDS:
+        for mode in ("sync", "async", "batch"):
+            with tempfile.TemporaryDirectory() as path:
+                storage = StorageManager(path, backend=backend, durable=args.durable)
+                elapsed, stall = asyncio.run(run(storage, mode, args))
+                storage.close()
+            print(f"{backend:>7} {mode:>6}: {operations / elapsed:8.0f} ops/s, "
+                  f"wall {elapsed * 1e3:5.0f} ms, longest loop stall {stall * 1e3:5.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
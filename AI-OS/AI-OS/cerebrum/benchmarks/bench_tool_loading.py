@@ -0,0 +1,101 @@
+"""Cost of loading tool packages for new agents.
+
+Generates tool packages with sizeable entry modules in a temporary
+directory, then times an agent registering all of them: the first agent,
+later agents served from the tool cache, the first agent after
+``preload_tools``, and a reference that empties the cache before every
+agent so each one re-executes every tool module. Each scenario gets its
+own ToolLoader, since clients share one by default.
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+from cerebrum import AgentConfig, CerebrumClient, ToolLoader
+
+ENTRY = '''from cerebrum import Tool
+import json, re, typing
+{constants}
+
+
+class BenchTool(Tool):
+    name = "{name}"
+    description = "benchmark tool"
+
+    def get_tool_call_format(self):
+        return {{"name": self.name}}
+
+    def run(self, params):
+        return "ok"
+'''
+
+
+def make_tools(root: str, count: int) -> list:
+    """Write ``count`` tool packages under ``root/bench``; returns their paths."""
+    constants = "\n".join(f"CONST_{j} = {{'k': [{j}] * 20}}" for j in range(200))
+    paths = []
+    for i in range(count):
+        path = os.path.join(root, "bench", f"tool{i}")
+        os.makedirs(path)
+        with open(os.path.join(path, "config.json"), "w") as f:
+            json.dump({"name": f"tool{i}", "description": "benchmark tool",
+                       "meta": {"author": "bench", "version": "1.0.0"},
+                       "build": {"entry": "entry.py", "module": "BenchTool"}}, f)
+        with open(os.path.join(path, "entry.py"), "w") as f:
+            f.write(ENTRY.format(constants=constants, name=f"tool{i}"))
+        paths.append(path)
+    return paths
+
+
+def create_agent(client: CerebrumClient, paths: list):
+    agent = client.create_agent(AgentConfig(name="bench", description=["benchmark agent"],
+                                            tools=[], author="bench", version="1.0.0",
+                                            storage_enabled=False))
+    for path in paths:
+        agent.register_tool(client.load_tool(path))
+    return agent
+
+
+def per_agent_cost(client: CerebrumClient, paths: list, agents: int, uncached: bool = False):
+    start = time.perf_counter()
+    for _ in range(agents):
+        if uncached:
+            client.tool_loader.invalidate()
+        create_agent(client, paths)
+    return (time.perf_counter() - start) / agents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tools", type=int, default=50)
+    parser.add_argument("--agents", type=int, default=20, help="agents timed after the first")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as root:
+        paths = make_tools(root, args.tools)
+        client = CerebrumClient(tool_loader=ToolLoader())
+        first = per_agent_cost(client, paths, 1)
+        cached = per_agent_cost(client, paths, args.agents)
+        uncached = per_agent_cost(client, paths, args.agents, uncached=True)
+
+        preloaded_client = CerebrumClient(tool_loader=ToolLoader())
+        start = time.perf_counter()
+        preloaded_client.preload_tools(root)
+        preload = time.perf_counter() - start
+        after_preload = per_agent_cost(preloaded_client, paths, 1)
+
+    print(f"{args.tools} tools per agent")
+    print(f"{'first agent':>22}: {first * 1e3:7.1f} ms (imports every tool)")
+    print(f"{'cached':>22}: {cached * 1e3:7.2f} ms per agent")
+    print(f"{'uncached':>22}: {uncached * 1e3:7.1f} ms per agent (cache emptied before each)")
+    print(f"{'preload_tools':>22}: {preload * 1e3:7.1f} ms, then first agent "
+          f"{after_preload * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
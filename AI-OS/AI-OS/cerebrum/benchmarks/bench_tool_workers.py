@@ -0,0 +1,90 @@
+"""Scaling of CPU-bound tools across worker threads and processes.
+
+Runs one blocking pure-Python tool call per worker concurrently through
+ToolExecutor, in thread and in process mode, so thread mode shows the
+GIL serializing the calls. It then times a tool returning a large numpy
+array from a process worker, passed back pickled or through shared
+memory (``shm_threshold``). Worker pools are started and warmed before
+timing.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from cerebrum import Tool, ToolExecutor
+
+
+class BurnTool(Tool):
+    """CPU-bound pure Python work."""
+
+    name = "burn"
+    description = "CPU-bound pure Python work"
+
+    def get_tool_call_format(self):
+        return {"name": self.name}
+
+    def run(self, params):
+        total = 0
+        for i in range(params["n"]):
+            total += i * i % 7
+        return str(total)
+
+
+class MatrixTool(Tool):
+    """Returns a ``rows`` x 1024 float64 array."""
+
+    name = "matrix"
+    description = "Returns a large array"
+
+    def get_tool_call_format(self):
+        return {"name": self.name}
+
+    def run(self, params):
+        import numpy as np
+        return np.full((params["rows"], 1024), 1.5)
+
+
+async def timed_calls(executor: ToolExecutor, tool: Tool, params: dict, calls: int) -> float:
+    await asyncio.gather(*(executor.run(tool, params) for _ in range(executor.max_workers)))
+    start = time.perf_counter()
+    await asyncio.gather(*(executor.run(tool, params) for _ in range(calls)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--n", type=int, default=2_000_000, help="loop length of each burn call")
+    parser.add_argument("--rows", type=int, default=4096, help="rows of the returned array")
+    parser.add_argument("--calls", type=int, default=10, help="array calls timed")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print(f"{os.cpu_count()} CPUs; one burn call of n={args.n} per worker")
+    for workers in args.workers:
+        row = []
+        for mode in ("thread", "process"):
+            executor = ToolExecutor(workers, mode=mode, timeout=None, tool_paths=[])
+            row.append(asyncio.run(timed_calls(executor, BurnTool(), {"n": args.n}, workers)))
+            executor.shutdown()
+        print(f"{workers:>3} workers: threads {row[0] * 1e3:7.0f} ms, processes {row[1] * 1e3:7.0f} ms")
+
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("numpy is not installed; skipping the array results")
+        return
+    size = args.rows * 1024 * 8 / 2 ** 20
+    for label, threshold in (("pickled", 1 << 62), ("shared memory", 0)):
+        executor = ToolExecutor(1, mode="process", timeout=None, tool_paths=[],
+                                shm_threshold=threshold)
+        elapsed = asyncio.run(timed_calls(executor, MatrixTool(), {"rows": args.rows}, args.calls))
+        executor.shutdown()
+        print(f"{size:.0f} MiB array, {label:>13}: {elapsed / args.calls * 1e3:6.1f} ms per call")
+
+
+if __name__ == "__main__":
+    main()
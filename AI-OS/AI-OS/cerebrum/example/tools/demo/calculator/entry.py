@@ -5,12 +5,14 @@ This tool provides basic mathematical operations for agents.
 """
 
 from typing import Any, Dict
-from cerebrum import Tool
+from cerebrum import Tool, ToolCachePolicy
 
 
 class CalculatorTool(Tool):
     """Calculator tool for basic math operations."""
     
+    cache_policy = ToolCachePolicy.PURE
+    
     @property
     def name(self) -> str:
         return "calculator"
@@ -7,7 +7,7 @@ integrate with a real weather API like OpenWeatherMap.
 """
 
 from typing import Any, Dict
-from cerebrum import Tool
+from cerebrum import Tool, ToolCachePolicy
 import random
 from datetime import datetime
 
@@ -15,6 +15,9 @@ from datetime import datetime
 class WeatherTool(Tool):
     """Weather tool for getting weather information."""
     
+    cache_policy = ToolCachePolicy.TTL
+    cache_ttl = 600.0  # demo data; a real API updates roughly every 10 minutes
+    
     def __init__(self):
         self.conditions = [
             {"text": "Slnečno", "icon": "☀️", "temp_range": (25, 35)},
@@ -0,0 +1,176 @@
+"""Tests for the agent loop: tool feedback, budgets and streaming."""
+
+import asyncio
+import time
+
+import pytest
+
+from cerebrum import AgentBase, AgentConfig, LLMProvider, LLMResponse, Tool
+
+CALL = '<tool_call>{"name": "add", "arguments": {"a": 1, "b": 2}}</tool_call>'
+
+
+class AddTool(Tool):
+    name = "add"
+    description = "Adds two integers"
+
+    def get_tool_call_format(self):
+        return {"name": self.name, "description": self.description,
+                "parameters": {"type": "object",
+                               "properties": {"a": {"type": "integer"}, "b": {"type": "integer"}},
+                               "required": ["a", "b"]}}
+
+    def run(self, params):
+        time.sleep(params.get("delay", 0))
+        return str(params["a"] + params["b"])
+
+
+class ScriptedLLM(LLMProvider):
+    """Returns the given responses in order, then repeats the last one."""
+
+    def __init__(self, *responses, delay=0.0):
+        self.responses = list(responses)
+        self.delay = delay
+        self.requests = []
+
+    def _next(self, messages, kwargs):
+        self.requests.append((list(messages), kwargs))
+        return self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+
+    def generate(self, messages, max_tokens=4096, temperature=0.7, **kwargs):
+        return self._next(messages, kwargs)
+
+    async def astream(self, messages, max_tokens=4096, temperature=0.7, **kwargs):
+        response = self._next(messages, kwargs)
+        for i in range(0, len(response), 8):
+            await asyncio.sleep(self.delay)
+            yield response[i:i + 8]
+
+    def get_available_models(self):
+        return []
+
+
+class NativeLLM(ScriptedLLM):
+    """Provider with native tool calling; responses are LLMResponse objects."""
+
+    supports_tools = True
+
+    async def acomplete(self, messages, max_tokens=4096, temperature=0.7, **kwargs):
+        return self._next(messages, kwargs)
+
+
+def make_agent(llm, **kwargs):
+    config = AgentConfig(name="test", description=["test agent"], tools=[], author="test",
+                         version="1.0.0", storage_enabled=False, **kwargs)
+    agent = AgentBase(config)
+    agent.llm.providers["openai"] = llm
+    agent.llm.set_provider("openai")
+    agent.register_tool(AddTool())
+    return agent
+
+
+@pytest.mark.asyncio
+async def test_tool_results_are_fed_back():
+    llm = ScriptedLLM(CALL, "the sum is 3")
+    agent = make_agent(llm)
+    assert await agent.run("add") == "the sum is 3"
+    assert agent.stop_reason == "completed"
+    assert [m.role for m in agent.conversation_history] == ["user", "assistant", "tool", "assistant"]
+    assert "<tool_result>\n3\n</tool_result>" in llm.requests[1][0][-1]["content"]
+
+
+@pytest.mark.asyncio
+async def test_budgets_apply_per_turn():
+    llm = ScriptedLLM(CALL)
+    agent = make_agent(llm, max_iterations=3)
+    for turn in range(1, 3):
+        await agent.run("loop")
+        assert agent.stop_reason == "max_iterations"
+        assert len(llm.requests) == 3 * turn
+    assert agent.iteration_count == 6
+
+
+@pytest.mark.asyncio
+async def test_token_budget_applies_per_turn():
+    agent = make_agent(ScriptedLLM(CALL), max_total_tokens=1)
+    await agent.run("loop")
+    await agent.run("loop")
+    assert agent.stop_reason == "max_total_tokens"
+    assert agent.turn_iterations == 1
+    assert agent.total_tokens > agent.turn_tokens
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("stream", [False, True])
+async def test_tool_calls_per_response_are_capped(stream):
+    agent = make_agent(ScriptedLLM(CALL * 3, "done"), max_tool_calls=2)
+    if stream:
+        [delta async for delta in agent.think_stream("add")]
+    else:
+        await agent.think("add")
+    assert len(agent.conversation_history[1].tool_calls) == 2
+    assert [m.role for m in agent.conversation_history] == ["user", "assistant", "tool", "tool",
+                                                            "assistant"]
+    assert len(agent.tools.tool_calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_starts_tools_and_feeds_results_back():
+    agent = make_agent(ScriptedLLM(CALL, "done"))
+    deltas = [delta async for delta in agent.think_stream("add")]
+    assert "".join(deltas) == CALL + "done"
+    assert agent.conversation_history[2].content == "3"
+    assert agent.stop_reason == "completed"
+
+
+@pytest.mark.asyncio
+async def test_stream_times_out():
+    agent = make_agent(ScriptedLLM("a slow response", delay=0.5), timeout=0.2)
+    with pytest.raises(TimeoutError):
+        async for _ in agent.think_stream("hi"):
+            pass
+    assert agent.stop_reason == "timeout"
+
+
+@pytest.mark.asyncio
+async def test_stream_cancels_tools_when_consumer_stops():
+    slow_call = '<tool_call>{"name": "add", "arguments": {"a": 1, "b": 2, "delay": 0.3}}</tool_call>'
+    agent = make_agent(ScriptedLLM(slow_call + " and more text"))
+    stream = agent.think_stream("add")
+    started = False
+    async for _ in stream:
+        if len(asyncio.all_tasks()) > 1:  # the tool call is running
+            started = True
+            break
+    await stream.aclose()
+    assert started
+    assert [task for task in asyncio.all_tasks() if task is not asyncio.current_task()] == []
+
+
+@pytest.mark.asyncio
+async def test_native_tool_calls_and_validation_errors():
+    llm = NativeLLM(
+        LLMResponse(content="", tool_calls=[{"id": "c1", "name": "add", "arguments": {"a": "x"}}]),
+        LLMResponse(content="", tool_calls=[{"id": "c2", "name": "add", "arguments": {"a": 1, "b": 2}}]),
+        LLMResponse(content="3"))
+    agent = make_agent(llm)
+    assert await agent.run("add") == "3"
+
+    messages, kwargs = llm.requests[0]
+    assert kwargs["tools"] == agent.tools.get_schemas()
+    assert "<tool_call>" not in messages[0]["content"]
+
+    invalid, valid = agent.conversation_history[2], agent.conversation_history[4]
+    assert invalid.tool_call_id == "c1" and invalid.metadata["error"]
+    assert "arguments.b is required" in invalid.content
+    assert valid.tool_call_id == "c2" and valid.content == "3"
+    assert llm.requests[1][0][-1] == {"role": "tool", "tool_call_id": "c1", "content": invalid.content}
+
+
+@pytest.mark.asyncio
+async def test_model_is_only_overridden_when_configured():
+    default, custom = ScriptedLLM("hi"), ScriptedLLM("hi")
+    await make_agent(default).run("hello")
+    await make_agent(custom, model_name="small-model").run("hello")
+    assert "model" not in default.requests[0][1]
+    assert custom.requests[0][1]["model"] == "small-model"
@@ -0,0 +1,47 @@
+"""Tests for the LLM response cache."""
+
+import os
+
+from cerebrum import LLMResponse, ResponseCache
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    ResponseCache(disk_path=str(tmp_path)).put("ab01", LLMResponse(content="hello"))
+    cache = ResponseCache(disk_path=str(tmp_path))
+    assert cache.get("ab01").content == "hello"
+    assert cache.get_stats()["disk_hits"] == 1
+
+
+def test_malformed_disk_entries_are_misses_and_deleted(tmp_path):
+    cache = ResponseCache(disk_path=str(tmp_path))
+    for key, text in [("aa01", "{not json"), ("aa02", '{"response": {}}'),
+                      ("aa03", '{"created": 1, "response": {"text": "x"}}'),
+                      ("aa04", "[1, 2]")]:
+        filepath = tmp_path / key[:2] / f"{key}.json"
+        filepath.parent.mkdir(exist_ok=True)
+        filepath.write_text(text)
+        assert cache.get(key) is None
+        assert not filepath.exists()
+    assert cache.get_stats()["misses"] == 4
+
+
+def test_expired_disk_entries_are_deleted(tmp_path):
+    filepath = tmp_path / "ab" / "ab01.json"
+    filepath.parent.mkdir()
+    filepath.write_text('{"created": 1, "response": {"content": "hello"}}')
+    assert ResponseCache(ttl=60, disk_path=str(tmp_path)).get("ab01") is None
+    assert not filepath.exists()
+
+
+def test_disk_tier_is_pruned_to_its_size_limit(tmp_path):
+    cache = ResponseCache(disk_path=str(tmp_path), max_disk_bytes=2000)
+    for i in range(40):
+        key = f"{i:02x}{i:062x}"
+        cache.put(key, LLMResponse(content="x" * 100))
+        os.utime(tmp_path / key[:2] / f"{key}.json", (i, i))
+
+    files = list(tmp_path.glob("*/*.json"))
+    assert sum(f.stat().st_size for f in files) <= 2000
+    assert cache.get_stats()["disk_evictions"] == 40 - len(files)
+    # The most recently written entries are kept
+    assert (tmp_path / "27" / f"27{39:062x}.json").exists()
@@ -0,0 +1,84 @@
+"""Tests for version constraints and the manifest catalog."""
+
+import json
+
+import pytest
+
+from cerebrum import ManifestCatalog, version_matches
+
+
+@pytest.mark.parametrize("version, constraint, expected", [
+    ("1.2.0", None, True),
+    ("1.2.0", "", True),
+    ("1.2.0", "1.2", True),
+    ("1.2.0", "==1.2.0", True),
+    ("1.2.0", "!=1.2", False),
+    ("1.2.0", ">=1.0,<2", True),
+    ("2.0.0", ">=1.0,<2", False),
+    ("1.10.0", ">1.9", True),
+    ("0.9", "<=0.9.0", True),
+    ("1.0.1", "<1.0.1", False),
+])
+def test_version_matches(version, constraint, expected):
+    assert version_matches(version, constraint) is expected
+
+
+def test_invalid_constraint():
+    with pytest.raises(ValueError):
+        version_matches("1.0", "~>1.0")
+
+
+def _package(root, rel, version):
+    package = root / rel
+    package.mkdir(parents=True)
+    (package / "config.json").write_text(json.dumps({"name": rel, "meta": {"version": version}}))
+
+
+def test_catalog_resolves_versions(tmp_path):
+    root = tmp_path / "agents"
+    _package(root, "me/agent/1.0.0", "1.0.0")
+    _package(root, "me/agent/1.2.0", "1.2.0")
+    _package(root, "me/agent/2.0.1", "2.0.1")
+    _package(root, "you/tool", "0.1")
+    catalog = ManifestCatalog(str(root), index_path=str(tmp_path / "index.json")).refresh()
+
+    assert catalog.refs() == ["me/agent", "you/tool"]
+    assert catalog.versions("me/agent") == ["1.0.0", "1.2.0", "2.0.1"]
+    assert catalog.resolve("me/agent")["version"] == "2.0.1"
+    assert catalog.resolve("me/agent@>=1.0,<2")["version"] == "1.2.0"
+    assert catalog.resolve("me/agent", ">=3") is None
+    assert catalog.resolve("you/tool")["path"] == str(root / "you/tool")
+    assert catalog.resolve("nobody/agent") is None
+
+
+def test_catalog_index_is_reused_and_refreshed(tmp_path):
+    root = tmp_path / "agents"
+    index = tmp_path / "index.json"
+    _package(root, "me/agent", "1.0")
+    ManifestCatalog(str(root), index_path=str(index)).refresh()
+    assert index.exists()
+
+    _package(root, "me/other", "0.1")
+    catalog = ManifestCatalog(str(root), index_path=str(index)).refresh()
+    assert catalog.refs() == ["me/agent", "me/other"]
+
+
+def test_catalog_sees_manifests_written_after_their_directory(tmp_path):
+    root = tmp_path / "agents"
+    index = tmp_path / "index.json"
+    (root / "me/agent").mkdir(parents=True)
+    catalog = ManifestCatalog(str(root), index_path=str(index)).refresh()
+    assert catalog.refs() == []
+
+    (root / "me/agent/config.json").write_text(json.dumps({"meta": {"version": "1.0"}}))
+    assert catalog.refresh().refs() == ["me/agent"]
+
+    _package(root, "me/tool/0.1", "0.1")
+    (root / "me/tool/0.2").mkdir()
+    ManifestCatalog(str(root), index_path=str(index)).refresh()
+    (root / "me/tool/0.2/config.json").write_text(json.dumps({"meta": {"version": "0.2"}}))
+    _package(root, "me/tool/0.3", "0.3")
+    catalog = ManifestCatalog(str(root), index_path=str(index)).refresh()
+    assert catalog.refs() == ["me/agent", "me/tool"]
+    assert [catalog._manifests[rel]["version"] for rel in catalog._by_ref["me/tool"]] == \
+        ["0.1", "0.2", "0.3"]
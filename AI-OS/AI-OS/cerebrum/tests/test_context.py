@@ -0,0 +1,81 @@
+"""Tests for ContextManager compaction."""
+
+from cerebrum import AgentMessage, ContextManager
+
+
+def _feed(context, history, messages):
+    """Append messages one by one, compacting like AgentBase.build_messages."""
+    for message in messages:
+        history.append(message)
+        context.add(message)
+        context.compact(history)
+        assert context.window_tokens == sum(context.message_tokens[context.start:])
+
+
+def test_under_budget_keeps_everything():
+    context = ContextManager(context_window=1000, reserve_tokens=0)
+    history = []
+    _feed(context, history, [AgentMessage(role="user", content="hi"),
+                             AgentMessage(role="assistant", content="hello")])
+    assert context.start == 0
+    assert context.compactions == 0
+
+
+def test_compaction_drops_to_low_watermark():
+    context = ContextManager(context_window=400, reserve_tokens=0, low_watermark=0.5)
+    history = []
+    for _ in range(20):
+        _feed(context, history, [AgentMessage(role="user", content="u" * 100),
+                                 AgentMessage(role="assistant", content="a" * 100)])
+    assert context.compactions > 0
+    assert context.dropped_messages == context.start
+    assert context.prompt_tokens <= context.budget
+
+
+def test_window_starts_on_user_turn():
+    # Long user turns with short replies used to leave an assistant message first
+    context = ContextManager(context_window=300, reserve_tokens=0)
+    history = []
+    for _ in range(50):
+        _feed(context, history, [AgentMessage(role="user", content="u" * 300),
+                                 AgentMessage(role="assistant", content="a" * 10)])
+        assert history[context.start].role == "user"
+    assert context.dropped_messages > 0
+
+
+def test_window_never_starts_on_tool_result():
+    context = ContextManager(context_window=200, reserve_tokens=0)
+    history = []
+    for _ in range(20):
+        _feed(context, history, [AgentMessage(role="user", content="u" * 100),
+                                 AgentMessage(role="assistant", content="call"),
+                                 AgentMessage(role="tool", content="r" * 200),
+                                 AgentMessage(role="assistant", content="done")])
+        assert history[context.start].role == "user"
+
+
+def test_single_turn_over_budget_is_kept_whole():
+    context = ContextManager(context_window=300, reserve_tokens=0)
+    history = []
+    _feed(context, history, [AgentMessage(role="user", content="go")])
+    for _ in range(10):
+        _feed(context, history, [AgentMessage(role="assistant", content="x" * 200),
+                                 AgentMessage(role="tool", content="y" * 200)])
+    assert context.start == 0
+    assert context.compactions == 0
+
+
+def test_summarizer_receives_dropped_messages():
+    seen = []
+
+    def summarize(previous, dropped):
+        seen.extend(dropped)
+        return f"{len(seen)} messages"
+
+    context = ContextManager(context_window=200, reserve_tokens=0, summarizer=summarize)
+    history = []
+    for _ in range(10):
+        _feed(context, history, [AgentMessage(role="user", content="u" * 200),
+                                 AgentMessage(role="assistant", content="a")])
+    assert seen == history[:context.start]
+    assert context.summary == f"{context.start} messages"
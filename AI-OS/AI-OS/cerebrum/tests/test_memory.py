@@ -0,0 +1,208 @@
+"""Tests for ring buffers, memory search and the memory log."""
+
+import json
+
+import pytest
+
+from cerebrum import AgentMessage, ChainView, MemoryManager, RingBuffer, RingView
+
+
+def test_ring_buffer_evicts_oldest():
+    ring = RingBuffer(3)
+    assert [ring.append(i) for i in range(5)] == [None, None, None, 0, 1]
+    assert list(ring) == [2, 3, 4]
+    assert ring[0] == 2 and ring[-1] == 4
+    assert list(reversed(ring)) == [4, 3, 2]
+    assert ring.first_index == 2
+    with pytest.raises(IndexError):
+        ring[3]
+
+
+def test_ring_buffer_rejects_zero_capacity():
+    with pytest.raises(ValueError):
+        RingBuffer(0)
+
+
+def test_ring_buffer_clear_keeps_numbering():
+    ring = RingBuffer(2, [1, 2, 3])
+    ring.clear()
+    assert len(ring) == 0
+    ring.append(4)
+    assert list(ring) == [4]
+    assert ring.first_index == 3
+
+
+def test_ring_view_is_live():
+    ring = RingBuffer(4, range(4))
+    view = ring[-2:]
+    assert isinstance(view, RingView)
+    assert list(view) == [2, 3]
+
+    # Newer items do not enter the view; evicted ones leave it
+    ring.append(4)
+    assert list(view) == [2, 3]
+    ring.extend([5, 6, 7])
+    assert list(view) == []
+    assert len(view) == 0
+
+
+def test_ring_view_indexing():
+    ring = RingBuffer(5, range(10))
+    view = ring[1:4]
+    assert list(view) == [6, 7, 8]
+    assert view[0] == 6 and view[-1] == 8
+    assert view[1:] == [7, 8]
+    assert ring[::2] == [5, 7, 9]
+    with pytest.raises(IndexError):
+        view[3]
+
+
+def test_chain_view():
+    chained = ChainView([1, 2], RingBuffer(2, [3, 4]))
+    assert len(chained) == 4
+    assert list(chained) == [1, 2, 3, 4]
+    assert chained[2] == 3 and chained[-1] == 4
+    assert list(reversed(chained)) == [4, 3, 2, 1]
+
+
+def _message(role, content, **kwargs):
+    return AgentMessage(role=role, content=content, **kwargs)
+
+
+def test_tiers_move_oldest_to_long_term():
+    memory = MemoryManager(max_entries=2)
+    for i in range(5):
+        memory.add(_message("user", f"message {i}"))
+    assert [m.content for m in memory.short_term] == ["message 3", "message 4"]
+    assert [m.content for m in memory.long_term] == ["message 1", "message 2"]
+    assert [m.content for m in memory.get_recent(1)] == ["message 4"]
+    assert len(memory.get_all()) == 4
+
+
+def test_search_ranks_by_bm25():
+    memory = MemoryManager()
+    memory.add(_message("user", "the weather in Bratislava is sunny"))
+    memory.add(_message("user", "cooking pasta tonight"))
+    memory.add(_message("user", "Weather weather WEATHER report"))
+    results = memory.search("weather", n=5)
+    assert [m.content for m in results] == ["Weather weather WEATHER report",
+                                           "the weather in Bratislava is sunny"]
+    assert memory.search("weather bratislava", n=1)[0].content.startswith("the weather")
+    assert memory.search("nothing matches", n=5) == []
+
+
+def test_search_forgets_evicted_and_cleared_messages():
+    memory = MemoryManager(max_entries=1)
+    memory.add(_message("user", "alpha"))
+    memory.add(_message("user", "beta"))
+    memory.add(_message("user", "gamma"))  # alpha is dropped from long-term
+    assert memory.search("alpha") == []
+    assert [m.content for m in memory.search("beta")] == ["beta"]
+    memory.clear("long")
+    assert memory.search("beta") == []
+    memory.clear()
+    assert memory.search("gamma") == []
+
+
+def test_search_without_words_uses_substring():
+    memory = MemoryManager()
+    memory.add(_message("user", "a :) b"))
+    memory.add(_message("user", "plain"))
+    assert [m.content for m in memory.search(":)")] == ["a :) b"]
+
+
+def test_log_round_trip_keeps_all_fields(tmp_path):
+    path = str(tmp_path / "memory.jsonl")
+    memory = MemoryManager(max_entries=2)
+    memory.add(_message("user", "hello"))
+    memory.add(_message("assistant", "", tool_calls=[{"id": "c1", "name": "calc",
+                                                      "arguments": {"a": 1}}]))
+    memory.add(_message("tool", "2", tool_call_id="c1", metadata={"tool": "calc"}))
+    memory.save_to_disk(path)
+
+    loaded = MemoryManager(max_entries=2)
+    loaded.load_from_disk(path)
+    assert list(loaded.get_all()) == list(memory.get_all())
+    assert [m.content for m in loaded.search("hello")] == ["hello"]
+
+
+def test_log_appends_only_new_operations(tmp_path):
+    path = tmp_path / "memory.jsonl"
+    memory = MemoryManager()
+    memory.add(_message("user", "first"))
+    memory.save_to_disk(str(path))
+    lines = path.read_text().splitlines()
+
+    memory.add(_message("user", "second"))
+    memory.save_to_disk(str(path))
+    new_lines = path.read_text().splitlines()
+    assert new_lines[:len(lines)] == lines
+    assert len(new_lines) == len(lines) + 1
+    assert json.loads(new_lines[-1])["message"]["content"] == "second"
+
+
+def test_lazy_load_replays_on_first_read(tmp_path):
+    path = str(tmp_path / "memory.jsonl")
+    memory = MemoryManager()
+    memory.add(_message("user", "old"))
+    memory.save_to_disk(path)
+
+    resumed = MemoryManager()
+    resumed.load_from_disk(path)
+    resumed.add(_message("user", "new"))  # does not read the log
+    resumed.save_to_disk(path)
+    assert resumed._unloaded_path is not None
+
+    assert [m.content for m in resumed.get_all()] == ["old", "new"]
+    reloaded = MemoryManager()
+    reloaded.load_from_disk(path, lazy=False)
+    assert [m.content for m in reloaded.get_all()] == ["old", "new"]
+
+
+def test_log_is_compacted_when_it_outgrows_live_messages(tmp_path, monkeypatch):
+    import cerebrum
+    monkeypatch.setattr(cerebrum, "MEMORY_LOG_COMPACT_MIN", 10)
+    path = tmp_path / "memory.jsonl"
+    memory = MemoryManager(max_entries=2)
+    memory.save_to_disk(str(path))
+    for i in range(30):
+        memory.add(_message("user", f"message {i}"))
+        memory.save_to_disk(str(path))
+
+    records = path.read_text().splitlines()[1:]
+    assert len(records) <= 10
+    reloaded = MemoryManager(max_entries=2)
+    reloaded.load_from_disk(str(path))
+    assert list(reloaded.get_all()) == list(memory.get_all())
+
+
+def test_load_legacy_json_format(tmp_path):
+    path = tmp_path / "memory.json"
+    path.write_text(json.dumps({
+        "short_term": [{"role": "user", "content": "short", "timestamp": 1.0}],
+        "long_term": [{"role": "user", "content": "long", "timestamp": 0.5}],
+    }))
+    memory = MemoryManager()
+    memory.load_from_disk(str(path))
+    assert [m.content for m in memory.get_all()] == ["long", "short"]
+
+    # The next save rewrites it as a log
+    memory.save_to_disk(str(path))
+    header = json.loads(path.read_text().splitlines()[0])
+    assert header["format"] == "cerebrum-memory-log"
+
+
+def test_message_metadata_is_writable_and_created_on_demand(tmp_path):
+    message = AgentMessage(role="user", content="hi")
+    message.metadata["source"] = "cli"
+    assert message.metadata == {"source": "cli"}
+    assert AgentMessage(role="user", content="hi", metadata={"a": 1}).metadata == {"a": 1}
+
+    path = tmp_path / "memory.jsonl"
+    memory = MemoryManager()
+    memory.add(AgentMessage(role="user", content="plain"))
+    memory.add(message)
+    memory.save_to_disk(str(path))
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record["message"].get("metadata") for record in records[1:]] == \
+        [None, {"source": "cli"}]
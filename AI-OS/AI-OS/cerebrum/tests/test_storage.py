@@ -0,0 +1,120 @@
+"""Tests for StorageManager backends and codecs."""
+
+import pytest
+
+from cerebrum import StorageManager, get_codec
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def storage(request, tmp_path):
+    manager = StorageManager(str(tmp_path / "storage"), backend=request.param)
+    yield manager
+    manager.close()
+
+
+def test_save_load_delete(storage):
+    storage.save("state", {"step": 3, "name": "ä"})
+    assert storage.load("state") == {"step": 3, "name": "ä"}
+    storage.save("state", {"step": 4})
+    assert storage.load("state") == {"step": 4}
+    assert storage.list_keys() == ["state"]
+
+    storage.delete("state")
+    assert storage.list_keys() == []
+    with pytest.raises(FileNotFoundError):
+        storage.load("state")
+
+
+def test_batched_save_and_load(storage):
+    storage.save_many({"a": 1, "b": [2], "c": {"d": None}})
+    assert sorted(storage.list_keys()) == ["a", "b", "c"]
+    assert storage.load_many(["a", "c"]) == {"a": 1, "c": {"d": None}}
+
+
+@pytest.mark.asyncio
+async def test_async_api(storage):
+    await storage.asave("state", {"step": 1})
+    await storage.asave_many({"x": 1, "y": 2})
+    assert await storage.aload("state") == {"step": 1}
+    assert await storage.aload_many(["x", "y"]) == {"x": 1, "y": 2}
+    await storage.adelete("state")
+    assert sorted(storage.list_keys()) == ["x", "y"]
+
+
+def test_durable_writes(tmp_path):
+    for backend in ("json", "sqlite"):
+        storage = StorageManager(str(tmp_path / backend), backend=backend, durable=True)
+        storage.save_many({"a": 1, "b": 2})
+        assert storage.load_many(["a", "b"]) == {"a": 1, "b": 2}
+        storage.close()
+
+
+def test_unknown_backend_and_format(tmp_path):
+    with pytest.raises(ValueError):
+        StorageManager(str(tmp_path), backend="nope")
+    with pytest.raises(ValueError):
+        get_codec("nope")
+
+
+def test_migrate_between_backends(tmp_path):
+    source = StorageManager(str(tmp_path / "files"))
+    source.save_many({"a": {"x": 1}, "b": [1, 2]})
+    source.save("notes", "plain text", format="txt")
+    target = StorageManager(str(tmp_path / "db"), backend="sqlite")
+
+    assert source.migrate_to(target, delete=True) == 3
+    assert target.load_many(["a", "b", "notes"]) == {"a": {"x": 1}, "b": [1, 2],
+                                                     "notes": "plain text"}
+    assert source.list_keys() == []
+    target.close()
+
+
+@pytest.mark.parametrize("format", ["txt", "msgpack", "json.zst", "msgpack.lz4"])
+def test_codecs_round_trip(storage, format):
+    if "msgpack" in format:
+        pytest.importorskip("msgpack")
+    if format.endswith(".zst"):
+        pytest.importorskip("zstandard")
+    if format.endswith(".lz4"):
+        pytest.importorskip("lz4")
+    data = "text" if format == "txt" else {"a": [1, 2, 3], "b": "ä"}
+    storage.save("entry", data, format=format)
+    assert storage.load("entry", format=format) == data
+    # The format is detected when not given
+    assert storage.load("entry") == data
+
+
+def test_npy_loads_memory_mapped(storage):
+    np = pytest.importorskip("numpy")
+    array = np.arange(12, dtype=np.float32).reshape(3, 4)
+    storage.save("weights", array, format="npy")
+    loaded = storage.load("weights")
+    assert np.array_equal(loaded, array)
+    if storage.backend.file_per_entry:
+        assert isinstance(loaded, np.memmap)
+    assert np.array_equal(storage.load_many(["weights"])["weights"], array)
+
+
+def test_npz_round_trip(storage):
+    np = pytest.importorskip("numpy")
+    storage.save("arrays", {"a": np.ones(3), "b": np.zeros(2)}, format="npz")
+    loaded = storage.load("arrays")
+    assert np.array_equal(loaded["a"], np.ones(3))
+    assert np.array_equal(loaded["b"], np.zeros(2))
+
+
+@pytest.mark.parametrize("format", ["arrow", "parquet"])
+def test_dataframes_round_trip(storage, format):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    frame = pd.DataFrame({"x": [1, 2, 3], "y": ["a", "b", "c"]})
+    storage.save("table", frame, format=format)
+    assert storage.load("table").equals(frame)
+
+
+def test_arrow_tables_stay_tables(storage):
+    pa = pytest.importorskip("pyarrow")
+    storage.save("table", {"x": [1, 2]}, format="arrow")
+    loaded = storage.load("table")
+    assert isinstance(loaded, pa.Table)
+    assert loaded.column("x").to_pylist() == [1, 2]
@@ -0,0 +1,156 @@
+"""Tests for streamed responses: incremental tool-call parsing and usage."""
+
+import asyncio
+from types import SimpleNamespace as NS
+
+import pytest
+
+from cerebrum import (AgentBase, AgentConfig, AnthropicLLM, LLMResponse, OpenAILLM,
+                      ToolCallAccumulator, ToolCallDelta, ToolCallStreamParser)
+
+
+def _feed_all(parser, deltas):
+    completed = []
+    for delta in deltas:
+        completed.append(parser.feed(delta))
+    return completed
+
+
+def test_stream_parser_splits_tags_across_deltas():
+    text = 'Let me check. <tool_call>{"name": "calc", "arguments": {"a": 1}}</tool_call> ok'
+    parser = ToolCallStreamParser()
+    completed = _feed_all(parser, [text[i:i + 3] for i in range(0, len(text), 3)])
+    calls = [call for batch in completed for call in batch]
+    assert calls == [{"name": "calc", "arguments": {"a": 1}}]
+    # The call is reported by the delta that closes it, not at the end
+    closing = next(i for i, batch in enumerate(completed) if batch)
+    assert closing * 3 < len(text) - len(" ok")
+
+
+def test_stream_parser_multiple_calls_in_one_delta():
+    parser = ToolCallStreamParser()
+    calls = parser.feed('<tool_call>{"name": "a"}</tool_call>'
+                        '<tool_call>{"name": "b"}</tool_call>')
+    assert [call["name"] for call in calls] == ["a", "b"]
+
+
+def test_stream_parser_skips_malformed_json():
+    parser = ToolCallStreamParser()
+    assert parser.feed("<tool_call>{oops</tool_call>") == []
+    assert parser.feed('<tool_call>{"name": "ok"}</tool_call>') == [{"name": "ok"}]
+
+
+def test_stream_parser_ignores_plain_text():
+    parser = ToolCallStreamParser()
+    assert _feed_all(parser, ["no tools ", "<tool", "_ here"]) == [[], [], []]
+
+
+def test_accumulator_closes_call_when_next_starts():
+    calls = ToolCallAccumulator()
+    assert calls.feed(ToolCallDelta(index=0, id="c1", name="calc", arguments='{"a": ')) == []
+    assert calls.feed(ToolCallDelta(index=0, arguments="1}")) == []
+    started = calls.feed(ToolCallDelta(index=1, id="c2", name="calc", arguments="{}"))
+    assert started == [{"id": "c1", "name": "calc", "arguments": {"a": 1}}]
+    assert calls.finish() == [{"id": "c2", "name": "calc", "arguments": {}}]
+
+
+def test_accumulator_done_fragment_completes_call():
+    calls = ToolCallAccumulator()
+    calls.feed(ToolCallDelta(index=0, id="t1", name="search", arguments='{"q": "x"}'))
+    assert calls.feed(ToolCallDelta(index=0, done=True)) == [
+        {"id": "t1", "name": "search", "arguments": {"q": "x"}}]
+    # Late fragments of a closed call are ignored
+    assert calls.feed(ToolCallDelta(index=0, arguments="junk")) == []
+    assert calls.finish() == []
+
+
+def test_accumulator_keeps_invalid_arguments_as_text():
+    calls = ToolCallAccumulator()
+    calls.feed(ToolCallDelta(index=0, id="c1", name="calc", arguments='{"a": '))
+    assert calls.finish() == [{"id": "c1", "name": "calc", "arguments": '{"a": '}]
+
+
+def test_accumulator_empty_arguments():
+    calls = ToolCallAccumulator()
+    calls.feed(ToolCallDelta(index=0, id="c1", name="now", done=True))
+    assert calls.finish() == []
+
+
+class FakeStream:
+    """Async client whose create() records the request and streams ``events``."""
+
+    def __init__(self, events):
+        self.events = events
+        self.requests = []
+        self.chat = NS(completions=self)
+        self.messages = self
+
+    async def create(self, **request):
+        self.requests.append(request)
+        return self._stream()
+
+    async def _stream(self):
+        for event in self.events:
+            yield event
+
+
+def _attach(provider, events):
+    provider.async_client = FakeStream(events)
+    provider._async_loop = asyncio.get_running_loop()
+    return provider.async_client
+
+
+def _chunk(content=None, usage=None):
+    choices = [NS(delta=NS(content=content, tool_calls=None))] if content else []
+    return NS(choices=choices, usage=usage)
+
+
+OPENAI_EVENTS = [
+    _chunk("Hel"), _chunk("lo"),
+    _chunk(usage=NS(prompt_tokens=1200, completion_tokens=2,
+                    prompt_tokens_details=NS(cached_tokens=1024))),
+]
+
+
+@pytest.mark.asyncio
+async def test_openai_stream_requests_and_yields_usage():
+    provider = OpenAILLM(api_key="test")
+    client = _attach(provider, OPENAI_EVENTS)
+    deltas = [delta async for delta in provider.astream([{"role": "user", "content": "hi"}])]
+    assert client.requests[0]["stream_options"] == {"include_usage": True}
+    assert deltas[:2] == ["Hel", "lo"]
+    assert deltas[2] == LLMResponse(content="", prompt_tokens=1200, completion_tokens=2,
+                                    cached_tokens=1024)
+
+
+@pytest.mark.asyncio
+async def test_anthropic_stream_yields_usage():
+    usage = NS(input_tokens=10, output_tokens=1, cache_read_input_tokens=900,
+               cache_creation_input_tokens=0)
+    provider = AnthropicLLM(api_key="test")
+    _attach(provider, [
+        NS(type="message_start", message=NS(usage=usage)),
+        NS(type="content_block_start", index=0, content_block=NS(type="text")),
+        NS(type="content_block_delta", index=0, delta=NS(type="text_delta", text="Hi")),
+        NS(type="content_block_stop", index=0),
+        NS(type="message_delta", usage=NS(output_tokens=7)),
+        NS(type="message_stop"),
+    ])
+    deltas = [delta async for delta in provider.astream([{"role": "user", "content": "hi"}])]
+    assert deltas == ["Hi", LLMResponse(content="", prompt_tokens=910, completion_tokens=7,
+                                        cached_tokens=900)]
+
+
+@pytest.mark.asyncio
+async def test_think_stream_records_reported_usage():
+    provider = OpenAILLM(api_key="test")
+    _attach(provider, OPENAI_EVENTS)
+    agent = AgentBase(AgentConfig(name="test", description=["test agent"], tools=[],
+                                  author="test", version="1.0.0", storage_enabled=False))
+    agent.llm.providers["openai"] = provider
+    agent.llm.set_provider("openai")
+
+    assert "".join([delta async for delta in agent.think_stream("hi")]) == "Hello"
+    stats = agent.iteration_stats[-1]
+    assert (stats.prompt_tokens, stats.completion_tokens, stats.cached_tokens) == (1200, 2, 1024)
+    assert agent.get_stats()["prompt_cache"]["cached_tokens"] == 1024
@@ -0,0 +1,98 @@
+"""Tests for tool execution and result caching."""
+
+import pytest
+
+from cerebrum import (AgentBase, AgentConfig, LLMProvider, Tool, ToolCachePolicy,
+                      ToolExecutor, ToolRegistry)
+
+
+class ArrayTool(Tool):
+    name = "array"
+    description = "Returns an array"
+
+    def get_tool_call_format(self):
+        return {"name": self.name, "description": self.description,
+                "parameters": {"type": "object", "properties": {"n": {"type": "integer"}}}}
+
+    def run(self, params):
+        import numpy as np
+        return np.ones(params["n"])
+
+
+class ScriptedLLM(LLMProvider):
+    """Returns the given responses in order."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+
+    def generate(self, messages, max_tokens=4096, temperature=0.7, **kwargs):
+        return self.responses.pop(0)
+
+    def get_available_models(self):
+        return []
+
+
+def make_agent(llm, tools, **kwargs):
+    config = AgentConfig(name="test", description=["test agent"], tools=[], author="test",
+                         version="1.0.0", storage_enabled=False, **kwargs)
+    agent = AgentBase(config)
+    agent.llm.providers["openai"] = llm
+    agent.llm.set_provider("openai")
+    for tool in tools:
+        agent.register_tool(tool)
+    return agent
+
+
+@pytest.mark.asyncio
+async def test_shared_memory_result_reaches_conversation_as_text():
+    np = pytest.importorskip("numpy")
+    call = '<tool_call>{"name": "array", "arguments": {"n": 262144}}</tool_call>'
+    agent = make_agent(ScriptedLLM(call, "done"), [ArrayTool()])
+    agent.tools.executor = ToolExecutor(1, mode="process", shm_threshold=0)
+    try:
+        assert await agent.run("go") == "done"
+
+        tool_msg = agent.conversation_history[2]
+        assert tool_msg.role == "tool"
+        assert isinstance(tool_msg.content, str)
+        assert tool_msg.content.startswith("array(shape=(262144,), dtype=float64)")
+        assert agent.memory.search("array shape")
+
+        # Direct callers still get the (memory-mapped) array
+        result = await agent.tools.aexecute_tool("array", {"n": 262144})
+        assert isinstance(result, np.ndarray)
+        assert result.shape == (262144,) and result[-1] == 1.0
+        # The call history only keeps the summary
+        assert all(call.result.startswith("array(") for call in agent.tools.tool_calls)
+    finally:
+        agent.tools.executor.shutdown()
+
+
+class PureTool(Tool):
+    name = "lookup"
+    description = "Pure lookup"
+    cache_policy = ToolCachePolicy.PURE
+    answer = "first"
+
+    def get_tool_call_format(self):
+        return {"name": self.name}
+
+    def run(self, params):
+        return self.answer
+
+
+class OtherPureTool(PureTool):
+    answer = "second"
+
+
+@pytest.mark.asyncio
+async def test_forks_do_not_share_results_of_different_tools():
+    client_tools = ToolRegistry()
+    first, second = client_tools.fork(), client_tools.fork()
+    first.register(PureTool())
+    second.register(OtherPureTool())
+
+    assert await first.aexecute_tool("lookup", {}) == "first"
+    assert await second.aexecute_tool("lookup", {}) == "second"
+    assert await first.fork().aexecute_tool("lookup", {}) == "first"
+    assert client_tools.cache.hits == 1